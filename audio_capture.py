@@ -0,0 +1,383 @@
+"""
+Continuous audio capture for Smart Helmet
+One capture thread reads the microphone for the whole session and keeps
+a short write-behind ring, so chunk files can be cut at an exact sample
+index matching the video chunk boundaries (no arecord restart per chunk).
+Chunks are written as WAV or encoded live to AAC (ADTS) / Opus (Ogg).
+Files are opened, written and closed on a separate writer thread, so a
+slow SD card or an encoder finishing a chunk never stalls the ALSA reads.
+"""
+
+import time
+import wave
+import logging
+import threading
+import subprocess
+from collections import deque
+
+SAMPLE_WIDTH = 2  # S16_LE
+
+# codec -> (file extension, ffmpeg output args)
+AUDIO_CODECS = {
+    "wav": (".wav", None),
+    "aac": (".aac", ["-c:a", "aac", "-f", "adts"]),
+    "opus": (".opus", ["-c:a", "libopus", "-application", "voip", "-f", "ogg"]),
+}
+
+
+def audio_extension(codec):
+    return AUDIO_CODECS.get(codec, AUDIO_CODECS["wav"])[0]
+
+
+class FfmpegAudioWriter:
+    """
+    Live encoder for one chunk: raw PCM is piped into a niced ffmpeg.
+    Same writeframesraw()/close() surface as wave.Wave_write.
+    """
+
+    def __init__(self, path, rate, channels, codec="aac", bitrate="96k"):
+        out_args = AUDIO_CODECS[codec][1]
+        cmd = [
+            "nice", "-n", "10",
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", "s16le", "-ar", str(rate), "-ac", str(channels), "-i", "pipe:0",
+        ] + out_args[:2] + ["-b:a", bitrate] + out_args[2:] + ["-y", path]
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def writeframesraw(self, data):
+        self._proc.stdin.write(data)
+
+    def close(self):
+        try:
+            self._proc.stdin.close()
+        finally:
+            try:
+                self._proc.wait(timeout=10)
+            except Exception:
+                self._proc.kill()
+
+
+def make_writer(codec="wav", bitrate="96k"):
+    """Return a writer factory(path, rate, channels) for AudioCapture."""
+    if codec == "wav" or codec not in AUDIO_CODECS:
+        def _wav(path, rate, channels):
+            w = wave.open(path, "wb")
+            w.setnchannels(channels)
+            w.setsampwidth(SAMPLE_WIDTH)
+            w.setframerate(rate)
+            return w
+        return _wav
+
+    def _encoded(path, rate, channels):
+        return FfmpegAudioWriter(path, rate, channels, codec=codec, bitrate=bitrate)
+    return _encoded
+
+
+class AlsaDevice:
+    """Microphone via pyalsaaudio (blocking reads of one period)."""
+
+    def __init__(self, device, rate, channels, period=1024):
+        import alsaaudio
+        self.rate = rate
+        self.channels = channels
+        self.period = period
+        self._pcm = alsaaudio.PCM(
+            alsaaudio.PCM_CAPTURE,
+            alsaaudio.PCM_NORMAL,
+            device=device,
+            channels=channels,
+            rate=rate,
+            format=alsaaudio.PCM_FORMAT_S16_LE,
+            periodsize=period,
+        )
+
+    def read(self):
+        """Returns (frames, bytes). frames < 0 means an overrun."""
+        n, data = self._pcm.read()
+        if n < 0:
+            return n, b""
+        return n, data
+
+    def close(self):
+        try:
+            self._pcm.close()
+        except Exception:
+            pass
+
+
+class FakeAudioDevice:
+    """
+    Stand-in microphone for tests / units without a USB mic.
+    Produces a 16-bit sample counter (or silence) one period per read.
+    realtime=True paces reads like real hardware.
+    """
+
+    def __init__(self, rate=44100, channels=1, period=1024, realtime=True, silence=False):
+        self.rate = rate
+        self.channels = channels
+        self.period = period
+        self.realtime = realtime
+        self.silence = silence
+        self._counter = 0
+
+    def read(self):
+        if self.realtime:
+            time.sleep(self.period / self.rate)
+        if self.silence:
+            data = b"\x00" * (self.period * self.channels * SAMPLE_WIDTH)
+        else:
+            out = bytearray()
+            for _ in range(self.period):
+                v = (self._counter & 0x7FFF).to_bytes(2, "little")
+                out += v * self.channels
+                self._counter += 1
+            data = bytes(out)
+        return self.period, data
+
+    def close(self):
+        pass
+
+
+class AudioCapture:
+    """
+    Sample clock: sample index i was captured at t0 + i / rate, where t0
+    is pinned from the first read. open_file/close_file take a time on the
+    same clock as `clock` (time.monotonic by default) and are converted to
+    a sample index, so cuts are sample accurate as long as they arrive
+    within `holdback` seconds.
+    """
+
+    def __init__(self, device, holdback=0.5, clock=time.monotonic, writer_factory=None,
+                 max_queued=5.0):
+        self.device = device
+        self._make_writer = writer_factory or make_writer("wav")
+        self.rate = device.rate
+        self.channels = device.channels
+        self.frame_bytes = self.channels * SAMPLE_WIDTH
+        self.holdback_samples = int(holdback * self.rate)
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._pending = deque()      # (start_sample, bytes) captured but not yet written
+        self._events = []            # (sample, seq, kind, path) sorted
+        self._seq = 0
+        self._read_samples = 0
+        self._flushed = 0
+        self._t0 = None
+        self._file_open = False      # capture side: an open has been queued, no close yet
+        self._running = False
+        self._thread = None
+        self.overruns = 0
+
+        # writer thread: ("open", path) / ("data", bytes) / ("close", None) / ("stop", None)
+        self._ops = deque()
+        self._ops_cond = threading.Condition()
+        self._queued_bytes = 0
+        self._max_queued_bytes = int(max_queued * self.rate) * self.frame_bytes
+        self._active = None          # op the writer thread is working on
+        self._writer = None
+        self._writer_path = None
+        self.dropped_samples = 0
+        self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True, name="audio-writer")
+        self._writer_thread.start()
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="audio-capture")
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+        with self._lock:
+            self._flush(self._read_samples, final=True)
+        self.device.close()
+        self._enqueue("stop", None)
+        self._writer_thread.join(timeout=15)
+
+    # ---------- control ----------
+    def sample_at(self, t):
+        with self._lock:
+            return self._sample_at(t)
+
+    def open_file(self, path, at=None):
+        """Start writing a WAV at time `at` (default now)."""
+        self._add_event("open", path, at)
+
+    def close_file(self, at=None):
+        """Finish the current WAV at time `at` (default now)."""
+        self._add_event("close", None, at)
+
+    def rotate(self, path, close_at=None, open_at=None):
+        """Close the current chunk at close_at and open the next at open_at."""
+        self._add_event("close", None, close_at)
+        self._add_event("open", path, open_at if open_at is not None else close_at)
+
+    @property
+    def current_path(self):
+        """File the writer thread has open (stays set until its close() returned)."""
+        return self._writer_path
+
+    def wait_closed(self, path, timeout=None):
+        """Block until path is fully written and closed; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._ops_cond:
+            while self._writer_path == path or self._active == ("open", path) \
+                    or ("open", path) in self._ops:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._ops_cond.wait(remaining)
+        return True
+
+    # ---------- capture thread ----------
+    def _loop(self):
+        while self._running:
+            try:
+                self.read_once()
+            except Exception as e:
+                logging.error(f"[AUDIO] Capture error: {e}")
+                time.sleep(0.1)
+
+    def read_once(self):
+        n, data = self.device.read()
+        now = self._clock()
+        with self._lock:
+            if n < 0:
+                self.overruns += 1
+                return
+            if self._t0 is None:
+                self._t0 = now - n / self.rate
+
+            # keep the sample clock locked to wall time: pad samples lost to overruns
+            expected_end = self._t0 + (self._read_samples + n) / self.rate
+            missing = int((now - expected_end) * self.rate)
+            if missing > 2 * n:
+                self._pending.append((self._read_samples, b"\x00" * (missing * self.frame_bytes)))
+                self._read_samples += missing
+
+            self._pending.append((self._read_samples, data[:n * self.frame_bytes]))
+            self._read_samples += n
+            self._flush(self._read_samples - self.holdback_samples)
+
+    # ---------- internals ----------
+    def _sample_at(self, t):
+        if t is None:
+            t = self._clock()
+        if self._t0 is None:
+            return self._read_samples
+        return max(0, int(round((t - self._t0) * self.rate)))
+
+    def _add_event(self, kind, path, at):
+        with self._lock:
+            sample = self._sample_at(at)
+            if sample < self._flushed:
+                logging.warning(f"[AUDIO] Late {kind} ({(self._flushed - sample) / self.rate:.3f}s), cutting now")
+                sample = self._flushed
+            self._seq += 1
+            self._events.append((sample, self._seq, kind, path))
+            self._events.sort()
+
+    def _apply(self, kind, path):
+        # capture thread: only queue the cut, the writer thread does the work
+        if self._file_open:
+            self._enqueue("close", None)
+        self._file_open = kind == "open"
+        if self._file_open:
+            self._enqueue("open", path)
+
+    def _write(self, data):
+        if self._file_open and data:
+            self._enqueue("data", data)
+
+    def _enqueue(self, op, arg):
+        with self._ops_cond:
+            if op == "data":
+                if self._queued_bytes + len(arg) > self._max_queued_bytes:
+                    # writer wedged: drop rather than block the ALSA reads
+                    if not self.dropped_samples:
+                        logging.error("[AUDIO] Writer not keeping up, dropping samples")
+                    self.dropped_samples += len(arg) // self.frame_bytes
+                    return
+                self._queued_bytes += len(arg)
+            self._ops.append((op, arg))
+            self._ops_cond.notify_all()
+
+    # ---------- writer thread ----------
+    def _writer_loop(self):
+        while True:
+            with self._ops_cond:
+                while not self._ops:
+                    self._ops_cond.wait()
+                op, arg = self._ops.popleft()
+                if op == "data":
+                    self._queued_bytes -= len(arg)
+                self._active = (op, arg)
+            if op == "stop":
+                self._close_writer()
+                return
+            self._run_op(op, arg)
+            with self._ops_cond:
+                self._active = None
+                self._ops_cond.notify_all()
+
+    def _run_op(self, op, arg):
+        if op == "data":
+            if self._writer:
+                try:
+                    self._writer.writeframesraw(arg)
+                except Exception as e:
+                    logging.error(f"[AUDIO] Write failed for {self._writer_path}: {e}")
+                    self._close_writer()
+        elif op == "close":
+            self._close_writer()
+        elif op == "open":
+            self._close_writer()
+            try:
+                writer = self._make_writer(arg, self.rate, self.channels)
+            except Exception as e:
+                logging.error(f"[AUDIO] Open failed for {arg}: {e}")
+                writer = None
+            with self._ops_cond:
+                self._writer = writer
+                self._writer_path = arg if writer else None
+
+    def _close_writer(self):
+        if self._writer:
+            try:
+                self._writer.close()
+            except Exception as e:
+                logging.error(f"[AUDIO] Close failed: {e}")
+        with self._ops_cond:
+            self._writer = None
+            self._writer_path = None
+            self._ops_cond.notify_all()
+
+    def _flush(self, limit, final=False):
+        """Write every captured sample below `limit`, applying cut events in order."""
+        while self._pending and self._flushed < limit:
+            start, data = self._pending[0]
+            end = start + len(data) // self.frame_bytes
+            stop_at = min(end, limit)
+
+            while self._events and self._events[0][0] <= stop_at:
+                sample, _, kind, path = self._events.pop(0)
+                s = max(sample, self._flushed)
+                self._write(data[(self._flushed - start) * self.frame_bytes:(s - start) * self.frame_bytes])
+                self._flushed = s
+                self._apply(kind, path)
+
+            self._write(data[(self._flushed - start) * self.frame_bytes:(stop_at - start) * self.frame_bytes])
+            self._flushed = stop_at
+            if stop_at >= end:
+                self._pending.popleft()
+
+        if final:
+            # nothing more will be captured: finish the open file, drop future cuts
+            self._events = []
+            self._apply("close", None)
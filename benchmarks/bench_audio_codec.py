@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Audio path benchmark: WAV vs live AAC / Opus
+- disk bytes written per hour of audio (extrapolated from a sample run)
+- encoder CPU time while recording (ffmpeg child user+sys)
+- convert_and_merge time for one chunk (WAV needs AAC encode, AAC/Opus is -c copy)
+
+Requires ffmpeg with libx264 (for the synthetic video) and libopus.
+Usage: python3 benchmarks/bench_audio_codec.py [seconds]
+"""
+
+import os
+import sys
+import time
+import resource
+import tempfile
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from audio_capture import AudioCapture, FakeAudioDevice, make_writer, audio_extension
+
+RATE = 44100
+CHANNELS = 1
+FPS = 30
+
+
+def make_h264(path, seconds):
+    subprocess.run([
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc=size=1640x1232:rate={FPS}",
+        "-t", str(seconds), "-c:v", "libx264", "-preset", "ultrafast",
+        "-b:v", "1500k", "-f", "h264", "-y", path
+    ], check=True)
+
+
+def record(codec, path, seconds):
+    dev = FakeAudioDevice(rate=RATE, channels=CHANNELS, period=1024, realtime=False)
+    cap = AudioCapture(dev, holdback=0.0, writer_factory=make_writer(codec, "96k"))
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    t0 = time.time()
+    cap.open_file(path, at=None)
+    for _ in range(int(seconds * RATE / 1024)):
+        cap.read_once()
+    cap.stop()
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    child_cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    return time.time() - t0, child_cpu
+
+
+def merge(h264, audio, out):
+    if audio.endswith(".wav"):
+        a_args = ["-c:v", "copy", "-c:a", "aac", "-b:a", "128k"]
+    else:
+        a_args = ["-c", "copy"]
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-r", str(FPS),
+           "-i", h264, "-i", audio] + a_args + ["-shortest", "-y", out]
+    t0 = time.time()
+    subprocess.run(cmd, check=True)
+    return time.time() - t0
+
+
+def main():
+    seconds = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    with tempfile.TemporaryDirectory() as d:
+        h264 = os.path.join(d, "temp.h264")
+        make_h264(h264, seconds)
+
+        print(f"{'codec':<6} {'MB/hour':>9} {'enc cpu s/h':>12} {'merge s':>8}")
+        for codec in ("wav", "aac", "opus"):
+            audio = os.path.join(d, "audio" + audio_extension(codec))
+            _, cpu = record(codec, audio, seconds)
+            size = os.path.getsize(audio)
+            merge_s = merge(h264, audio, os.path.join(d, f"out_{codec}.mp4"))
+            per_hour = 3600.0 / seconds
+            print(f"{codec:<6} {size * per_hour / 1e6:>9.1f} {cpu * per_hour:>12.1f} {merge_s:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Recording download benchmark: send_from_directory vs fileserve
+Serves a 60 MB test chunk from a local Flask app through both paths on
+the same server (Werkzeug, or cheroot if installed) and reports:
+  full     - MB/s for whole-file downloads
+  seek     - mean latency of 64 KB Range requests at random offsets
+  replay   - mean latency of a revalidating request (If-None-Match)
+
+Usage: python3 benchmarks/bench_fileserve.py [size_mb] [repeat]
+Requires flask.
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+import threading
+import http.client
+
+from flask import Flask, Response, request, send_from_directory
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import fileserve
+from webserver import WebServer
+
+PORT = 5091
+NAME = "video_20250101_120000_chunk000.mp4"
+
+
+def make_app(folder):
+    app = Flask(__name__)
+
+    @app.route("/old/<filename>")
+    def old(filename):
+        return send_from_directory(folder, filename)
+
+    @app.route("/new/<filename>")
+    def new(filename):
+        path = os.path.join(folder, filename)
+        status, headers, start, length = fileserve.plan(path, request.headers)
+        if status in (304, 416):
+            return Response(status=status, headers=headers)
+        return Response(fileserve.body(path, request.environ, start, length),
+                        status=status, headers=headers, direct_passthrough=True)
+
+    return app
+
+
+def fetch(path, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", PORT, timeout=30)
+    conn.request("GET", path, headers=headers or {})
+    resp = conn.getresponse()
+    n = 0
+    while True:
+        chunk = resp.read(1 << 20)
+        if not chunk:
+            break
+        n += len(chunk)
+    etag = resp.getheader("ETag")
+    conn.close()
+    return resp.status, n, etag
+
+
+def bench(prefix, size, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        status, n, etag = fetch(f"/{prefix}/{NAME}")
+        assert status == 200 and n == size, (status, n)
+    full = size * repeat / (time.perf_counter() - t0) / 1e6
+
+    rnd = random.Random(1)
+    t0 = time.perf_counter()
+    for _ in range(50):
+        off = rnd.randrange(0, size - 65536)
+        status, n, _ = fetch(f"/{prefix}/{NAME}", {"Range": f"bytes={off}-{off + 65535}"})
+        assert status == 206 and n == 65536, (status, n)
+    seek = (time.perf_counter() - t0) / 50 * 1000
+
+    t0 = time.perf_counter()
+    for _ in range(50):
+        status, n, _ = fetch(f"/{prefix}/{NAME}", {"If-None-Match": etag or '"none"'})
+    replay = (time.perf_counter() - t0) / 50 * 1000
+    return full, seek, replay, status
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    folder = tempfile.mkdtemp()
+    with open(os.path.join(folder, NAME), "wb") as f:
+        f.write(os.urandom(size_mb * 1024 * 1024))
+    size = size_mb * 1024 * 1024
+
+    server = WebServer(make_app(folder), "127.0.0.1", PORT)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    time.sleep(0.3)
+
+    print(f"{size_mb} MB file x {repeat}, server: {server.kind}")
+    print(f"{'path':<6} {'full MB/s':>10} {'seek ms':>8} {'replay ms':>10} {'replay status':>14}")
+    for prefix in ("old", "new"):
+        full, seek, replay, status = bench(prefix, size, repeat)
+        print(f"{prefix:<6} {full:>10.1f} {seek:>8.2f} {replay:>10.2f} {status:>14}")
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Live view cost: MJPEG (/video_feed) vs H.264 fMP4 (/api/live.mp4)
+Pulls each stream for a while from a running init.py and reports bytes/sec
+on the wire and CPU used by the init.py process (run this on the Pi so
+/proc/<pid> is visible, or pass --pid 0 to skip CPU).
+
+Equal visual quality: compare the two views side by side and adjust
+PREVIEW_H264_BITRATE in init.py until they look alike before trusting the
+byte counts. Run each mode with nothing else watching the live view, so
+the JPEG encoder is only busy for the MJPEG measurement.
+
+Usage: python3 benchmarks/bench_preview.py [--host H] [--port P] [--seconds S]
+                                           [--pid PID] [--http]
+"""
+
+import os
+import ssl
+import time
+import argparse
+import subprocess
+import http.client
+
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+PREVIEW_SETTLE = 6    # > PREVIEW_IDLE_STOP_SEC so the H.264 encoder is really off between runs
+
+
+def find_pid():
+    try:
+        out = subprocess.run(["pgrep", "-f", "init.py"], capture_output=True, text=True).stdout.split()
+        return int(out[0]) if out else 0
+    except Exception:
+        return 0
+
+
+def cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLK_TCK      # utime + stime
+
+
+def connect(args):
+    if args.http:
+        return http.client.HTTPConnection(args.host, args.port, timeout=10)
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    return http.client.HTTPSConnection(args.host, args.port, timeout=10, context=ctx)
+
+
+def measure(args, path, pid):
+    conn = connect(args)
+    conn.request("GET", path)
+    resp = conn.getresponse()
+    if resp.status != 200:
+        conn.close()
+        return None
+
+    # let the encoder spin up before counting
+    warm_until = time.monotonic() + 2
+    while time.monotonic() < warm_until:
+        resp.read1(65536)
+
+    total = 0
+    cpu0 = cpu_seconds(pid) if pid else 0
+    t0 = time.monotonic()
+    while time.monotonic() - t0 < args.seconds:
+        chunk = resp.read1(65536)
+        if not chunk:
+            break
+        total += len(chunk)
+    elapsed = time.monotonic() - t0
+    cpu = (cpu_seconds(pid) - cpu0) / elapsed * 100 if pid else None
+    conn.close()
+    return total / elapsed, cpu
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=5001)
+    ap.add_argument("--seconds", type=float, default=20)
+    ap.add_argument("--pid", type=int, default=None)
+    ap.add_argument("--http", action="store_true", help="server runs without TLS")
+    args = ap.parse_args()
+    pid = find_pid() if args.pid is None else args.pid
+
+    print(f"{'stream':<8} {'kB/s':>9} {'Mbit/s':>8} {'init.py CPU %':>14}")
+    for name, path in (("mjpeg", "/video_feed"), ("h264", "/api/live.mp4")):
+        res = measure(args, path, pid)
+        if res is None:
+            print(f"{name:<8} {'unavailable':>9}")
+            continue
+        rate, cpu = res
+        cpu_s = f"{cpu:.1f}" if cpu is not None else "-"
+        print(f"{name:<8} {rate / 1024:>9.1f} {rate * 8 / 1e6:>8.2f} {cpu_s:>14}")
+        time.sleep(PREVIEW_SETTLE)
+
+
+if __name__ == "__main__":
+    main()
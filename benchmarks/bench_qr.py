@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+QR provisioning decode benchmark
+Runs a folder of sample frames (jpg/png, ideally lores-sized captures,
+in capture order) through:
+  bgr      - old path: I420 -> BGR conversion + zbar on the colour image
+  gray     - Y plane straight into zbar
+  gray_ds2 - Y plane at 1/2 resolution
+  gray_roi - Y plane with ROI tracking after the first hit
+Reports decodes/sec and time-to-first-detection (frames replayed at 30 fps
+through the threaded detector).
+
+Usage: python3 benchmarks/bench_qr.py <frames_dir> [repeat]
+Requires opencv-python and pyzbar.
+"""
+
+import os
+import sys
+import time
+import glob
+
+import cv2
+from pyzbar.pyzbar import decode as zbar_decode
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from qrscan import QrDetector, y_plane
+
+FRAME_INTERVAL = 1.0 / 30
+
+
+def load_frames(folder):
+    paths = sorted(glob.glob(os.path.join(folder, "*.jpg")) + glob.glob(os.path.join(folder, "*.png")))
+    frames = []
+    for p in paths:
+        bgr = cv2.imread(p)
+        if bgr is None:
+            continue
+        h, w = bgr.shape[:2]
+        # same layout picamera2 hands main.py for the lores stream
+        frames.append((cv2.cvtColor(bgr, cv2.COLOR_BGR2YUV_I420), w, h))
+    return frames
+
+
+def bench_bgr(frames, repeat):
+    hits = 0
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for i420, w, h in frames:
+            bgr = cv2.cvtColor(i420, cv2.COLOR_YUV2BGR_I420)
+            hits += bool(zbar_decode(bgr))
+    return len(frames) * repeat / (time.perf_counter() - t0), hits
+
+
+def bench_detector(frames, repeat, **kw):
+    hits = 0
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        det = QrDetector(**kw)
+        for i420, w, h in frames:
+            hits += bool(det.detect(y_plane(i420, w, h)))
+    return len(frames) * repeat / (time.perf_counter() - t0), hits
+
+
+def time_to_first_detection(frames, **kw):
+    det = QrDetector(**kw).start()
+    t0 = time.perf_counter()
+    try:
+        for i420, w, h in frames:
+            det.submit(y_plane(i420, w, h))
+            if det.poll():
+                return time.perf_counter() - t0
+            time.sleep(FRAME_INTERVAL)
+        deadline = time.perf_counter() + 1.0
+        while time.perf_counter() < deadline:
+            if det.poll():
+                return time.perf_counter() - t0
+            time.sleep(0.005)
+        return None
+    finally:
+        det.stop()
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        raise SystemExit(1)
+    frames = load_frames(sys.argv[1])
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    if not frames:
+        print("No frames found")
+        raise SystemExit(1)
+
+    print(f"{len(frames)} frames x {repeat}")
+    print(f"{'mode':<10} {'decodes/s':>10} {'hits':>6} {'first hit s':>12}")
+
+    rate, hits = bench_bgr(frames, repeat)
+    print(f"{'bgr':<10} {rate:>10.1f} {hits:>6} {'-':>12}")
+
+    for name, kw in (("gray", {"track_roi": False}),
+                     ("gray_ds2", {"downsample": 2, "track_roi": False}),
+                     ("gray_roi", {})):
+        rate, hits = bench_detector(frames, repeat, **kw)
+        ttfd = time_to_first_detection(frames, **kw)
+        ttfd_s = f"{ttfd:.3f}" if ttfd is not None else "none"
+        print(f"{name:<10} {rate:>10.1f} {hits:>6} {ttfd_s:>12}")
+
+
+if __name__ == "__main__":
+    main()
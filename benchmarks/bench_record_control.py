@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Record start/stop latency and preview pacing of a running init.py
+  start/stop - wall time from the API call until /api/status reflects it
+  preview    - frame_timing.preview from /api/status (effective FPS, max gap
+               of the camera loop over the last window)
+  loop       - mean camera_worker iteration from /api/metrics
+
+Stops any running recording first (loop recording starts one on boot).
+Run once before and once after a camera_worker change and compare.
+
+Usage: python3 benchmarks/bench_record_control.py [--host H] [--port P] [--runs N] [--http]
+"""
+
+import re
+import ssl
+import json
+import time
+import argparse
+import statistics
+import urllib.request
+
+POLL = 0.01
+SETTLE = 3.0    # let the previous chunk's conversion start before the next run
+
+
+def make_opener(args):
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    scheme = "http" if args.http else "https"
+    base = f"{scheme}://{args.host}:{args.port}"
+
+    def call(path, method="GET"):
+        req = urllib.request.Request(base + path, method=method, data=b"" if method == "POST" else None)
+        with urllib.request.urlopen(req, timeout=10, context=None if args.http else ctx) as r:
+            return r.read()
+    return call
+
+
+def status(call):
+    return json.loads(call("/api/status"))
+
+
+def timed(call, path, method, want_recording):
+    t0 = time.monotonic()
+    call(path, method)
+    while status(call)["is_recording"] != want_recording:
+        if time.monotonic() - t0 > 10:
+            return None
+        time.sleep(POLL)
+    return (time.monotonic() - t0) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=5001)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--http", action="store_true", help="server runs without TLS")
+    args = ap.parse_args()
+    call = make_opener(args)
+
+    if status(call)["is_recording"]:
+        timed(call, "/api/stop_record", "POST", False)
+        time.sleep(SETTLE)
+
+    starts, stops = [], []
+    for _ in range(args.runs):
+        starts.append(timed(call, "/api/start_record", "GET", True))
+        time.sleep(SETTLE)
+        stops.append(timed(call, "/api/stop_record", "POST", False))
+        time.sleep(SETTLE)
+
+    for name, xs in (("start", starts), ("stop", stops)):
+        ok = [x for x in xs if x is not None]
+        if ok:
+            print(f"{name:<6} median {statistics.median(ok):7.1f} ms   max {max(ok):7.1f} ms   ({len(xs) - len(ok)} timeouts)")
+        else:
+            print(f"{name:<6} no successful runs")
+
+    preview = status(call).get("frame_timing", {}).get("preview")
+    if preview:
+        print(f"preview {preview['effective_fps']} fps, max gap {preview['max_gap_ms']} ms, "
+              f"{preview['dropped']} frames skipped over {preview['duration_s']}s")
+    else:
+        print("preview timing not available yet (needs one full window)")
+
+    text = call("/api/metrics").decode()
+    s = re.search(r"^helmet_camera_loop_seconds_sum (\S+)$", text, re.M)
+    n = re.search(r"^helmet_camera_loop_seconds_count (\S+)$", text, re.M)
+    if s and n and float(n.group(1)):
+        print(f"loop    mean {float(s.group(1)) / float(n.group(1)) * 1000:.1f} ms over {int(float(n.group(1)))} iterations")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Chunk indexing: h264scan vs ffprobe
+Scans every *.mp4 / *.h264 in a folder with h264scan and, if ffprobe is
+installed, with one ffprobe per file, and reports the time per file.
+Drop the page cache between runs for cold numbers:
+    sync; echo 3 | sudo tee /proc/sys/vm/drop_caches
+
+Usage: python3 benchmarks/bench_scan.py [folder]   (default: recordings)
+"""
+
+import os
+import sys
+import glob
+import time
+import shutil
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import h264scan
+
+
+def main():
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, "recordings")
+    files = sorted(glob.glob(os.path.join(folder, "*.mp4")) + glob.glob(os.path.join(folder, "*.h264")))
+    if not files:
+        print(f"no chunks in {folder}")
+        return
+
+    for ext in (".mp4", ".h264"):
+        group = [f for f in files if f.endswith(ext)]
+        if not group:
+            continue
+        t0 = time.perf_counter()
+        bad = sum(1 for f in group if not h264scan.scan(f).valid)
+        dt = time.perf_counter() - t0
+        print(f"h264scan {ext:<5} {len(group):4d} files  {dt / len(group) * 1000:8.2f} ms/file  ({bad} invalid)")
+
+        if shutil.which("ffprobe"):
+            t0 = time.perf_counter()
+            for f in group:
+                subprocess.run(["ffprobe", "-v", "error", "-count_packets", "-show_entries",
+                                "stream=width,height,nb_read_packets", f],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            dt = time.perf_counter() - t0
+            print(f"ffprobe  {ext:<5} {len(group):4d} files  {dt / len(group) * 1000:8.2f} ms/file")
+
+
+if __name__ == "__main__":
+    main()
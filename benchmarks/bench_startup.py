@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Startup timing for init.py
+Launches init.py as a child process and polls /api/status, reporting:
+  first_response - wall time until the web server answers at all
+  camera_ready   - wall time until status.startup.camera == "ready"
+plus the server's own BOOT timings (measured from module import).
+
+Usage: python3 benchmarks/bench_startup.py [runs] [port]
+Run on the Pi with nothing else holding the camera or the port.
+"""
+
+import os
+import sys
+import json
+import time
+import subprocess
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+TIMEOUT = 60
+
+
+def poll_status(port):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/status", timeout=1) as r:
+            return json.loads(r.read())
+    except Exception:
+        return None
+
+
+def one_run(port):
+    t0 = time.monotonic()
+    proc = subprocess.Popen([sys.executable, "init.py"], cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    first = ready = None
+    status = None
+    try:
+        while time.monotonic() - t0 < TIMEOUT:
+            status = poll_status(port)
+            if status is not None:
+                if first is None:
+                    first = time.monotonic() - t0
+                if status.get("startup", {}).get("camera") in ("ready", "error"):
+                    ready = time.monotonic() - t0
+                    break
+            time.sleep(0.02)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return first, ready, (status or {}).get("startup", {})
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 5001
+
+    print(f"{'run':<4} {'first_resp s':>12} {'camera s':>9} {'srv bound':>10} {'srv 1st':>8} {'srv cam':>8}")
+    for i in range(runs):
+        first, ready, st = one_run(port)
+        fmt = lambda v: f"{v:.2f}" if isinstance(v, (int, float)) else "-"
+        print(f"{i:<4} {fmt(first):>12} {fmt(ready):>9} {fmt(st.get('http_bound_s')):>10} "
+              f"{fmt(st.get('first_response_s')):>8} {fmt(st.get('camera_ready_s')):>8}")
+        time.sleep(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Web server load test
+Opens N concurrent /video_feed viewers against a running init.py and,
+meanwhile, hammers /api/status from a few keep-alive clients. Optionally
+starts a recording for the duration so the numbers include encoder load.
+
+Reports per-viewer frame rate, rejected viewers (503), and API latency
+percentiles.
+
+Usage: python3 benchmarks/load_test.py [--host H] [--port P] [--viewers N]
+                                       [--api-clients N] [--seconds S] [--record] [--http]
+"""
+
+import ssl
+import sys
+import time
+import argparse
+import threading
+import http.client
+
+BOUNDARY = b"--frame"
+
+
+def connect(args):
+    if args.http:
+        return http.client.HTTPConnection(args.host, args.port, timeout=10)
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    return http.client.HTTPSConnection(args.host, args.port, timeout=10, context=ctx)
+
+
+def viewer(args, stop, results, idx):
+    frames = 0
+    status = None
+    try:
+        conn = connect(args)
+        conn.request("GET", "/video_feed")
+        resp = conn.getresponse()
+        status = resp.status
+        if status == 200:
+            tail = b""
+            while not stop.is_set():
+                chunk = resp.read1(65536)
+                if not chunk:
+                    break
+                data = tail + chunk
+                frames += data.count(BOUNDARY)
+                tail = data[-(len(BOUNDARY) - 1):]    # too short to hold a whole boundary
+        conn.close()
+    except Exception as e:
+        status = status or f"error: {e}"
+    results[idx] = (status, frames)
+
+
+def api_client(args, stop, latencies):
+    conn = connect(args)    # one keep-alive connection per client
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        try:
+            conn.request("GET", "/api/status")
+            conn.getresponse().read()
+            latencies.append(time.perf_counter() - t0)
+        except Exception:
+            conn.close()
+            conn = connect(args)
+        time.sleep(0.05)
+    conn.close()
+
+
+def pct(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=5001)
+    ap.add_argument("--viewers", type=int, default=6)
+    ap.add_argument("--api-clients", type=int, default=3)
+    ap.add_argument("--seconds", type=float, default=20)
+    ap.add_argument("--record", action="store_true", help="record during the test")
+    ap.add_argument("--http", action="store_true", help="server runs without TLS")
+    args = ap.parse_args()
+
+    def get(path):
+        conn = connect(args)
+        conn.request("GET", path)
+        conn.getresponse().read()
+        conn.close()
+
+    if args.record:
+        get("/api/start_record")
+
+    stop = threading.Event()
+    results = [None] * args.viewers
+    latencies = []
+    threads = [threading.Thread(target=viewer, args=(args, stop, results, i), daemon=True)
+               for i in range(args.viewers)]
+    threads += [threading.Thread(target=api_client, args=(args, stop, latencies), daemon=True)
+                for _ in range(args.api_clients)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join(timeout=15)
+
+    if args.record:
+        get("/api/stop_record")
+
+    served = [r for r in results if r and r[0] == 200]
+    rejected = sum(1 for r in results if r and r[0] == 503)
+    print(f"viewers: {len(served)} served, {rejected} rejected (503), "
+          f"{args.viewers - len(served) - rejected} failed")
+    for i, r in enumerate(results):
+        if r and r[0] == 200:
+            print(f"  viewer {i}: {r[1] / args.seconds:.1f} fps")
+    ms = [v * 1000 for v in latencies]
+    print(f"/api/status: {len(ms)} requests, p50 {pct(ms, 50):.1f} ms, "
+          f"p95 {pct(ms, 95):.1f} ms, p99 {pct(ms, 99):.1f} ms, max {max(ms) if ms else float('nan'):.1f} ms")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
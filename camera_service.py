@@ -0,0 +1,79 @@
+"""
+Shared camera service for Smart Helmet
+One Picamera2 instance per process, configured once. QR provisioning
+(main.py) opens it, and recording mode (init.py) picks up the same
+started instance instead of re-initialising the sensor.
+"""
+
+import os
+import time
+import logging
+import threading
+
+CAM_WIDTH, CAM_HEIGHT = 1640, 1232
+LORES_WIDTH, LORES_HEIGHT = 640, 480
+FPS = 30.0
+BUFFER_COUNT = 6
+TUNING_FILE = "/usr/share/libcamera/ipa/rpi/vc4/imx219.json"
+
+_camera = None
+_opened_at = None
+_lock = threading.Lock()
+
+
+def open_camera():
+    """Return the shared, started Picamera2 (configuring it on first use)."""
+    global _camera, _opened_at
+    with _lock:
+        if _camera is not None:
+            logging.info(f"[CAMERA] ✓ Reusing running camera (opened {time.time() - _opened_at:.1f}s ago)")
+            return _camera
+
+        os.environ.setdefault("LIBCAMERA_RPI_TUNING_FILE", TUNING_FILE)
+        from picamera2 import Picamera2
+        from libcamera import Transform
+
+        t0 = time.time()
+        picam2 = Picamera2()
+        config = picam2.create_video_configuration(
+            main={"size": (CAM_WIDTH, CAM_HEIGHT), "format": "YUV420"},
+            lores={"size": (LORES_WIDTH, LORES_HEIGHT), "format": "YUV420"},
+            transform=Transform(hflip=True, vflip=True),
+            controls={"FrameRate": FPS},
+            buffer_count=BUFFER_COUNT
+        )
+        config["sensor"]["output_size"] = (CAM_WIDTH, CAM_HEIGHT)
+        picam2.configure(config)
+        picam2.start()
+        picam2.set_controls({"ScalerCrop": (0, 0, 3280, 2464)})
+        time.sleep(0.5)
+
+        _camera = picam2
+        _opened_at = time.time()
+        logging.info(f"[CAMERA] ✓ Started in {_opened_at - t0:.2f}s")
+        return _camera
+
+
+def is_open():
+    return _camera is not None
+
+
+def close_camera():
+    global _camera, _opened_at
+    with _lock:
+        if _camera is None:
+            return
+        try:
+            _camera.stop_encoder()     # recording + H.264 preview, if running
+        except Exception:
+            pass
+        try:
+            _camera.stop()
+        except Exception:
+            pass
+        try:
+            _camera.close()
+        except Exception:
+            pass
+        _camera = None
+        _opened_at = None
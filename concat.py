@@ -0,0 +1,83 @@
+"""
+Session concatenation (one MP4 per ride)
+Builds the ffmpeg command that joins a session's chunks with the concat
+demuxer. Video is always stream-copied. Audio:
+
+  all chunks have audio  -> copied as well
+  no chunk has audio     -> video only
+  mixed                  -> rebuilt with the concat filter: each chunk's audio
+                            (or silence for chunks recorded without a mic) is
+                            padded/trimmed to that chunk's video duration and
+                            encoded to AAC, so sync holds across the joins
+
+stream=True writes fragmented MP4 to stdout so the result can be sent to
+the downloader while it is produced, without a copy on disk.
+"""
+
+import os
+import re
+import glob
+from collections import namedtuple
+
+Chunk = namedtuple("Chunk", ["path", "duration", "has_audio"])
+
+CHUNK_PREFIXES = ("video_", "uploaded_", "failed_upload_")
+AUDIO_RATE = 48000
+_CHUNK_NO_RE = re.compile(r"_chunk(\d{3})\.mp4$")
+
+
+def output_name(ts):
+    """Joined file: listed as a standalone video, never picked up as a chunk of the session."""
+    return f"video_{ts}_full.mp4"
+
+
+def session_chunk_paths(folder, ts):
+    """Finished chunks of session ts in recording order (any upload state)."""
+    by_number = {}
+    for prefix in CHUNK_PREFIXES:
+        for path in glob.glob(os.path.join(folder, f"{prefix}{ts}_chunk*.mp4")):
+            m = _CHUNK_NO_RE.search(path)
+            if m:
+                by_number.setdefault(int(m.group(1)), path)
+    return [by_number[n] for n in sorted(by_number)]
+
+
+def list_file_text(paths):
+    lines = ["ffconcat version 1.0"]
+    for p in paths:
+        escaped = os.path.abspath(p).replace("'", "'\\''")
+        lines.append(f"file '{escaped}'")
+    return "\n".join(lines) + "\n"
+
+
+def build_command(chunks, list_path, output, stream=False, nice=True):
+    """ffmpeg argv joining chunks; list_path must hold list_file_text() of them."""
+    cmd = ["nice", "-n", "19"] if nice else []
+    cmd += ["ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", "concat", "-safe", "0", "-i", list_path]
+
+    with_audio = sum(1 for c in chunks if c.has_audio)
+    if with_audio == len(chunks):
+        cmd += ["-map", "0:v", "-map", "0:a", "-c", "copy"]
+    elif with_audio == 0:
+        cmd += ["-map", "0:v", "-c:v", "copy"]
+    else:
+        parts = []
+        for k, c in enumerate(chunks):
+            if c.has_audio:
+                cmd += ["-vn", "-i", c.path]
+            else:
+                cmd += ["-f", "lavfi", "-t", f"{c.duration:.3f}",
+                        "-i", f"anullsrc=r={AUDIO_RATE}:cl=mono"]
+            parts.append(f"[{k + 1}:a]aresample={AUDIO_RATE},aformat=channel_layouts=mono,"
+                         f"apad,atrim=0:{c.duration:.3f},asetpts=N/SR/TB[a{k}]")
+        joined = "".join(f"[a{k}]" for k in range(len(chunks)))
+        graph = ";".join(parts) + f";{joined}concat=n={len(chunks)}:v=0:a=1[aout]"
+        cmd += ["-filter_complex", graph, "-map", "0:v", "-map", "[aout]",
+                "-c:v", "copy", "-c:a", "aac", "-b:a", "128k"]
+
+    if stream:
+        cmd += ["-movflags", "frag_keyframe+empty_moov+default_base_moof", "-f", "mp4", "pipe:1"]
+    else:
+        cmd += ["-movflags", "+faststart", "-f", "mp4", "-y", output]
+    return cmd
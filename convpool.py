@@ -0,0 +1,64 @@
+"""
+Conversion worker pool
+ffmpeg jobs (chunk remux, startup recovery, session joins) share a small
+pool so the Pi never runs more than `workers` of them at once. Jobs run in priority
+order (lower first, FIFO within a priority), so a freshly recorded chunk
+never waits behind a backlog of recovered orphans.
+"""
+
+import queue
+import logging
+import itertools
+import threading
+from concurrent.futures import Future
+
+PRIORITY_CHUNK = 0       # chunks from the running recording
+PRIORITY_RECOVERY = 5    # orphans found at startup
+PRIORITY_BATCH = 9       # user-requested jobs such as joining a session
+
+
+class ConversionPool:
+    def __init__(self, workers=2, name="convert"):
+        self.workers = workers
+        self.name = name
+        self._q = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._threads = []
+        self._running = False
+
+    def start(self):
+        self._running = True
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"{self.name}-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self):
+        self._running = False
+        for _ in self._threads:
+            self._q.put((float("inf"), next(self._seq), None, None, None, None))
+        for t in self._threads:
+            t.join(timeout=1.0)
+        self._threads = []
+
+    def submit(self, priority, fn, *args, **kwargs):
+        future = Future()
+        self._q.put((priority, next(self._seq), future, fn, args, kwargs))
+        return future
+
+    def pending(self):
+        return self._q.qsize()
+
+    def _worker(self):
+        while self._running:
+            _, _, future, fn, args, kwargs = self._q.get()
+            if future is None:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                logging.error(f"[CONVERT] ✗ Job {getattr(fn, '__name__', fn)} failed: {e}")
+                future.set_exception(e)
@@ -0,0 +1,87 @@
+"""
+Tiny MJPEG debug stream for headless units
+Serves the latest published frame as multipart JPEG on
+http://<pi>:<port>/ . Frames are rendered/encoded only while a client
+is connected, so an idle server costs nothing on the scan loop.
+"""
+
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MjpegDebugServer:
+    """
+    publish(frame) -> store the newest raw frame (no work done here)
+    render(frame)  -> JPEG bytes, called on the client thread
+    """
+
+    def __init__(self, port, render, max_fps=10.0):
+        self.port = port
+        self._render = render
+        self._min_interval = 1.0 / max_fps
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self.clients = 0
+        self._httpd = None
+
+    def publish(self, frame):
+        if not self.clients:
+            return
+        with self._cond:
+            self._frame = frame
+            self._seq += 1
+            self._cond.notify_all()
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                server._stream(self.wfile)
+
+        self._httpd = ThreadingHTTPServer(("0.0.0.0", self.port), Handler)
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True, name="mjpeg-debug").start()
+        logging.info(f"[DEBUG] MJPEG stream on port {self.port}")
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def _stream(self, wfile):
+        with self._cond:
+            self.clients += 1
+        last_seq = -1
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._seq != last_seq, timeout=2.0)
+                    frame, last_seq = self._frame, self._seq
+                if frame is None:
+                    continue
+                t0 = time.time()
+                jpeg = self._render(frame)
+                if jpeg:
+                    wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + jpeg + b"\r\n")
+                    wfile.flush()
+                spare = self._min_interval - (time.time() - t0)
+                if spare > 0:
+                    time.sleep(spare)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self._cond:
+                self.clients -= 1
@@ -0,0 +1,207 @@
+"""
+Streaming export of recordings
+Packs whole sessions (chunks plus GPS, frame-timing and session sidecars)
+or everything recorded in a date range into one uncompressed tar, produced
+while it is sent: no temporary archive on the SD card.
+
+The archive layout depends only on the names and sizes taken when the
+export is planned, so its total length is known up front and any byte
+range can be produced directly. That gives the downloader a Content-Length,
+a progress bar and resumable (Range / If-Range) transfers. Tar rather than
+zip because a stored zip entry needs the CRC32 of every file before the
+first byte can go out.
+"""
+
+import os
+import re
+import hashlib
+from collections import namedtuple
+
+import fileserve
+
+BLOCK = 512
+NAME_MAX = 100
+PREFIX_MAX = 155
+
+Member = namedtuple("Member", ["arcname", "path", "size", "mtime"])
+
+# finished files worth offloading; temp_/audio_/incomplete_ and .part are not
+_EXPORT_RE = re.compile(
+    r"^(?:video_|gps_|(?:uploaded_|failed_upload_)(?:gps_)?|frames_|session_)"
+    r"(\d{8}_\d{6})\w*\.(?:mp4|json|csv|pts)$"
+)
+_CHUNK_MP4_RE = re.compile(r"_chunk\d{3}\.mp4$")
+_PHOTO_RE = re.compile(r"^(?:uploaded_|failed_upload_)?img_(\d{8}_\d{6})\w*\.jpg$")
+
+
+def collect(folder, sessions=(), since=None, until=None):
+    """
+    Members for an export: every file of the given session timestamps, plus
+    every recording and photo whose timestamp falls in [since, until]
+    ("YYYYMMDD" or "YYYYMMDD_HHMMSS", both inclusive). Session files go under
+    <ts>/, photos under photos/.
+    """
+    sessions = set(sessions)
+    lo = since or None
+    hi = None
+    if until:
+        hi = until if len(until) > 8 else until + "_999999"
+    members = []
+    for name in sorted(os.listdir(folder)):
+        m = _EXPORT_RE.match(name)
+        photo = m is None
+        if photo:
+            m = _PHOTO_RE.match(name)
+            if m is None:
+                continue
+        ts = m.group(1)
+        in_range = (lo is not None or hi is not None) and \
+            (lo is None or ts >= lo) and (hi is None or ts <= hi)
+        if not in_range and (photo or ts not in sessions):
+            continue
+        path = os.path.join(folder, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        arcname = f"photos/{name}" if photo else f"{ts}/{name}"
+        members.append(Member(arcname, path, st.st_size, int(st.st_mtime)))
+    # a joined video_<ts>_full.mp4 repeats its chunks: only ship it if they are gone
+    chunked = {m.arcname.split("/")[0] for m in members if _CHUNK_MP4_RE.search(m.arcname)}
+    members = [m for m in members
+               if not (m.arcname.endswith("_full.mp4") and m.arcname.split("/")[0] in chunked)]
+    members.sort(key=lambda m: m.arcname)
+    return members
+
+
+def _octal(value, width):
+    return f"{value:0{width - 1}o}".encode() + b"\0"
+
+
+def tar_header(arcname, size, mtime, mode=0o644):
+    """512-byte ustar header; sizes past 8 GiB use the GNU base-256 form."""
+    raw = arcname.encode("utf-8")
+    prefix = b""
+    if len(raw) > NAME_MAX:
+        cut = raw.rfind(b"/", 0, PREFIX_MAX + 1)
+        if cut <= 0 or len(raw) - cut - 1 > NAME_MAX:
+            raise ValueError(f"name too long for ustar: {arcname}")
+        prefix, raw = raw[:cut], raw[cut + 1:]
+    if size < 8 ** 11:
+        size_field = _octal(size, 12)
+    else:
+        size_field = b"\x80" + size.to_bytes(11, "big")
+    hdr = bytearray(BLOCK)
+    hdr[0:len(raw)] = raw
+    hdr[100:108] = _octal(mode, 8)
+    hdr[108:116] = _octal(0, 8)
+    hdr[116:124] = _octal(0, 8)
+    hdr[124:136] = size_field
+    hdr[136:148] = _octal(max(0, mtime), 12)
+    hdr[148:156] = b" " * 8
+    hdr[156:157] = b"0"
+    hdr[257:265] = b"ustar\x0000"
+    hdr[345:345 + len(prefix)] = prefix
+    hdr[148:156] = f"{sum(hdr):06o}".encode() + b"\0 "
+    return bytes(hdr)
+
+
+def _padding(size):
+    return -size % BLOCK
+
+
+class TarExport:
+    """
+    Tar of a fixed member list. Each member is a header, its data and zero
+    padding to the next 512-byte block; two zero blocks end the archive.
+    A file that shrinks or disappears mid-transfer is zero-filled (and one
+    that grows is cut) to the planned size so every offset stays valid.
+    """
+
+    def __init__(self, members, block_size=fileserve.BLOCK_SIZE):
+        self.members = list(members)
+        self.block_size = block_size
+        self._layout = []          # (offset of data, member, header bytes)
+        pos = 0
+        for m in self.members:
+            hdr = tar_header(m.arcname, m.size, m.mtime)
+            self._layout.append((pos + BLOCK, m, hdr))
+            pos += BLOCK + m.size + _padding(m.size)
+        self.size = pos + 2 * BLOCK
+        digest = hashlib.sha1()
+        for m in self.members:
+            digest.update(f"{m.arcname}\0{m.size}\0{m.mtime}\n".encode())
+        self.etag = f'"{digest.hexdigest()[:20]}"'
+
+    def plan(self, headers, download_name):
+        """(status, header list, start, length) like fileserve.plan()."""
+        out = [
+            ("Accept-Ranges", "bytes"),
+            ("ETag", self.etag),
+            ("Cache-Control", "no-store"),
+            ("Content-Type", "application/x-tar"),
+            ("Content-Disposition", f'attachment; filename="{download_name}"'),
+        ]
+        rng = None
+        if_range = headers.get("If-Range")
+        if not if_range or if_range.strip() == self.etag:
+            try:
+                rng = fileserve.parse_range(headers.get("Range"), self.size)
+            except fileserve.RangeNotSatisfiable:
+                out.append(("Content-Range", f"bytes */{self.size}"))
+                out.append(("Content-Length", "0"))
+                return 416, out, 0, 0
+        if rng is None:
+            out.append(("Content-Length", str(self.size)))
+            return 200, out, 0, self.size
+        start, end = rng
+        out.append(("Content-Range", f"bytes {start}-{end}/{self.size}"))
+        out.append(("Content-Length", str(end - start + 1)))
+        return 206, out, start, end - start + 1
+
+    def iter_range(self, start=0, length=None):
+        """Archive bytes [start, start + length) in pieces of at most block_size."""
+        end = self.size if length is None else min(self.size, start + length)
+        pos = start
+        for data_at, m, hdr in self._layout:
+            member_end = data_at + m.size + _padding(m.size)
+            if member_end <= pos:
+                continue
+            if pos >= end:
+                return
+            hdr_at = data_at - BLOCK
+            if pos < data_at:
+                piece = hdr[pos - hdr_at:min(end, data_at) - hdr_at]
+                pos += len(piece)
+                yield piece
+            data_end = data_at + m.size
+            if pos < data_end and pos < end:
+                for piece in self._file_bytes(m, pos - data_at, min(end, data_end) - pos):
+                    pos += len(piece)
+                    yield piece
+            if data_end <= pos < member_end and pos < end:
+                n = min(end, member_end) - pos
+                pos += n
+                yield b"\0" * n
+        while pos < end:
+            n = min(end - pos, self.block_size)
+            pos += n
+            yield b"\0" * n
+
+    def _file_bytes(self, member, offset, length):
+        try:
+            fd = os.open(member.path, os.O_RDONLY)
+        except OSError:
+            fd = None
+        try:
+            done = 0
+            while done < length:
+                want = min(self.block_size, length - done)
+                data = os.pread(fd, want, offset + done) if fd is not None else b""
+                if not data:
+                    data = b"\0" * want
+                done += len(data)
+                yield data
+        finally:
+            if fd is not None:
+                os.close(fd)
@@ -0,0 +1,239 @@
+"""
+Static file serving for recordings
+Byte-range requests (seeking in the browser's player, resumed downloads),
+ETag/Last-Modified revalidation so replaying a chunk costs a 304, and
+large-block reads.
+
+The app itself is served over HTTPS, where TLS encrypts in user space and
+every byte has to pass through Python. For bulk offload on the local
+network, SendfileServer serves the same files over plain HTTP and hands
+them to the kernel with sendfile(2) (socket.sendfile), so a whole chunk or
+a resumed range goes out without being copied through the interpreter.
+"""
+
+import os
+import logging
+import mimetypes
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit, parse_qs
+from email.utils import formatdate, parsedate_to_datetime
+
+BLOCK_SIZE = 256 * 1024
+CACHE_CONTROL = "private, max-age=0, must-revalidate"
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    Single byte range from a Range header -> (start, end) inclusive, or
+    None to send the whole file (missing, malformed or multi-range).
+    Raises RangeNotSatisfiable when the range lies outside the file.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[6:].strip()
+    if "," in spec or "-" not in spec:
+        return None
+    first, last = (p.strip() for p in spec.split("-", 1))
+    try:
+        if first == "":
+            n = int(last)                  # suffix: last n bytes
+            if n <= 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - n), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if start < 0 or start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def etag_for(st):
+    return f'"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def _not_modified(headers, etag, mtime):
+    inm = headers.get("If-None-Match")
+    if inm:
+        return inm.strip() == "*" or etag in [t.strip() for t in inm.split(",")]
+    ims = headers.get("If-Modified-Since")
+    if ims:
+        try:
+            return int(mtime) <= parsedate_to_datetime(ims).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _range_applies(headers, etag, mtime):
+    if_range = headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range.strip() == etag
+    try:
+        return int(mtime) <= parsedate_to_datetime(if_range).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def plan(path, headers, download_name=None):
+    """
+    Work out the response for GET/HEAD of path given request headers.
+    Returns (status, header list, start, length); length is 0 for 304/416.
+    Raises FileNotFoundError.
+    """
+    st = os.stat(path)
+    size = st.st_size
+    etag = etag_for(st)
+    out = [
+        ("Accept-Ranges", "bytes"),
+        ("ETag", etag),
+        ("Last-Modified", formatdate(st.st_mtime, usegmt=True)),
+        ("Cache-Control", CACHE_CONTROL),
+    ]
+
+    if _not_modified(headers, etag, st.st_mtime):
+        return 304, out, 0, 0
+
+    ctype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    out.append(("Content-Type", ctype))
+    if download_name:
+        out.append(("Content-Disposition", f'attachment; filename="{download_name}"'))
+
+    rng = None
+    if _range_applies(headers, etag, st.st_mtime):
+        try:
+            rng = parse_range(headers.get("Range"), size)
+        except RangeNotSatisfiable:
+            out.append(("Content-Range", f"bytes */{size}"))
+            out.append(("Content-Length", "0"))
+            return 416, out, 0, 0
+
+    if rng is None:
+        out.append(("Content-Length", str(size)))
+        return 200, out, 0, size
+
+    start, end = rng
+    out.append(("Content-Range", f"bytes {start}-{end}/{size}"))
+    out.append(("Content-Length", str(end - start + 1)))
+    return 206, out, start, end - start + 1
+
+
+class FileSlice:
+    """WSGI body: length bytes from start, read with pread in BLOCK_SIZE pieces."""
+
+    def __init__(self, path, start, length, block_size=BLOCK_SIZE):
+        self._fd = os.open(path, os.O_RDONLY)
+        self.start = start
+        self.length = length
+        self.block_size = block_size
+        try:
+            os.posix_fadvise(self._fd, start, length, os.POSIX_FADV_SEQUENTIAL)
+        except (AttributeError, OSError):
+            pass
+
+    def __iter__(self):
+        pos, end = self.start, self.start + self.length
+        while pos < end:
+            data = os.pread(self._fd, min(self.block_size, end - pos), pos)
+            if not data:
+                break
+            pos += len(data)
+            yield data
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def body(path, environ, start, length):
+    """Response iterable for a planned 200/206."""
+    wrapper = environ.get("wsgi.file_wrapper")
+    whole = start == 0 and length == os.path.getsize(path)
+    if wrapper is not None and whole and environ.get("wsgi.url_scheme") == "http":
+        f = open(path, "rb")
+        try:
+            return wrapper(f, BLOCK_SIZE)
+        except Exception:
+            f.close()
+            raise
+    return FileSlice(path, start, length)
+
+
+class _SendfileHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "smart-helmet-files"
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def do_GET(self):
+        self._serve(head=False)
+
+    def _serve(self, head):
+        url = urlsplit(self.path)
+        name = unquote(url.path[len("/data/"):]) if url.path.startswith("/data/") else ""
+        path = os.path.join(self.server.folder, name)
+        if not name or "/" in name or name.startswith(".") or not self.server.allow(name) \
+                or not os.path.isfile(path):
+            self._empty(404)
+            return
+        download = name if "download" in parse_qs(url.query, keep_blank_values=True) else None
+        try:
+            status, headers, start, length = plan(path, self.headers, download_name=download)
+        except FileNotFoundError:
+            self._empty(404)
+            return
+        self.send_response(status)
+        for k, v in headers:
+            self.send_header(k, v)
+        self.end_headers()
+        if head or status in (304, 416) or length == 0:
+            return
+        with open(path, "rb") as f:
+            # os.sendfile underneath; falls back to send() only on sockets that can't
+            self.connection.sendfile(f, offset=start, count=length)
+
+    def _empty(self, status):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, fmt, *args):
+        logging.debug("[FILES] " + fmt % args)
+
+
+class SendfileServer:
+    """
+    Plain-HTTP GET/HEAD /data/<name>[?download] for files in folder,
+    with the same Range/ETag handling as the app. allow(name) filters which
+    files are reachable.
+    """
+
+    def __init__(self, folder, host, port, allow=lambda name: True, timeout=30):
+        handler = type("Handler", (_SendfileHandler,), {"timeout": timeout})
+        self._srv = ThreadingHTTPServer((host, port), handler)
+        self._srv.daemon_threads = True
+        self._srv.folder = folder
+        self._srv.allow = allow
+        self.port = self._srv.server_address[1]
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._srv.serve_forever, daemon=True, name="sendfile-http")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._srv.shutdown()
+        self._srv.server_close()
@@ -0,0 +1,250 @@
+"""
+Fragmented MP4 live stream for the H.264 preview
+Wraps Annex-B access units from the hardware encoder (lores stream) into
+an init segment + one moof/mdat fragment per frame, which the browser
+feeds to Media Source Extensions. No transcoding, just re-boxing.
+
+Fmp4Broadcaster fans fragments out to HTTP viewers. Each viewer has a
+bounded queue; a viewer that falls behind is cut back to the next
+keyframe instead of buffering without limit.
+"""
+
+import queue
+import struct
+import threading
+
+TIMESCALE = 90000
+
+NAL_SPS = 7
+NAL_PPS = 8
+NAL_AUD = 9
+
+SAMPLE_FLAGS_SYNC = 0x02000000          # depends on nothing
+SAMPLE_FLAGS_NON_SYNC = 0x01010000      # depends on others, non-sync
+
+
+def split_nals(data):
+    """Annex-B byte stream -> list of NAL units without start codes."""
+    out = []
+    n = len(data)
+    i = data.find(b"\x00\x00\x01")
+    while 0 <= i < n:
+        start = i + 3
+        j = data.find(b"\x00\x00\x01", start)
+        end = n if j < 0 else j
+        # a 4-byte start code leaves a trailing zero on the previous NAL
+        nal = data[start:end]
+        if j >= 0 and nal.endswith(b"\x00"):
+            nal = nal[:-1]
+        if nal:
+            out.append(bytes(nal))
+        i = j
+    return out
+
+
+def _box(kind, *payload):
+    body = b"".join(payload)
+    return struct.pack(">I4s", 8 + len(body), kind) + body
+
+
+def _full_box(kind, version, flags, *payload):
+    return _box(kind, struct.pack(">I", (version << 24) | flags), *payload)
+
+
+_MATRIX = struct.pack(">9I", 0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+
+
+def codec_string(sps):
+    return "avc1.%02x%02x%02x" % (sps[1], sps[2], sps[3])
+
+
+def init_segment(sps, pps, width, height, timescale=TIMESCALE):
+    avcc = _box(b"avcC", bytes([1, sps[1], sps[2], sps[3], 0xFF, 0xE1]),
+                struct.pack(">H", len(sps)), sps,
+                b"\x01", struct.pack(">H", len(pps)), pps)
+    avc1 = _box(b"avc1",
+                b"\x00" * 6, struct.pack(">H", 1),          # data_reference_index
+                b"\x00" * 16,
+                struct.pack(">HH", width, height),
+                struct.pack(">II", 0x00480000, 0x00480000),
+                b"\x00" * 4, struct.pack(">H", 1),
+                b"\x00" * 32,
+                struct.pack(">Hh", 0x0018, -1),
+                avcc)
+    stbl = _box(b"stbl",
+                _full_box(b"stsd", 0, 0, struct.pack(">I", 1), avc1),
+                _full_box(b"stts", 0, 0, struct.pack(">I", 0)),
+                _full_box(b"stsc", 0, 0, struct.pack(">I", 0)),
+                _full_box(b"stsz", 0, 0, struct.pack(">II", 0, 0)),
+                _full_box(b"stco", 0, 0, struct.pack(">I", 0)))
+    minf = _box(b"minf",
+                _full_box(b"vmhd", 0, 1, b"\x00" * 8),
+                _box(b"dinf", _full_box(b"dref", 0, 0, struct.pack(">I", 1), _full_box(b"url ", 0, 1))),
+                stbl)
+    mdia = _box(b"mdia",
+                _full_box(b"mdhd", 0, 0, struct.pack(">IIIIHH", 0, 0, timescale, 0, 0x55C4, 0)),
+                _full_box(b"hdlr", 0, 0, b"\x00" * 4, b"vide", b"\x00" * 12, b"VideoHandler\x00"),
+                minf)
+    tkhd = _full_box(b"tkhd", 0, 3,
+                     struct.pack(">IIIII", 0, 0, 1, 0, 0), b"\x00" * 8,
+                     struct.pack(">hhhH", 0, 0, 0, 0), _MATRIX,
+                     struct.pack(">II", width << 16, height << 16))
+    mvhd = _full_box(b"mvhd", 0, 0,
+                     struct.pack(">IIIIIH", 0, 0, 1000, 0, 0x00010000, 0x0100), b"\x00" * 10,
+                     _MATRIX, b"\x00" * 24, struct.pack(">I", 2))
+    mvex = _box(b"mvex", _full_box(b"trex", 0, 0, struct.pack(">IIIII", 1, 1, 0, 0, 0)))
+    ftyp = _box(b"ftyp", b"iso5", struct.pack(">I", 512), b"iso5iso6avc1mp41")
+    return ftyp + _box(b"moov", mvhd, _box(b"trak", tkhd, mdia), mvex)
+
+
+def fragment(seq, decode_time, duration, sample, keyframe):
+    """One moof+mdat holding a single AVCC-framed sample."""
+    flags = SAMPLE_FLAGS_SYNC if keyframe else SAMPLE_FLAGS_NON_SYNC
+
+    def moof(data_offset):
+        trun = _full_box(b"trun", 0, 0x000701,
+                         struct.pack(">Ii", 1, data_offset),
+                         struct.pack(">III", duration, len(sample), flags))
+        traf = _box(b"traf",
+                    _full_box(b"tfhd", 0, 0x020000, struct.pack(">I", 1)),
+                    _full_box(b"tfdt", 1, 0, struct.pack(">Q", decode_time)),
+                    trun)
+        return _box(b"moof", _full_box(b"mfhd", 0, 0, struct.pack(">I", seq)), traf)
+
+    size = len(moof(0))
+    return moof(size + 8) + struct.pack(">I4s", 8 + len(sample), b"mdat") + sample
+
+
+class Fmp4Muxer:
+    """
+    push(annexb, pts_us, keyframe) -> fragment bytes, or None until the
+    first keyframe with SPS/PPS has been seen (init is then available).
+    """
+
+    def __init__(self, width, height, fps=30.0, timescale=TIMESCALE, start_time=0):
+        self.width = width
+        self.height = height
+        self.timescale = timescale
+        self.frame_duration = int(round(timescale / fps))
+        self.sps = None
+        self.pps = None
+        self.init = None
+        self.codec = None
+        self._seq = 0
+        self._t0 = None
+        self._base = start_time
+        self.next_time = start_time
+
+    def push(self, annexb, pts_us, keyframe):
+        sample = []
+        for nal in split_nals(annexb):
+            kind = nal[0] & 0x1F
+            if kind == NAL_SPS:
+                self.sps = nal
+            elif kind == NAL_PPS:
+                self.pps = nal
+            elif kind != NAL_AUD:
+                sample.append(struct.pack(">I", len(nal)) + nal)
+
+        if self.init is None:
+            if not (keyframe and self.sps and self.pps):
+                return None
+            self.init = init_segment(self.sps, self.pps, self.width, self.height, self.timescale)
+            self.codec = codec_string(self.sps)
+        if not sample:
+            return None
+
+        if self._t0 is None:
+            self._t0 = pts_us
+        decode_time = self._base + max(0, (pts_us - self._t0) * self.timescale // 1000000)
+        self.next_time = decode_time + self.frame_duration
+        self._seq += 1
+        return fragment(self._seq, decode_time, self.frame_duration, b"".join(sample), keyframe)
+
+
+class _Viewer:
+    def __init__(self, depth):
+        self.q = queue.Queue(maxsize=depth)
+        self.synced = False       # waiting for a keyframe
+
+
+class Fmp4Broadcaster:
+    """
+    push() from the encoder thread; viewers iterate stream() which yields
+    the init segment and then fragments starting at a keyframe.
+    """
+
+    def __init__(self, width, height, fps=30.0, queue_depth=45):
+        self._mux_args = (width, height, fps)
+        self._depth = queue_depth
+        self._lock = threading.Condition()
+        self._viewers = set()
+        self._mux = Fmp4Muxer(width, height, fps)
+        self.bytes_out = 0
+
+    @property
+    def viewers(self):
+        with self._lock:
+            return len(self._viewers)
+
+    def reset(self):
+        """Encoder restarted: new SPS/PPS, viewers resync; the timeline continues."""
+        with self._lock:
+            self._mux = Fmp4Muxer(*self._mux_args, start_time=self._mux.next_time)
+            for v in self._viewers:
+                v.synced = False
+
+    def push(self, annexb, pts_us, keyframe):
+        with self._lock:
+            had_init = self._mux.init is not None
+            frag = self._mux.push(annexb, pts_us, keyframe)
+            if frag is None:
+                return
+            if not had_init:
+                self._lock.notify_all()
+            item = (self._mux.init, frag)
+            for v in self._viewers:
+                if not v.synced:
+                    if not keyframe:
+                        continue
+                    v.synced = True
+                try:
+                    v.q.put_nowait(item)
+                except queue.Full:
+                    # lagging viewer: drop its backlog, resume at the next keyframe
+                    while not v.q.empty():
+                        try:
+                            v.q.get_nowait()
+                        except queue.Empty:
+                            break
+                    v.synced = False
+
+    def wait_codec(self, timeout):
+        """Codec string once SPS/PPS are known (None on timeout)."""
+        with self._lock:
+            self._lock.wait_for(lambda: self._mux.codec is not None, timeout)
+            return self._mux.codec
+
+    def subscribe(self):
+        v = _Viewer(self._depth)
+        with self._lock:
+            self._viewers.add(v)
+        return v
+
+    def unsubscribe(self, v):
+        with self._lock:
+            self._viewers.discard(v)
+
+    def stream(self, v, running=lambda: True):
+        sent_init = None
+        while running():
+            try:
+                init, frag = v.q.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            if init is not sent_init:        # first fragment, or encoder restarted
+                sent_init = init
+                self.bytes_out += len(init)
+                yield init
+            self.bytes_out += len(frag)
+            yield frag
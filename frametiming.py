@@ -0,0 +1,131 @@
+"""
+Frame timing for recordings
+The recording encoder's output sees every frame together with its sensor
+timestamp (µs). FrameTimeline keeps running stats from those (dropped
+frames, largest gap, effective FPS) and streams the timestamps to a
+per-chunk sidecar in mkvmerge "timestamp format v2" (one ms value per line):
+
+    frames_<ts>_chunkNNN.pts
+
+SessionManifest collects each finished chunk's summary into
+session_<ts>.json so a whole drive can be compared before/after a change.
+"""
+
+import os
+import json
+import threading
+
+SIDECAR_PREFIX = "frames_"
+SIDECAR_EXT = ".pts"
+MANIFEST_PREFIX = "session_"
+
+
+def sidecar_name(key):
+    """'20251225_211046_chunk003' -> 'frames_20251225_211046_chunk003.pts'"""
+    return f"{SIDECAR_PREFIX}{key}{SIDECAR_EXT}"
+
+
+def manifest_name(session_ts):
+    return f"{MANIFEST_PREFIX}{session_ts}.json"
+
+
+class FrameTimeline:
+    """
+    add() is called from the encoder's output thread; summary() may be read
+    from any thread (the counters are plain ints, a torn read is harmless).
+    A gap of n frame periods counts as n - 1 dropped frames.
+    """
+
+    def __init__(self, fps, sidecar_path=None):
+        self.period_us = 1000000.0 / fps
+        self.frames = 0
+        self.dropped = 0
+        self.max_gap_us = 0
+        self._first = None
+        self._last = None
+        self._f = None
+        if sidecar_path:
+            self._f = open(sidecar_path, "w", buffering=65536)
+            self._f.write("# timestamp format v2\n")
+
+    def add(self, ts_us):
+        if self._first is None:
+            self._first = ts_us
+        else:
+            gap = ts_us - self._last
+            if gap > self.max_gap_us:
+                self.max_gap_us = gap
+            missed = int(round(gap / self.period_us)) - 1
+            if missed > 0:
+                self.dropped += missed
+        self._last = ts_us
+        self.frames += 1
+        if self._f is not None:
+            self._f.write(f"{(ts_us - self._first) / 1000:.3f}\n")
+
+    @property
+    def duration_s(self):
+        if self._first is None:
+            return 0.0
+        return (self._last - self._first) / 1e6
+
+    def summary(self):
+        duration = self.duration_s
+        return {
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "max_gap_ms": round(self.max_gap_us / 1000, 1),
+            "effective_fps": round((self.frames - 1) / duration, 2) if duration > 0 else 0.0,
+            "duration_s": round(duration, 3),
+        }
+
+    def close(self):
+        if self._f is not None:
+            try:
+                self._f.close()
+            except Exception:
+                pass
+            self._f = None
+
+
+class SessionManifest:
+    """session_<ts>.json: per-chunk frame summaries plus session totals."""
+
+    def __init__(self, folder, session_ts, fps):
+        self.path = os.path.join(folder, manifest_name(session_ts))
+        self.session = session_ts
+        self.fps = fps
+        self.chunks = []
+        self._lock = threading.Lock()
+
+    def add_chunk(self, name, summary):
+        with self._lock:
+            self.chunks.append(dict(summary, name=name))
+            self._write()
+
+    def summary(self):
+        with self._lock:
+            return self._totals()
+
+    def _totals(self):
+        frames = sum(c["frames"] for c in self.chunks)
+        duration = sum(c["duration_s"] for c in self.chunks)
+        return {
+            "chunks": len(self.chunks),
+            "frames": frames,
+            "dropped": sum(c["dropped"] for c in self.chunks),
+            "max_gap_ms": max((c["max_gap_ms"] for c in self.chunks), default=0.0),
+            "effective_fps": round(frames / duration, 2) if duration > 0 else 0.0,
+            "duration_s": round(duration, 3),
+        }
+
+    def _write(self):
+        data = {"session": self.session, "expected_fps": self.fps,
+                "chunks": self.chunks, "totals": self._totals()}
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, self.path)
+        except Exception:
+            pass
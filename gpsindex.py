@@ -0,0 +1,289 @@
+"""
+GPS tracks: export and on-device index
+Reads the per-chunk GPS sidecars (gps_<key>.json, or the older .csv) and
+  - writes them out as GPX, GeoJSON or KML, one segment per chunk, so a
+    session exports as a single merged track
+  - keeps an SQLite index of every recorded point (R-tree over lat/lon/time
+    when SQLite has it, plain B-tree indexes otherwise) for "which chunks
+    passed near here" and "what was recorded between T1 and T2" queries.
+The index is a cache of the sidecars: sync() re-reads only sidecars whose
+mtime changed and drops chunks whose sidecars are gone.
+"""
+
+import os
+import re
+import csv
+import json
+import math
+import sqlite3
+import datetime
+import threading
+from collections import namedtuple
+from xml.sax.saxutils import escape
+
+INDEX_NAME = ".gps_index.sqlite"
+EARTH_RADIUS_M = 6371000.0
+M_PER_DEG_LAT = 111320.0
+
+Point = namedtuple("Point", ["t", "lat", "lon", "speed", "accuracy"])
+Track = namedtuple("Track", ["name", "points"])
+
+_SIDECAR_RE = re.compile(r"^(?:uploaded_|failed_upload_)?gps_(\d{8}_\d{6}_chunk\d{3})\.(json|csv)$")
+_EPOCH_RE = re.compile(r"^\d+(?:\.\d*)?$")
+_TIME_FORMATS = ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S", "%Y%m%d_%H%M%S", "%Y%m%d")
+
+
+def parse_time(value):
+    """Epoch seconds from a number, 'YYYY-MM-DD HH:MM:SS[.ffffff]', 'YYYYMMDD[_HHMMSS]' or ISO 8601."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value).strip()
+    # dates first: a bare YYYYMMDD is also a valid (1970) epoch number
+    for fmt in _TIME_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            continue
+    if _EPOCH_RE.match(value):
+        return float(value)
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def sidecar_key(name):
+    """'uploaded_gps_<key>.json' -> '<key>', or None."""
+    m = _SIDECAR_RE.match(name)
+    return m.group(1) if m else None
+
+
+def load_points(path):
+    """Points of one sidecar in recording order; 0,0 (no fix) and bad rows are skipped."""
+    rows = []
+    if path.endswith(".json"):
+        with open(path, "r") as f:
+            data = json.load(f)
+        for p in data.get("points", []) if isinstance(data, dict) else []:
+            rows.append((p.get("timestamp"), p.get("lat"), p.get("lon"),
+                         p.get("speed", 0.0), p.get("accuracy", 0.0)))
+    else:
+        with open(path, "r", newline="") as f:
+            for row in csv.DictReader(f):
+                rows.append((row.get("Timestamp"), row.get("Lat"), row.get("Lon"),
+                             row.get("Speed", 0.0), row.get("Accuracy", 0.0)))
+    out = []
+    for ts, lat, lon, speed, acc in rows:
+        try:
+            lat, lon = float(lat), float(lon)
+            if (lat == 0.0 and lon == 0.0) or not ts:
+                continue
+            out.append(Point(parse_time(ts), lat, lon, float(speed or 0.0), float(acc or 0.0)))
+        except (TypeError, ValueError):
+            continue
+    return out
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+# ---------- export ----------
+def _utc(t):
+    return datetime.datetime.fromtimestamp(t, datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def to_gpx(tracks, name):
+    out = ['<?xml version="1.0" encoding="UTF-8"?>',
+           '<gpx version="1.1" creator="Smart Helmet" xmlns="http://www.topografix.com/GPX/1/1">',
+           f"<trk><name>{escape(name)}</name>"]
+    for tr in tracks:
+        out.append("<trkseg>")
+        for p in tr.points:
+            out.append(f'<trkpt lat="{p.lat:.7f}" lon="{p.lon:.7f}"><time>{_utc(p.t)}</time></trkpt>')
+        out.append("</trkseg>")
+    out.append("</trk></gpx>")
+    return "\n".join(out) + "\n"
+
+
+def to_geojson(tracks):
+    features = []
+    for tr in tracks:
+        if not tr.points:
+            continue
+        coords = [[round(p.lon, 7), round(p.lat, 7)] for p in tr.points]
+        geometry = {"type": "LineString", "coordinates": coords} if len(coords) > 1 \
+            else {"type": "Point", "coordinates": coords[0]}
+        features.append({
+            "type": "Feature",
+            "geometry": geometry,
+            "properties": {
+                "name": tr.name,
+                "start": _utc(tr.points[0].t),
+                "end": _utc(tr.points[-1].t),
+                "coordTimes": [_utc(p.t) for p in tr.points],
+                "speeds": [p.speed for p in tr.points],
+            },
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def to_kml(tracks, name):
+    out = ['<?xml version="1.0" encoding="UTF-8"?>',
+           '<kml xmlns="http://www.opengis.net/kml/2.2"><Document>',
+           f"<name>{escape(name)}</name>"]
+    for tr in tracks:
+        if not tr.points:
+            continue
+        coords = " ".join(f"{p.lon:.7f},{p.lat:.7f},0" for p in tr.points)
+        out.append(f"<Placemark><name>{escape(tr.name)}</name>"
+                   f"<TimeSpan><begin>{_utc(tr.points[0].t)}</begin><end>{_utc(tr.points[-1].t)}</end></TimeSpan>"
+                   f"<LineString><tessellate>1</tessellate><coordinates>{coords}</coordinates></LineString>"
+                   "</Placemark>")
+    out.append("</Document></kml>")
+    return "\n".join(out) + "\n"
+
+
+FORMATS = {
+    "gpx": ("application/gpx+xml", to_gpx),
+    "geojson": ("application/geo+json", lambda tracks, name: json.dumps(to_geojson(tracks))),
+    "kml": ("application/vnd.google-earth.kml+xml", to_kml),
+}
+
+
+# ---------- index ----------
+class TrackIndex:
+    """
+    chunks: key -> sidecar, its mtime, first/last point time, point count
+    points: every point, with a (lat, lat, lon, lon, t, t) box in point_box
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, key TEXT UNIQUE, "
+                             "sidecar TEXT, mtime_ns INTEGER, t0 REAL, t1 REAL, points INTEGER)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS chunks_time ON chunks (t0, t1)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS points (id INTEGER PRIMARY KEY, "
+                             "chunk INTEGER, t REAL, lat REAL, lon REAL, speed REAL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS points_chunk ON points (chunk)")
+            try:
+                self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS point_box USING rtree("
+                                 "id, min_lat, max_lat, min_lon, max_lon, min_t, max_t)")
+                self.rtree = True
+            except sqlite3.OperationalError:
+                # SQLite built without R-tree: same columns, ordinary indexes
+                self._db.execute("CREATE TABLE IF NOT EXISTS point_box (id INTEGER PRIMARY KEY, "
+                                 "min_lat REAL, max_lat REAL, min_lon REAL, max_lon REAL, min_t REAL, max_t REAL)")
+                self._db.execute("CREATE INDEX IF NOT EXISTS point_box_lat ON point_box (min_lat, min_lon)")
+                self._db.execute("CREATE INDEX IF NOT EXISTS point_box_t ON point_box (min_t)")
+                self.rtree = False
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _remove(self, chunk_id):
+        self._db.execute("DELETE FROM point_box WHERE id IN (SELECT id FROM points WHERE chunk = ?)", (chunk_id,))
+        self._db.execute("DELETE FROM points WHERE chunk = ?", (chunk_id,))
+        self._db.execute("DELETE FROM chunks WHERE id = ?", (chunk_id,))
+
+    def index_chunk(self, key, path):
+        """(Re)index one sidecar; returns the number of points stored."""
+        st = os.stat(path)
+        points = load_points(path)
+        with self._lock, self._db:
+            row = self._db.execute("SELECT id FROM chunks WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._remove(row[0])
+            t0 = points[0].t if points else None
+            t1 = points[-1].t if points else None
+            cur = self._db.execute("INSERT INTO chunks (key, sidecar, mtime_ns, t0, t1, points) "
+                                   "VALUES (?, ?, ?, ?, ?, ?)",
+                                   (key, os.path.basename(path), st.st_mtime_ns, t0, t1, len(points)))
+            chunk_id = cur.lastrowid
+            for p in points:
+                pid = self._db.execute("INSERT INTO points (chunk, t, lat, lon, speed) VALUES (?, ?, ?, ?, ?)",
+                                       (chunk_id, p.t, p.lat, p.lon, p.speed)).lastrowid
+                self._db.execute("INSERT INTO point_box VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 (pid, p.lat, p.lat, p.lon, p.lon, p.t, p.t))
+        return len(points)
+
+    def remove_chunk(self, key):
+        with self._lock, self._db:
+            row = self._db.execute("SELECT id FROM chunks WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._remove(row[0])
+
+    def sync(self, folder):
+        """Bring the index in line with the sidecars in folder -> (reindexed, removed)."""
+        sidecars = {}
+        for name in os.listdir(folder):
+            key = sidecar_key(name)
+            if key and (key not in sidecars or name.endswith(".json")):
+                sidecars[key] = name
+        with self._lock:
+            known = {k: (s, m) for k, s, m in self._db.execute("SELECT key, sidecar, mtime_ns FROM chunks")}
+        reindexed = removed = 0
+        for key, name in sidecars.items():
+            path = os.path.join(folder, name)
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            if known.get(key) != (name, mtime_ns):
+                try:
+                    self.index_chunk(key, path)
+                    reindexed += 1
+                except (OSError, ValueError):
+                    continue
+        for key in set(known) - set(sidecars):
+            self.remove_chunk(key)
+            removed += 1
+        return reindexed, removed
+
+    def near(self, lat, lon, radius_m, since=None, until=None, limit=100):
+        """Chunks with a point within radius_m of (lat, lon), closest first."""
+        dlat = radius_m / M_PER_DEG_LAT
+        dlon = radius_m / (M_PER_DEG_LAT * max(0.01, math.cos(math.radians(lat))))
+        t_lo = -1e18 if since is None else since
+        t_hi = 1e18 if until is None else until
+        # R-tree boxes are float32 rounded outwards: overlap tests give a
+        # superset, the exact lat/lon/t checks happen on the points row
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT c.key, p.t, p.lat, p.lon FROM point_box b "
+                "JOIN points p ON p.id = b.id JOIN chunks c ON c.id = p.chunk "
+                "WHERE b.max_lat >= ? AND b.min_lat <= ? AND b.max_lon >= ? AND b.min_lon <= ? "
+                "AND b.max_t >= ? AND b.min_t <= ? AND p.t BETWEEN ? AND ?",
+                (lat - dlat, lat + dlat, lon - dlon, lon + dlon, t_lo, t_hi, t_lo, t_hi)).fetchall()
+        best = {}
+        for key, t, plat, plon in rows:
+            d = distance_m(lat, lon, plat, plon)
+            if d <= radius_m and (key not in best or d < best[key]["distance_m"]):
+                best[key] = {"chunk": key, "distance_m": round(d, 1), "t": t, "lat": plat, "lon": plon}
+        return sorted(best.values(), key=lambda r: r["distance_m"])[:limit]
+
+    def between(self, since, until):
+        """Chunks whose track overlaps [since, until], in time order."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, t0, t1, points FROM chunks WHERE t0 <= ? AND t1 >= ? ORDER BY t0",
+                (until, since)).fetchall()
+        return [{"chunk": k, "t0": t0, "t1": t1, "points": n} for k, t0, t1, n in rows]
+
+    def track(self, key):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT p.t, p.lat, p.lon, p.speed FROM points p JOIN chunks c ON c.id = p.chunk "
+                "WHERE c.key = ? ORDER BY p.id", (key,)).fetchall()
+        return [Point(t, lat, lon, speed, 0.0) for t, lat, lon, speed in rows]
+
+    def stats(self):
+        with self._lock:
+            chunks, points = self._db.execute("SELECT COUNT(*), COALESCE(SUM(points), 0) FROM chunks").fetchone()
+        return {"chunks": chunks, "points": points, "rtree": self.rtree}
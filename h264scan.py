@@ -0,0 +1,320 @@
+"""
+H.264 / MP4 scanner
+Reads what the media list, recovery and upload checks need straight from
+the files, without spawning ffprobe per chunk:
+
+  *.h264  memory-mapped Annex-B walk: frames, keyframes and their offsets, SPS resolution
+          and how much of the file ends on a complete NAL unit
+  *.mp4   box walk over the headers only: duration, frames, keyframes,
+          resolution, audio track, and where the box structure breaks
+
+Both return a StreamInfo; ScanCache keeps results per (size, mtime) so
+listing hundreds of chunks only reads each file once.
+"""
+
+import os
+import mmap
+import struct
+import threading
+from collections import OrderedDict, namedtuple
+
+START_CODE = b"\x00\x00\x01"
+
+NAL_SLICE = 1
+NAL_IDR = 5
+NAL_SPS = 7
+
+StreamInfo = namedtuple("StreamInfo", [
+    "kind",          # "h264" | "mp4"
+    "size",
+    "width",
+    "height",
+    "frames",
+    "keyframes",     # keyframe count (h264: IDR pictures; mp4: sync samples)
+    "duration",      # seconds (h264: frames / fps)
+    "has_audio",
+    "valid_bytes",   # bytes up to the end of the last complete NAL / box
+    "valid",         # playable as is
+    "error",
+    "idr_offsets",   # h264: byte offset of each IDR NAL; empty for mp4
+], defaults=((),))
+
+
+# ---------- SPS ----------
+class _Bits:
+    def __init__(self, data):
+        # drop emulation prevention bytes (00 00 03)
+        self.data = data.replace(b"\x00\x00\x03", b"\x00\x00")
+        self.pos = 0
+
+    def u(self, n):
+        v = 0
+        for _ in range(n):
+            byte = self.data[self.pos >> 3]
+            v = (v << 1) | ((byte >> (7 - (self.pos & 7))) & 1)
+            self.pos += 1
+        return v
+
+    def ue(self):
+        zeros = 0
+        while self.u(1) == 0:
+            zeros += 1
+        return (1 << zeros) - 1 + self.u(zeros)
+
+    def se(self):
+        k = self.ue()
+        return (k + 1) // 2 if k & 1 else -(k // 2)
+
+
+def parse_sps(nal):
+    """SPS NAL (with its header byte) -> (width, height)."""
+    b = _Bits(nal[1:])
+    profile = b.u(8)
+    b.u(16)                                   # constraint flags, level
+    b.ue()                                    # seq_parameter_set_id
+    chroma_format = 1
+    if profile in (100, 110, 122, 244, 44, 83, 86, 118, 128, 138, 139, 134, 135):
+        chroma_format = b.ue()
+        if chroma_format == 3:
+            b.u(1)
+        b.ue()
+        b.ue()                                # bit depths
+        b.u(1)
+        if b.u(1):                            # scaling matrices
+            for i in range(8 if chroma_format != 3 else 12):
+                if b.u(1):
+                    last = nxt = 8
+                    for _ in range(16 if i < 6 else 64):
+                        if nxt:
+                            nxt = (last + b.se()) % 256
+                        last = nxt or last
+    b.ue()                                    # log2_max_frame_num
+    poc_type = b.ue()
+    if poc_type == 0:
+        b.ue()
+    elif poc_type == 1:
+        b.u(1)
+        b.se()
+        b.se()
+        for _ in range(b.ue()):
+            b.se()
+    b.ue()                                    # max_num_ref_frames
+    b.u(1)
+    width_mbs = b.ue() + 1
+    height_units = b.ue() + 1
+    frame_mbs_only = b.u(1)
+    if not frame_mbs_only:
+        b.u(1)
+    b.u(1)                                    # direct_8x8_inference
+    width = width_mbs * 16
+    height = (2 - frame_mbs_only) * height_units * 16
+    if b.u(1):                                # frame cropping
+        left, right, top, bottom = b.ue(), b.ue(), b.ue(), b.ue()
+        cx = 2 if chroma_format in (1, 2) else 1
+        cy = (2 if chroma_format == 1 else 1) * (2 - frame_mbs_only)
+        width -= cx * (left + right)
+        height -= cy * (top + bottom)
+    return width, height
+
+
+# ---------- Annex-B ----------
+def scan_h264(path, fps=30.0):
+    size = os.path.getsize(path)
+    width = height = None
+    frames = 0
+    idr = []
+    if size == 0:
+        return StreamInfo("h264", 0, None, None, 0, 0, 0.0, False, 0, False, "empty")
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        i = m.find(START_CODE)
+        last_start = -1
+        short_tail = False
+        while i >= 0:
+            hdr = i + 3
+            last_start = i - 1 if i > 0 and m[i - 1] == 0 else i
+            if hdr >= size:
+                short_tail = True          # start code with nothing after it
+                break
+            kind = m[hdr] & 0x1F
+            if kind in (NAL_SLICE, NAL_IDR):
+                # first_mb_in_slice == 0 (ue "1") marks the first slice of a picture
+                if hdr + 1 < size and m[hdr + 1] & 0x80:
+                    frames += 1
+                    if kind == NAL_IDR:
+                        idr.append(last_start)
+            elif kind == NAL_SPS and width is None:
+                end = m.find(START_CODE, hdr)
+                try:
+                    width, height = parse_sps(m[hdr:end if end > 0 else size])
+                except IndexError:
+                    pass
+            i = m.find(START_CODE, hdr)
+        # every NAL ends in the RBSP stop bit, so a final NAL ending in a zero
+        # byte was cut off (power loss leaves zero-filled tail blocks); one
+        # ending in data is kept: Annex B can't tell us more without decoding
+        short_tail = short_tail or (last_start >= 0 and m[size - 1] == 0)
+    if last_start < 0:
+        valid_bytes = 0
+    else:
+        valid_bytes = last_start if short_tail else size
+    error = None
+    if width is None:
+        error = "no SPS"
+    elif not idr:
+        error = "no keyframe"
+    return StreamInfo("h264", size, width, height, frames, len(idr), frames / fps if fps else 0.0,
+                      False, valid_bytes, error is None, error, tuple(idr))
+
+
+# ---------- MP4 ----------
+def _boxes(data, start=0, end=None):
+    """(kind, payload_start, payload_end) for each box in data[start:end]."""
+    end = len(data) if end is None else end
+    i = start
+    while i + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, i)
+        hdr = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, i + 8)[0]
+            hdr = 16
+        elif size == 0:
+            size = end - i
+        if size < hdr or i + size > end:
+            return
+        yield kind, i + hdr, i + size
+        i += size
+
+
+def _child(data, start, end, kind):
+    for k, s, e in _boxes(data, start, end):
+        if k == kind:
+            return s, e
+    return None
+
+
+def _trak_info(moov, s, e):
+    info = {"handler": None, "width": 0, "height": 0, "duration": 0.0, "samples": 0, "sync": None}
+    tkhd = _child(moov, s, e, b"tkhd")
+    if tkhd:
+        info["width"] = struct.unpack_from(">I", moov, tkhd[1] - 8)[0] >> 16
+        info["height"] = struct.unpack_from(">I", moov, tkhd[1] - 4)[0] >> 16
+    mdia = _child(moov, s, e, b"mdia")
+    if not mdia:
+        return info
+    mdhd = _child(moov, *mdia, b"mdhd")
+    if mdhd:
+        version = moov[mdhd[0]]
+        if version == 1:
+            timescale, duration = struct.unpack_from(">IQ", moov, mdhd[0] + 20)
+        else:
+            timescale, duration = struct.unpack_from(">II", moov, mdhd[0] + 12)
+        if timescale:
+            info["duration"] = duration / timescale
+    hdlr = _child(moov, *mdia, b"hdlr")
+    if hdlr:
+        info["handler"] = bytes(moov[hdlr[0] + 8:hdlr[0] + 12])
+    minf = _child(moov, *mdia, b"minf")
+    stbl = _child(moov, *minf, b"stbl") if minf else None
+    if stbl:
+        stsz = _child(moov, *stbl, b"stsz")
+        if stsz:
+            info["samples"] = struct.unpack_from(">I", moov, stsz[0] + 8)[0]
+        stss = _child(moov, *stbl, b"stss")
+        if stss:
+            info["sync"] = struct.unpack_from(">I", moov, stss[0] + 4)[0]
+    return info
+
+
+def scan_mp4(path):
+    size = os.path.getsize(path)
+    moov = None
+    have_mdat = False
+    valid_bytes = 0
+    error = None
+    with open(path, "rb") as f:
+        pos = 0
+        while pos + 8 <= size:
+            f.seek(pos)
+            hdr = f.read(16)
+            box_size, kind = struct.unpack_from(">I4s", hdr)
+            if box_size == 1:
+                box_size = struct.unpack_from(">Q", hdr, 8)[0]
+            elif box_size == 0:
+                box_size = size - pos
+            if box_size < 8 or pos + box_size > size:
+                error = f"{kind.decode('latin-1')} box truncated"
+                break
+            if kind == b"moov":
+                f.seek(pos)
+                moov = f.read(box_size)
+            elif kind == b"mdat":
+                have_mdat = True
+            pos += box_size
+            valid_bytes = pos
+        else:
+            if pos != size:
+                error = "trailing bytes"
+
+    width = height = None
+    frames = keyframes = 0
+    duration = 0.0
+    has_audio = False
+    if moov is None:
+        error = error or "no moov"
+    else:
+        for kind, s, e in _boxes(moov, 8):
+            if kind != b"trak":
+                continue
+            t = _trak_info(moov, s, e)
+            if t["handler"] == b"vide" and width is None:
+                width, height = t["width"], t["height"]
+                frames = t["samples"]
+                keyframes = frames if t["sync"] is None else t["sync"]
+                duration = t["duration"]
+            elif t["handler"] == b"soun":
+                has_audio = True
+        if width is None:
+            error = error or "no video track"
+    if not have_mdat:
+        error = error or "no mdat"
+    return StreamInfo("mp4", size, width, height, frames, keyframes, duration, has_audio,
+                      valid_bytes, error is None, error)
+
+
+def scan(path, fps=30.0):
+    if path.endswith(".mp4"):
+        return scan_mp4(path)
+    return scan_h264(path, fps)
+
+
+class ScanCache:
+    """scan() results keyed by path, reused while size and mtime are unchanged."""
+
+    def __init__(self, max_entries=2048, fps=30.0):
+        self.max_entries = max_entries
+        self.fps = fps
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        stamp = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            hit = self._entries.get(path)
+            if hit and hit[0] == stamp:
+                self._entries.move_to_end(path)
+                return hit[1]
+        try:
+            info = scan(path, self.fps)
+        except (OSError, ValueError, struct.error) as e:
+            info = StreamInfo(os.path.splitext(path)[1].lstrip("."), st.st_size, None, None, 0,
+                              0, 0.0, False, 0, False, str(e))
+        with self._lock:
+            self._entries[path] = (stamp, info)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return info
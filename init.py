@@ -16,22 +16,56 @@ import shutil
 import logging
 import logging.handlers
 import re
-import cv2
-import numpy as np
 import subprocess
+import queue
+import uuid
+import tempfile
+
+# startup timings are measured from here (also covers an in-process handoff from main.py)
+BOOT_T0 = time.monotonic()
+
+# cv2/numpy, picamera2 and the uploader (requests) are imported where they are
+# first used so the web server can bind before the heavy modules load
 from flask import Flask, Response, render_template, request, jsonify, send_from_directory
-from picamera2 import Picamera2
-from picamera2.encoders import H264Encoder
-from libcamera import Transform
-from uploader import upload_to_cloud
-from uploader import upload_image_to_cloud
+from retention import ChunkRetention, chunk_key, chunk_files
+from camera_service import open_camera, close_camera, CAM_WIDTH, LORES_WIDTH, LORES_HEIGHT, FPS
+from photo import build_gps_exif, insert_exif, PhotoEngine
+from audio_capture import AudioCapture, AlsaDevice, make_writer, audio_extension
+from led import LedController
+import tls
+from webserver import WebServer
+import fileserve
+import thumbs
+from thumbs import ThumbnailCache
+from fmp4 import Fmp4Broadcaster
+import metrics
+import recorder_control as rc
+import h264scan
+from convpool import ConversionPool, PRIORITY_CHUNK, PRIORITY_RECOVERY, PRIORITY_BATCH
+import concat
+import export
+import gpsindex
+from frametiming import FrameTimeline, SessionManifest, sidecar_name, manifest_name
 
 VERSION = "v27.13-ULTIMATE"
 RECORD_FOLDER = "recordings"
 LOG_DIR = "logs"
 PORT = 5001
-CAM_WIDTH, CAM_HEIGHT = 1640, 1232
-FPS = 30.0
+HTTPS_ENABLED = True      # falls back to HTTP if the certificate can't be set up
+FILES_HTTP_PORT = 0       # e.g. 5003: UNENCRYPTED /data/<file> with sendfile for LAN offload (0 = off)
+STREAM_MAX_VIEWERS = 4    # each /video_feed viewer holds one server worker
+STREAM_MAX_FPS = 15
+# H.264 live view: hardware encode of the lores stream, served as fragmented MP4
+H264_PREVIEW_ENABLED = True
+PREVIEW_H264_BITRATE = 400000
+PREVIEW_KEYFRAME_INTERVAL = 15   # frames; a new viewer waits at most this long
+PREVIEW_IDLE_STOP_SEC = 5        # keep the encoder briefly for page reloads
+THUMB_DIR = os.path.join(RECORD_FOLDER, ".thumbs")
+THUMB_CACHE_MB = 32
+PREVIEW_TIMING_WINDOW_SEC = 60   # /api/status reports preview pacing per window
+RECORD_COMMAND_TIMEOUT = 5.0     # /api/start_record and /api/stop_record wait this long
+CONVERT_WORKERS = 2              # concurrent ffmpeg jobs (chunks first, then recovery)
+CONCAT_STREAMS_MAX = 1           # joined sessions streamed straight to a downloader at once
 STREAM_HEIGHT = 480
 VIDEO_BITRATE = 1500000
 
@@ -39,13 +73,34 @@ AUTO_CHUNK_ENABLED = True
 CHUNK_SIZE_MB = 60
 CHUNK_CHECK_INTERVAL = 10
 
+# Loop (always-on) recording: oldest non-locked chunks are overwritten
+LOOP_RECORDING_ENABLED = False
+LOOP_MAX_FOOTPRINT_MB = 8 * 1024
+INCIDENT_BEFORE_SEC = 60
+INCIDENT_AFTER_SEC = 30
+
 AUDIO_ENABLED_DEFAULT = True
 AUDIO_SAMPLE_RATE = 44100
 AUDIO_CHANNELS = 1
 USB_MIC_DEVICE = "hw:3,0"
+AUDIO_PERIOD_FRAMES = 1024
+AUDIO_CODEC = "aac"        # "aac" | "opus" encode live, "wav" = raw PCM
+AUDIO_BITRATE = "96k"
+AUDIO_EXT = audio_extension(AUDIO_CODEC)
 
 GPS_RECORD_INTERVAL = 5.0
 
+PHOTO_JPEG_QUALITY = 92
+PHOTO_ENCODE_WORKERS = 2
+
+# Status LED: heartbeat while recording, double blink while uploading,
+# triple blink when free space drops below LOW_STORAGE_GB, N blinks = error N
+LED_PIN = 17
+LOW_STORAGE_GB = 1.0
+LED_STORAGE_CHECK_INTERVAL = 30
+LED_ERROR_CAMERA = 2
+LED_ERROR_RECORD = 3
+
 DEVICE_ID = "smart_hm_02"
 
 def get_serial_number():
@@ -64,8 +119,6 @@ DISCOVERY_PORT = 5002
 MAGIC_WORD = "WHO_IS_RPI_CAM?"
 RESPONSE_PREFIX = "I_AM_RPI_CAM"
 
-os.environ["LIBCAMERA_RPI_TUNING_FILE"] = "/usr/share/libcamera/ipa/rpi/vc4/imx219.json"
-
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 log = logging.getLogger('werkzeug')
 log.setLevel(logging.ERROR)
@@ -93,24 +146,26 @@ app = Flask(__name__)
 frame_lock = threading.Lock()
 frame_condition = threading.Condition(frame_lock)
 latest_frame_jpeg = None
+latest_frame_seq = 0
+latest_lores_yuv = None
+stream_viewers = 0
+live_h264 = Fmp4Broadcaster(LORES_WIDTH, LORES_HEIGHT, FPS)
+preview_idle_since = None
 
 current_gps_data = {"lat": 0.0, "lon": 0.0, "accuracy": 0.0, "speed": 0.0}
 
+camera = None
+
 app_running = True
-req_start_rec = False
-req_stop_rec = False
-is_recording_active = False
-recording_start_time = None
+# start/stop go through the recorder's command queue; only camera_worker changes its state
+recorder = rc.RecorderControl()
 
 audio_enabled = AUDIO_ENABLED_DEFAULT
-audio_process = None
+audio_capture = None
 
 upload_status = {}
 upload_status_lock = threading.Lock()
 
-chunk_number = 0
-last_chunk_check = 0
-
 current_recording_files = []
 current_recording_lock = threading.Lock()
 
@@ -120,6 +175,97 @@ converting_files_lock = threading.Lock()
 incomplete_files = set()
 incomplete_files_lock = threading.Lock()
 
+conversion_pool = ConversionPool(CONVERT_WORKERS)
+# background remux of orphaned streams found at startup
+recovery_progress = {"state": "idle", "total": 0, "done": 0, "recovered": 0, "salvaged": 0, "failed": 0}
+recovery_lock = threading.Lock()
+media_scan = h264scan.ScanCache(fps=FPS)   # duration/integrity without ffprobe
+
+# /api/concat_session jobs: id -> state; streamed joins are limited separately
+concat_jobs = {}
+concat_jobs_lock = threading.Lock()
+concat_streams = threading.BoundedSemaphore(CONCAT_STREAMS_MAX)
+
+gps_index = None   # SQLite index of GPS sidecars, built by startup_worker
+files_http = None  # fileserve.SendfileServer, started in run()
+
+loop_retention = ChunkRetention(
+    RECORD_FOLDER,
+    LOOP_MAX_FOOTPRINT_MB * 1024 * 1024 if LOOP_RECORDING_ENABLED else None
+)
+incident_upload_queue = queue.Queue()
+
+# frame timing: current chunk (sensor timestamps from the encoder), session, preview pacing
+chunk_timeline = None
+session_manifest = None
+preview_timing = None
+
+led = None
+led_error = None
+led_state_event = threading.Event()
+
+# staged startup: HTTP binds first, recovery/audio/camera come up in the background
+startup = {
+    "http": "pending",
+    "recovery": "pending",
+    "audio": "pending",
+    "camera": "pending",
+    "http_bound_s": None,
+    "first_response_s": None,
+    "camera_ready_s": None,
+}
+services_ready = threading.Event()   # recovery + audio done, safe to start recording
+thumb_cache = None
+
+# hot-path metrics, scraped as Prometheus text from /api/metrics
+M_CAMERA_LOOP = metrics.REGISTRY.histogram(
+    "helmet_camera_loop_seconds", "camera_worker loop iteration time",
+    buckets=(0.005, 0.01, 0.02, 0.033, 0.05, 0.1, 0.25, 0.5, 1))
+M_JPEG_ENCODE = metrics.REGISTRY.histogram(
+    "helmet_jpeg_encode_seconds", "lores YUV -> JPEG for /video_feed",
+    buckets=(0.002, 0.005, 0.01, 0.02, 0.033, 0.05, 0.1))
+M_MJPEG_FRAMES = metrics.REGISTRY.counter(
+    "helmet_mjpeg_frames_sent_total", "MJPEG frames written to /video_feed clients")
+M_MJPEG_CLIENT_FRAMES = metrics.REGISTRY.histogram(
+    "helmet_mjpeg_client_frames", "frames served per /video_feed client",
+    buckets=(0, 10, 100, 1000, 10000, 100000))
+M_CHUNK_ROTATION = metrics.REGISTRY.histogram(
+    "helmet_chunk_rotation_seconds", "encoder stop -> next chunk recording")
+M_CONVERT = metrics.REGISTRY.histogram(
+    "helmet_convert_seconds", "ffmpeg remux time per chunk")
+M_UPLOAD_BYTES = metrics.REGISTRY.counter(
+    "helmet_upload_bytes_total", "bytes uploaded successfully", ("kind",))
+M_UPLOAD_SECONDS = metrics.REGISTRY.histogram(
+    "helmet_upload_seconds", "upload duration", ("kind", "result"))
+metrics.REGISTRY.gauge("helmet_incident_upload_queue", "incident chunks waiting for upload",
+                       fn=lambda: incident_upload_queue.qsize())
+metrics.REGISTRY.gauge("helmet_conversions_running", "chunks being converted to MP4",
+                       fn=lambda: len(converting_files))
+metrics.REGISTRY.gauge("helmet_conversion_queue", "conversion jobs waiting for a worker",
+                       fn=lambda: conversion_pool.pending())
+metrics.REGISTRY.gauge("helmet_thumbnails_queued", "thumbnails waiting to be generated",
+                       fn=lambda: thumb_cache.stats()["queued"] if thumb_cache else 0)
+metrics.REGISTRY.gauge("helmet_mjpeg_viewers", "open /video_feed streams",
+                       fn=lambda: stream_viewers)
+metrics.REGISTRY.gauge("helmet_h264_viewers", "open /api/live.mp4 streams",
+                       fn=lambda: live_h264.viewers)
+
+def _boot_elapsed():
+    return round(time.monotonic() - BOOT_T0, 3)
+
+def _mark_startup(stage, state, timing_key=None):
+    startup[stage] = state
+    if timing_key:
+        startup[timing_key] = _boot_elapsed()
+        logging.info(f"[BOOT] {stage} {state} after {startup[timing_key]}s")
+
+@app.after_request
+def _record_first_response(response):
+    if startup["first_response_s"] is None:
+        startup["first_response_s"] = _boot_elapsed()
+        logging.info(f"[BOOT] First HTTP response after {startup['first_response_s']}s")
+    return response
+
 def extract_timestamp(filename):
     match = re.search(r'(\d{8}_\d{6})', filename)
     return match.group(1) if match else None
@@ -169,6 +315,13 @@ def _find_existing_gps_json_for_video(filename):
             return p
     return None
 
+def _find_existing_gps_csv_for_video(filename):
+    for name in _gps_json_variations_for_video(filename):
+        p = os.path.join(RECORD_FOLDER, name[:-len('.json')] + '.csv')
+        if os.path.exists(p):
+            return p
+    return None
+
 def recover_orphaned_files():
     orphaned = glob.glob(os.path.join(RECORD_FOLDER, "temp_*.h264"))
     if not orphaned:
@@ -202,12 +355,13 @@ def recover_orphaned_files():
                 incomplete_csv_path = os.path.join(RECORD_FOLDER, incomplete_csv)
                 os.rename(csv_path, incomplete_csv_path)
 
-            audio_name = temp_name.replace('temp_', 'audio_').replace('.h264', '.wav')
-            audio_path = os.path.join(RECORD_FOLDER, audio_name)
-            if os.path.exists(audio_path):
-                incomplete_audio = audio_name.replace('audio_', 'incomplete_audio_')
-                incomplete_audio_path = os.path.join(RECORD_FOLDER, incomplete_audio)
-                os.rename(audio_path, incomplete_audio_path)
+            for ext in ('.wav', '.aac', '.opus'):
+                audio_name = temp_name.replace('temp_', 'audio_').replace('.h264', ext)
+                audio_path = os.path.join(RECORD_FOLDER, audio_name)
+                if os.path.exists(audio_path):
+                    incomplete_audio = audio_name.replace('audio_', 'incomplete_audio_')
+                    incomplete_audio_path = os.path.join(RECORD_FOLDER, incomplete_audio)
+                    os.rename(audio_path, incomplete_audio_path)
 
             logging.info(f"[RECOVERY] ⚠️ Marked as incomplete: {incomplete_name}")
 
@@ -216,131 +370,383 @@ def recover_orphaned_files():
 
     logging.info(f"[RECOVERY] ✓ Marked {len(orphaned)} orphaned files as incomplete")
 
-def generate_ssl_certificates():
-    if os.path.exists('cert.pem') and os.path.exists('key.pem'):
-        logging.info("[SSL] ✓ Certificates already exist")
-        return True
+def queue_orphan_remux():
+    """Remux every incomplete_*.h264 (this boot's and older ones) on the conversion pool."""
+    orphans = sorted(glob.glob(os.path.join(RECORD_FOLDER, "incomplete_*.h264")))
+    with recovery_lock:
+        recovery_progress.update(state="running" if orphans else "done", total=len(orphans),
+                                 done=0, recovered=0, salvaged=0, failed=0)
+    for path in orphans:
+        conversion_pool.submit(PRIORITY_RECOVERY, _recover_orphan, path)
+    if orphans:
+        logging.info(f"[RECOVERY] Queued {len(orphans)} orphan(s) for remux")
+
+def _recover_orphan(h264_path):
+    name = os.path.basename(h264_path)
+    key = chunk_key(name)
+    mp4_path = os.path.join(RECORD_FOLDER, f"video_{key}.mp4")
+    audio_path = ""
+    for ext in ('.wav', '.aac', '.opus'):
+        p = os.path.join(RECORD_FOLDER, f"incomplete_audio_{key}{ext}")
+        if os.path.exists(p):
+            audio_path = p
+            break
 
-    logging.info("[SSL] Generating self-signed certificates...")
+    with converting_files_lock:
+        converting_files.add(os.path.basename(mp4_path))
+    ok = False
     try:
-        cmd = [
-            'openssl', 'req', '-x509', '-newkey', 'rsa:2048',
-            '-keyout', 'key.pem', '-out', 'cert.pem',
-            '-days', '365', '-nodes',
-            '-subj', '/C=IN/ST=Maharashtra/L=Nagpur/O=ThinkingRobot/OU=SmartHelmet/CN=raspberrypi'
-        ]
-
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0 and os.path.exists('cert.pem') and os.path.exists('key.pem'):
-            os.chmod('key.pem', 0o600)
-            os.chmod('cert.pem', 0o600)
-            logging.info("[SSL] ✓ Certificates generated successfully")
-            return True
+        mtime = os.path.getmtime(h264_path)
+        info = h264scan.scan_h264(h264_path, FPS)
+        keep = info.valid_bytes if info.valid else 0
+        if keep and keep < info.size:
+            # only when the last NAL is provably cut off (zero-filled tail or
+            # a bare start code); a stream ending on a whole NAL is left as is
+            os.truncate(h264_path, keep)
+            with recovery_lock:
+                recovery_progress["salvaged"] += 1
+            logging.info(f"[RECOVERY] Truncated {name} to last complete NAL ({info.size - keep} bytes dropped)")
+        if not info.valid:
+            logging.warning(f"[RECOVERY] ⚠️ {name}: {info.error}")
+        if keep and _remux(h264_path, audio_path, mp4_path):
+            for ext in ('.json', '.csv'):
+                sidecar = os.path.join(RECORD_FOLDER, f"incomplete_gps_{key}{ext}")
+                if os.path.exists(sidecar):
+                    os.rename(sidecar, os.path.join(RECORD_FOLDER, f"gps_{key}{ext}"))
+            with incomplete_files_lock:
+                incomplete_files.discard(name)
+            _register_finished_chunk(mp4_path, (mtime, mtime))
+            ok = True
+            logging.info(f"[RECOVERY] ✓ Recovered {os.path.basename(mp4_path)}")
         else:
-            logging.warning(f"[SSL] ✗ Certificate generation failed: {result.stderr}")
-            return False
+            logging.warning(f"[RECOVERY] ⚠️ Could not remux {name}, left as incomplete")
     except Exception as e:
-        logging.warning(f"[SSL] ✗ Could not generate certificates: {e}")
-        return False
+        logging.error(f"[RECOVERY] ✗ {name}: {e}")
+    finally:
+        with converting_files_lock:
+            converting_files.discard(os.path.basename(mp4_path))
+        with recovery_lock:
+            recovery_progress["recovered" if ok else "failed"] += 1
+            recovery_progress["done"] += 1
+            if recovery_progress["done"] >= recovery_progress["total"]:
+                recovery_progress["state"] = "done"
+    return ok
 
-def start_audio_recording(audio_file):
-    global audio_process
-    if not audio_enabled:
+def generate_ssl_certificates():
+    """Server SSL context from a reused/renewed ECDSA cert, or None for plain HTTP."""
+    if not HTTPS_ENABLED:
+        return None
+    try:
+        tls.ensure_certificate()
+        ctx = tls.make_server_context()
+    except Exception as e:
+        logging.warning(f"[SSL] ✗ Could not set up TLS, serving HTTP: {e}")
         return None
+    tls.CertificateRenewer(ctx).start()
+    return ctx
 
+def init_audio_capture():
+    global audio_capture
     try:
-        check_cmd = ["arecord", "-l"]
-        result = subprocess.run(check_cmd, capture_output=True, text=True)
-        if f"card {USB_MIC_DEVICE.split(':')[1].split(',')[0]}" not in result.stdout:
-            logging.warning(f"[AUDIO] USB microphone not found at {USB_MIC_DEVICE}, skipping audio")
-            return None
+        device = AlsaDevice(USB_MIC_DEVICE, AUDIO_SAMPLE_RATE, AUDIO_CHANNELS, AUDIO_PERIOD_FRAMES)
+    except Exception as e:
+        logging.warning(f"[AUDIO] USB microphone not available at {USB_MIC_DEVICE} ({e}), skipping audio")
+        return None
 
-        cmd = [
-            "arecord",
-            "-D", USB_MIC_DEVICE,
-            "-f", "S16_LE",
-            "-c", str(AUDIO_CHANNELS),
-            "-r", str(AUDIO_SAMPLE_RATE),
-            audio_file
-        ]
+    audio_capture = AudioCapture(device, writer_factory=make_writer(AUDIO_CODEC, AUDIO_BITRATE))
+    audio_capture.start()
+    logging.info(f"[AUDIO] ✓ Capturing from {USB_MIC_DEVICE} ({AUDIO_SAMPLE_RATE} Hz, {AUDIO_CODEC})")
+    return audio_capture
 
-        audio_process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        return audio_process
-    except Exception as e:
-        logging.error(f"[AUDIO] Failed to start: {e}")
+def start_audio_recording(audio_file, at=None):
+    if not audio_enabled or audio_capture is None:
         return None
+    audio_capture.open_file(audio_file, at)
+    return audio_capture
 
-def stop_audio_recording():
-    global audio_process
-    if audio_process:
-        try:
-            audio_process.terminate()
-            audio_process.wait(timeout=5)
-        except Exception:
-            try:
-                audio_process.kill()
-            except:
-                pass
-        finally:
-            audio_process = None
+def stop_audio_recording(at=None):
+    if audio_capture is not None:
+        audio_capture.close_file(at)
 
-def convert_and_merge(h264_path, audio_path, mp4_path):
+def rotate_audio_recording(next_audio_file, close_at, open_at):
+    if audio_capture is None:
+        return
+    if audio_enabled:
+        audio_capture.rotate(next_audio_file, close_at, open_at)
+    else:
+        audio_capture.close_file(close_at)
+
+def queue_chunk_conversion(h264_path, audio_path, mp4_path, chunk_window=None):
+    """Hand a finished chunk to the pool once its audio file is closed; the wait never holds a pool worker."""
+    with converting_files_lock:
+        converting_files.add(os.path.basename(mp4_path))
+
+    def _submit_when_closed():
+        if audio_capture is not None and audio_path:
+            if not audio_capture.wait_closed(audio_path, timeout=5.0):
+                logging.warning(f"[CONVERT] Audio still open after 5s: {os.path.basename(audio_path)}")
+        conversion_pool.submit(PRIORITY_CHUNK, convert_and_merge, h264_path, audio_path, mp4_path,
+                               chunk_window=chunk_window)
+
+    threading.Thread(target=_submit_when_closed, daemon=True, name="chunk-audio-wait").start()
+
+def _index_gps_chunk(key):
+    """Index a chunk's finished GPS sidecar; the /api/gps routes only read the index."""
+    if gps_index is None:
+        return   # startup_worker's sync picks it up
+    for name in (f"gps_{key}.json", f"gps_{key}.csv"):
+        path = os.path.join(RECORD_FOLDER, name)
+        if os.path.exists(path):
+            try:
+                gps_index.index_chunk(key, path)
+            except (OSError, ValueError) as e:
+                logging.warning(f"[GPS] Unreadable sidecar {name}: {e}")
+            return
+
+def _forget_gps_chunk(key):
+    if gps_index is not None:
+        gps_index.remove_chunk(key)
+
+def _chunk_renamed(old_name, new_name):
+    """Follow a user rename in the loop index (keeping its lock), the timing sidecar and the GPS index."""
+    old_key, new_key = chunk_key(old_name), chunk_key(new_name)
+    if not old_key or old_key == new_key:
+        return
+    if new_key:
+        old_timing = os.path.join(RECORD_FOLDER, sidecar_name(old_key))
+        if os.path.exists(old_timing):
+            os.rename(old_timing, os.path.join(RECORD_FOLDER, sidecar_name(new_key)))
+    loop_retention.rename(old_key, new_key)
+    _forget_gps_chunk(old_key)
+    if new_key:
+        _index_gps_chunk(new_key)
+
+def _register_finished_chunk(mp4_path, chunk_window):
+    if thumb_cache is not None:
+        thumb_cache.request(os.path.basename(mp4_path))
+    key = chunk_key(mp4_path)
+    if not key:
+        return
+    _index_gps_chunk(key)
+    if not chunk_window:
+        return
+    newly_locked, evicted = loop_retention.add(key, chunk_window[0], chunk_window[1])
+    for old_key in evicted:
+        _forget_gps_chunk(old_key)
+    if newly_locked:
+        logging.info(f"[LOOP] 🔒 Incident chunk kept: {os.path.basename(mp4_path)}")
+        incident_upload_queue.put(os.path.basename(mp4_path))
+
+def convert_and_merge(h264_path, audio_path, mp4_path, chunk_window=None):
     h264_name = os.path.basename(h264_path)
     mp4_name = os.path.basename(mp4_path)
 
     with converting_files_lock:
         converting_files.add(mp4_name)
 
-    time.sleep(2.0)
-
+    registered = False
     try:
-        has_audio = os.path.exists(audio_path) and os.path.getsize(audio_path) > 1000
+        if _remux(h264_path, audio_path, mp4_path):
+            _register_finished_chunk(mp4_path, chunk_window)
+            registered = True
+    except Exception as e:
+        logging.error(f"[CONVERT] ✗ Error: {e}")
+    finally:
+        if not registered and chunk_key(mp4_path):
+            loop_retention.forget(chunk_key(mp4_path))   # never coming: stop holding incident windows
+        with converting_files_lock:
+            converting_files.discard(mp4_name)
 
-        if has_audio:
-            cmd = [
-                "nice", "-n", "19",
-                "ffmpeg",
-                "-r", str(int(FPS)),
-                "-i", h264_path,
-                "-i", audio_path,
-                "-c:v", "copy",
-                "-c:a", "aac",
-                "-b:a", "128k",
-                "-shortest",
-                "-y", mp4_path
-            ]
-        else:
-            cmd = [
-                "nice", "-n", "19",
-                "ffmpeg",
-                "-r", str(int(FPS)),
-                "-i", h264_path,
-                "-c:v", "copy",
-                "-y", mp4_path
-            ]
+def _remux(h264_path, audio_path, mp4_path):
+    """Stream-copy one chunk (and its audio, if any) into MP4; sources are removed on success."""
+    has_audio = bool(audio_path) and os.path.exists(audio_path) and os.path.getsize(audio_path) > 1000
+    if has_audio and not audio_path.endswith('.wav'):
+        # audio was already encoded live: pure remux of both streams
+        cmd = [
+            "nice", "-n", "19",
+            "ffmpeg",
+            "-r", str(int(FPS)),
+            "-i", h264_path,
+            "-i", audio_path,
+            "-c", "copy",
+            "-shortest",
+            "-y", mp4_path
+        ]
+    elif has_audio:
+        cmd = [
+            "nice", "-n", "19",
+            "ffmpeg",
+            "-r", str(int(FPS)),
+            "-i", h264_path,
+            "-i", audio_path,
+            "-c:v", "copy",
+            "-c:a", "aac",
+            "-b:a", "128k",
+            "-shortest",
+            "-y", mp4_path
+        ]
+    else:
+        cmd = [
+            "nice", "-n", "19",
+            "ffmpeg",
+            "-r", str(int(FPS)),
+            "-i", h264_path,
+            "-c:v", "copy",
+            "-y", mp4_path
+        ]
 
+    with M_CONVERT.time():
         subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
-        if os.path.exists(mp4_path) and os.path.getsize(mp4_path) > 0:
+    if os.path.exists(mp4_path) and os.path.getsize(mp4_path) > 0:
+        try:
+            os.remove(h264_path)
+        except:
+            pass
+        if has_audio:
             try:
-                os.remove(h264_path)
+                os.remove(audio_path)
             except:
                 pass
-            if has_audio:
-                try:
-                    os.remove(audio_path)
-                except:
-                    pass
+        return True
+    return False
+
+def _led_refresh():
+    led_state_event.set()
+
+def _led_mode():
+    if led_error:
+        return f"error:{led_error}"
+    try:
+        if shutil.disk_usage(RECORD_FOLDER).free < LOW_STORAGE_GB * (2**30):
+            return "low_storage"
+    except Exception:
+        pass
+    with upload_status_lock:
+        uploading = any(v.get("status") == "uploading" for v in upload_status.values())
+    if uploading:
+        return "uploading"
+    if recorder.recording:
+        return "recording"
+    return "on"
+
+def led_worker():
+    # woken by _led_refresh() on state changes; the timeout only re-checks free space
+    while app_running:
+        led_state_event.clear()
+        led.set_mode(_led_mode())
+        led_state_event.wait(LED_STORAGE_CHECK_INTERVAL)
+
+def _conversions_running():
+    with converting_files_lock:
+        return bool(converting_files)
+
+def startup_worker():
+    global thumb_cache, gps_index
+    _mark_startup("recovery", "running")
+    try:
+        recover_orphaned_files()
+        loop_retention.seed()
     except Exception as e:
-        logging.error(f"[CONVERT] ✗ Error: {e}")
-    finally:
-        with converting_files_lock:
-            converting_files.discard(mp4_name)
+        logging.error(f"[RECOVERY] ✗ {e}")
+    _mark_startup("recovery", "done")
+
+    init_audio_capture()
+    _mark_startup("audio", "ready" if audio_capture is not None else "unavailable")
+    services_ready.set()
+
+    # orphans were set aside above; turning them into MP4s can take as long as it likes
+    queue_orphan_remux()
+
+    # index chunk headers so the first media list doesn't have to
+    for path in glob.glob(os.path.join(RECORD_FOLDER, "*.mp4")):
+        media_scan.get(path)
+
+    thumb_cache = ThumbnailCache(RECORD_FOLDER, THUMB_DIR, THUMB_CACHE_MB * 1024 * 1024,
+                                 busy=_conversions_running).start()
+
+    try:
+        index = gpsindex.TrackIndex(os.path.join(RECORD_FOLDER, gpsindex.INDEX_NAME))
+        reindexed, removed = index.sync(RECORD_FOLDER)
+        gps_index = index
+        logging.info(f"[GPS] Track index: {index.stats()} ({reindexed} sidecars read, {removed} dropped)")
+    except Exception as e:
+        logging.error(f"[GPS] ✗ Track index unavailable: {e}")
+
+def _start_h264_preview(picam2):
+    from picamera2.encoders import H264Encoder
+    from picamera2.outputs import Output
+
+    class Fmp4Output(Output):
+        def outputframe(self, frame, keyframe=True, timestamp=None, *args, **kwargs):
+            if not kwargs.get("audio"):
+                live_h264.push(bytes(frame), timestamp or 0, keyframe)
+
+    encoder = H264Encoder(bitrate=PREVIEW_H264_BITRATE, repeat=True,
+                          iperiod=PREVIEW_KEYFRAME_INTERVAL, profile="baseline")
+    live_h264.reset()
+    picam2.start_encoder(encoder, Fmp4Output(), name="lores")
+    logging.info("[PREVIEW] H.264 live view started")
+    return encoder
+
+def _sync_h264_preview(picam2, encoder):
+    """Run the lores encoder only while /api/live.mp4 has viewers."""
+    global preview_idle_since
+    if live_h264.viewers:
+        preview_idle_since = None
+        if encoder is None and H264_PREVIEW_ENABLED:
+            try:
+                encoder = _start_h264_preview(picam2)
+            except Exception as e:
+                logging.error(f"[PREVIEW] ✗ H.264 start failed: {e}")
+        return encoder
+    if encoder is None:
+        return None
+    if preview_idle_since is None:
+        preview_idle_since = time.monotonic()
+    elif time.monotonic() - preview_idle_since > PREVIEW_IDLE_STOP_SEC:
+        try:
+            picam2.stop_encoder(encoder)
+        except Exception as e:
+            logging.error(f"[PREVIEW] ✗ H.264 stop failed: {e}")
+        logging.info("[PREVIEW] H.264 live view stopped (no viewers)")
+        preview_idle_since = None
+        return None
+    return encoder
+
+def _start_chunk_encoder(picam2, h264_path):
+    """Record h264_path and log each frame's sensor timestamp to the chunk's frames_ sidecar."""
+    from picamera2.encoders import H264Encoder
+    from picamera2.outputs import FileOutput
+
+    key = chunk_key(h264_path)
+    timeline = FrameTimeline(FPS, os.path.join(RECORD_FOLDER, sidecar_name(key)) if key else None)
+
+    class TimedFileOutput(FileOutput):
+        def outputframe(self, frame, keyframe=True, timestamp=None, *args, **kwargs):
+            super().outputframe(frame, keyframe, timestamp, *args, **kwargs)
+            if timestamp is not None and not kwargs.get("audio"):
+                timeline.add(timestamp)
+
+    encoder = H264Encoder(bitrate=VIDEO_BITRATE, profile="high")
+    picam2.start_encoder(encoder, TimedFileOutput(h264_path))
+    return encoder, timeline
+
+def _finish_chunk_timing(timeline, mp4_path):
+    if timeline is None:
+        return
+    timeline.close()
+    summary = timeline.summary()
+    if session_manifest is not None:
+        session_manifest.add_chunk(os.path.basename(mp4_path), summary)
+    if summary["dropped"]:
+        logging.warning(f"[TIMING] {os.path.basename(mp4_path)}: {summary['dropped']} dropped frames, "
+                        f"max gap {summary['max_gap_ms']}ms, {summary['effective_fps']} fps")
 
 def camera_worker():
-    global latest_frame_jpeg, is_recording_active, req_start_rec, req_stop_rec, current_gps_data
-    global chunk_number, last_chunk_check, recording_start_time, audio_process
-    global current_recording_files
+    global latest_frame_jpeg, latest_frame_seq, latest_lores_yuv, current_gps_data
+    global current_recording_files, camera, led_error
+    global chunk_timeline, session_manifest, preview_timing
 
     gps_json_path = None
     gps_points = []
@@ -350,40 +756,54 @@ def camera_worker():
     current_audio_name = None
     current_mp4_name = None
     current_encoder = None
+    preview_encoder = None
     recording_session_start = None
+    chunk_start_time = None
+    chunk_number = 0
+    last_chunk_check = 0
+    preview_timeline = FrameTimeline(FPS)
 
     try:
-        picam2 = Picamera2()
-
-        config = picam2.create_video_configuration(
-            main={"size": (CAM_WIDTH, CAM_HEIGHT), "format": "YUV420"},
-            lores={"size": (640, 480), "format": "YUV420"},
-            transform=Transform(hflip=True, vflip=True),
-            controls={"FrameRate": FPS},
-            buffer_count=6
-        )
-        config["sensor"]["output_size"] = (CAM_WIDTH, CAM_HEIGHT)
-        picam2.configure(config)
-        picam2.start()
-        picam2.set_controls({"ScalerCrop": (0, 0, 3280, 2464)})
-        time.sleep(0.5)
+        import cv2
+        # already running if QR provisioning handed over in-process
+        picam2 = open_camera()
+        camera = picam2
     except Exception as e:
         logging.critical(f"[CAMERA] ✗ Hardware Error: {e}")
+        _mark_startup("camera", "error", "camera_ready_s")
+        led_error = LED_ERROR_CAMERA
+        _led_refresh()
         return
+    _mark_startup("camera", "ready", "camera_ready_s")
+
+    # recordings must not start before orphans from the last run are set aside
+    services_ready.wait()
 
+    if LOOP_RECORDING_ENABLED:
+        logging.info("[LOOP] Always-on recording enabled")
+        recorder.submit("start")
+
+    # paced by the camera: capture_request() blocks until the next frame, and
+    # commands are handled between frames (at most one frame period of latency)
     while app_running:
+        loop_t0 = time.perf_counter()
+        cmd = None
         try:
-            if req_start_rec:
-                req_start_rec = False
-                if not is_recording_active:
+            cmd = recorder.next_command()
+
+            if cmd is not None and cmd.name == "start":
+                if recorder.recording:
+                    recorder.complete(cmd, already=True)
+                else:
+                    recorder.transition(rc.STARTING)
                     chunk_number = 0
                     recording_session_start = datetime.datetime.now()
-                    recording_start_time = time.time()
+                    chunk_start_time = time.time()
                     last_chunk_check = time.time()
                     ts = recording_session_start.strftime("%Y%m%d_%H%M%S")
 
                     current_h264_name = os.path.join(RECORD_FOLDER, f"temp_{ts}_chunk{chunk_number:03d}.h264")
-                    current_audio_name = os.path.join(RECORD_FOLDER, f"audio_{ts}_chunk{chunk_number:03d}.wav")
+                    current_audio_name = os.path.join(RECORD_FOLDER, f"audio_{ts}_chunk{chunk_number:03d}{AUDIO_EXT}")
                     current_mp4_name = os.path.join(RECORD_FOLDER, f"video_{ts}_chunk{chunk_number:03d}.mp4")
 
                     gps_json_path = os.path.join(RECORD_FOLDER, f"gps_{ts}_chunk{chunk_number:03d}.json")
@@ -391,11 +811,13 @@ def camera_worker():
                     _write_gps_json_file(gps_json_path, gps_points)
 
                     try:
-                        current_encoder = H264Encoder(bitrate=VIDEO_BITRATE, profile="high")
-                        picam2.start_recording(current_encoder, current_h264_name)
-                        start_audio_recording(current_audio_name)
+                        session_manifest = SessionManifest(RECORD_FOLDER, ts, FPS)
+                        current_encoder, chunk_timeline = _start_chunk_encoder(picam2, current_h264_name)
+                        start_audio_recording(current_audio_name, at=time.monotonic())
+                        loop_retention.expect(chunk_key(current_mp4_name), chunk_start_time)
 
-                        is_recording_active = True
+                        recorder.transition(rc.RECORDING)
+                        led_error = None
 
                         with current_recording_lock:
                             current_recording_files.append({
@@ -403,11 +825,15 @@ def camera_worker():
                                 "mp4": os.path.basename(current_mp4_name),
                                 "started": recording_session_start.strftime("%Y-%m-%d %H:%M:%S")
                             })
+                        recorder.complete(cmd)
                     except Exception as rec_err:
                         logging.error(f"[RECORD] ✗ Start failed: {rec_err}")
-                        is_recording_active = False
+                        recorder.transition(rc.ERROR, f"start failed: {rec_err}")
+                        recorder.fail(cmd, rec_err)
+                        led_error = LED_ERROR_RECORD
+                    _led_refresh()
 
-            if is_recording_active and AUTO_CHUNK_ENABLED:
+            if recorder.state == rc.RECORDING and AUTO_CHUNK_ENABLED:
                 now = time.time()
                 if (now - last_chunk_check) >= CHUNK_CHECK_INTERVAL:
                     last_chunk_check = now
@@ -415,31 +841,35 @@ def camera_worker():
                         if os.path.exists(current_h264_name):
                             file_size_mb = os.path.getsize(current_h264_name) / (1024 * 1024)
                             if file_size_mb >= CHUNK_SIZE_MB:
-                                picam2.stop_recording()
-                                stop_audio_recording()
+                                recorder.transition(rc.ROTATING)
+                                rotate_t0 = time.perf_counter()
+                                audio_cut_at = time.monotonic()
+                                picam2.stop_encoder(current_encoder)
+                                _finish_chunk_timing(chunk_timeline, current_mp4_name)
 
                                 if current_h264_name and current_mp4_name:
-                                    t = threading.Thread(
-                                        target=convert_and_merge,
-                                        args=(current_h264_name, current_audio_name, current_mp4_name)
+                                    queue_chunk_conversion(
+                                        current_h264_name, current_audio_name, current_mp4_name,
+                                        chunk_window=(chunk_start_time, now)
                                     )
-                                    t.daemon = True
-                                    t.start()
 
                                 chunk_number += 1
+                                chunk_start_time = now
                                 ts = recording_session_start.strftime("%Y%m%d_%H%M%S")
 
                                 current_h264_name = os.path.join(RECORD_FOLDER, f"temp_{ts}_chunk{chunk_number:03d}.h264")
-                                current_audio_name = os.path.join(RECORD_FOLDER, f"audio_{ts}_chunk{chunk_number:03d}.wav")
+                                current_audio_name = os.path.join(RECORD_FOLDER, f"audio_{ts}_chunk{chunk_number:03d}{AUDIO_EXT}")
                                 current_mp4_name = os.path.join(RECORD_FOLDER, f"video_{ts}_chunk{chunk_number:03d}.mp4")
 
                                 gps_json_path = os.path.join(RECORD_FOLDER, f"gps_{ts}_chunk{chunk_number:03d}.json")
                                 gps_points = []
                                 _write_gps_json_file(gps_json_path, gps_points)
 
-                                current_encoder = H264Encoder(bitrate=VIDEO_BITRATE, profile="high")
-                                picam2.start_recording(current_encoder, current_h264_name)
-                                start_audio_recording(current_audio_name)
+                                current_encoder, chunk_timeline = _start_chunk_encoder(picam2, current_h264_name)
+                                rotate_audio_recording(current_audio_name, audio_cut_at, time.monotonic())
+                                loop_retention.expect(chunk_key(current_mp4_name), chunk_start_time)
+                                recorder.transition(rc.RECORDING)
+                                M_CHUNK_ROTATION.observe(time.perf_counter() - rotate_t0)
 
                                 with current_recording_lock:
                                     current_recording_files.append({
@@ -450,40 +880,65 @@ def camera_worker():
 
                     except Exception as chunk_err:
                         logging.error(f"[CHUNK] ✗ Size check failed: {chunk_err}")
-
-            if req_stop_rec:
-                req_stop_rec = False
-                if is_recording_active:
+                        if recorder.state == rc.ROTATING:
+                            # half-rotated: release the encoder and wait for a new start
+                            try:
+                                picam2.stop_encoder(current_encoder)
+                            except Exception:
+                                pass
+                            stop_audio_recording()
+                            current_encoder = None
+                            chunk_timeline = None
+                            with current_recording_lock:
+                                current_recording_files = []
+                            recorder.transition(rc.ERROR, f"rotation failed: {chunk_err}")
+                            led_error = LED_ERROR_RECORD
+                            _led_refresh()
+
+            if cmd is not None and cmd.name == "stop":
+                if not recorder.recording:
+                    if recorder.state == rc.ERROR:
+                        recorder.transition(rc.IDLE)
+                    recorder.complete(cmd, already=True)
+                else:
+                    recorder.transition(rc.STOPPING)
                     try:
-                        picam2.stop_recording()
-                        stop_audio_recording()
-                        picam2.start()
+                        audio_cut_at = time.monotonic()
+                        picam2.stop_encoder(current_encoder)
+                        stop_audio_recording(at=audio_cut_at)
                     except Exception as stop_err:
                         logging.error(f"[RECORD] ✗ Stop error: {stop_err}")
-
-                    is_recording_active = False
-                    recording_start_time = None
+                    _finish_chunk_timing(chunk_timeline, current_mp4_name)
+                    chunk_timeline = None
                     current_encoder = None
 
                     with current_recording_lock:
                         current_recording_files = []
+                    recorder.transition(rc.IDLE)
+                    recorder.complete(cmd)
+                    _led_refresh()
 
                     if current_h264_name and current_mp4_name:
-                        t = threading.Thread(
-                            target=convert_and_merge,
-                            args=(current_h264_name, current_audio_name, current_mp4_name)
+                        queue_chunk_conversion(
+                            current_h264_name, current_audio_name, current_mp4_name,
+                            chunk_window=(chunk_start_time, time.time())
                         )
-                        t.daemon = True
-                        t.start()
-
-            time.sleep(0.05)
 
             try:
-                raw_yuv = picam2.capture_array("lores")
+                req = picam2.capture_request()
+                try:
+                    raw_yuv = req.make_array("lores")
+                    sensor_ts = req.get_metadata().get("SensorTimestamp")
+                finally:
+                    req.release()
                 if raw_yuv is not None:
-                    frame_bgr = cv2.cvtColor(raw_yuv, cv2.COLOR_YUV2BGR_I420)
+                    latest_lores_yuv = raw_yuv
+                    preview_timeline.add(sensor_ts // 1000 if sensor_ts else time.monotonic_ns() // 1000)
+                    if preview_timeline.duration_s >= PREVIEW_TIMING_WINDOW_SEC:
+                        preview_timing = preview_timeline.summary()
+                        preview_timeline = FrameTimeline(FPS)
 
-                    if is_recording_active:
+                    if recorder.recording:
                         now = time.time()
                         if (now - last_gps_time) >= GPS_RECORD_INTERVAL:
                             ts_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
@@ -507,28 +962,44 @@ def camera_worker():
 
                             last_gps_time = now
 
-                    ret, buf = cv2.imencode('.jpg', frame_bgr)
-                    if ret:
-                        with frame_lock:
-                            latest_frame_jpeg = buf.tobytes()
-                            frame_condition.notify_all()
+                    # software JPEG only while someone watches the MJPEG feed
+                    if stream_viewers:
+                        enc_t0 = time.perf_counter()
+                        frame_bgr = cv2.cvtColor(raw_yuv, cv2.COLOR_YUV2BGR_I420)
+                        ret, buf = cv2.imencode('.jpg', frame_bgr)
+                        M_JPEG_ENCODE.observe(time.perf_counter() - enc_t0)
+                        if ret:
+                            with frame_lock:
+                                latest_frame_jpeg = buf.tobytes()
+                                latest_frame_seq += 1
+                                frame_condition.notify_all()
             except Exception:
-                pass
+                time.sleep(0.05)
 
-            time.sleep(0.005)
+            preview_encoder = _sync_h264_preview(picam2, preview_encoder)
+            M_CAMERA_LOOP.observe(time.perf_counter() - loop_t0)
 
         except Exception as e:
             logging.error(f"[CAMERA] Loop error: {e}")
+            if recorder.state in (rc.STARTING, rc.ROTATING, rc.STOPPING):
+                recorder.transition(rc.ERROR, str(e))
+                led_error = LED_ERROR_RECORD
+                _led_refresh()
+            if cmd is not None:
+                recorder.fail(cmd, e)
             time.sleep(0.1)
 
+    camera = None
+    recorder.cancel_pending("camera stopped")
     try:
-        if is_recording_active:
+        if recorder.recording:
             try:
-                picam2.stop_recording()
+                picam2.stop_encoder(current_encoder)
                 stop_audio_recording()
             except:
                 pass
-        picam2.stop()
+            _finish_chunk_timing(chunk_timeline, current_mp4_name)
+        close_camera()
     except:
         pass
 
@@ -558,31 +1029,81 @@ def index():
 
 @app.route('/video_feed')
 def video_feed():
+    global stream_viewers
+    with frame_lock:
+        if stream_viewers >= STREAM_MAX_VIEWERS:
+            return Response("Too many viewers", status=503, headers={"Retry-After": "5"})
+        stream_viewers += 1
+
     def generate():
-        while True:
+        # always sends the newest frame: a slow viewer skips frames instead of
+        # queueing them, and a stalled one is dropped by the server's socket timeout
+        seq = -1
+        min_interval = 1.0 / STREAM_MAX_FPS
+        while app_running:
             with frame_condition:
-                frame_condition.wait(timeout=1.0)
-                frame = latest_frame_jpeg
+                frame_condition.wait_for(lambda: latest_frame_seq != seq, timeout=1.0)
+                frame, seq = latest_frame_jpeg, latest_frame_seq
             if frame:
-                try:
-                    yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-                except Exception:
-                    break
-    return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame')
+                t0 = time.monotonic()
+                yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+                M_MJPEG_FRAMES.inc()
+                served[0] += 1
+                spare = min_interval - (time.monotonic() - t0)
+                if spare > 0:
+                    time.sleep(spare)
+
+    released = []
+    served = [0]
+    def release():
+        # the WSGI server calls close() even if the client left before the first frame
+        global stream_viewers
+        if not released:
+            released.append(True)
+            with frame_lock:
+                stream_viewers -= 1
+            M_MJPEG_CLIENT_FRAMES.observe(served[0])
+
+    resp = Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame',
+                    headers={"Cache-Control": "no-cache"})
+    resp.call_on_close(release)
+    return resp
+
+@app.route('/api/live.mp4')
+def live_h264_feed():
+    if not H264_PREVIEW_ENABLED:
+        return jsonify({"error": "H.264 preview disabled"}), 404
+    if live_h264.viewers >= STREAM_MAX_VIEWERS:
+        return Response("Too many viewers", status=503, headers={"Retry-After": "5"})
+
+    viewer = live_h264.subscribe()
+    codec = live_h264.wait_codec(timeout=3.0)   # camera_worker starts the encoder
+    if codec is None:
+        live_h264.unsubscribe(viewer)
+        return Response("Preview not available", status=503, headers={"Retry-After": "5"})
+
+    resp = Response(live_h264.stream(viewer, running=lambda: app_running), mimetype='video/mp4',
+                    headers={"X-Codec": codec, "Cache-Control": "no-cache"})
+    resp.call_on_close(lambda: live_h264.unsubscribe(viewer))
+    return resp
 
 @app.route('/api/start_record')
 def start_record():
-    global req_start_rec
-    if not is_recording_active:
-        req_start_rec = True
-    return "OK"
+    return _record_command("start")
 
 @app.route('/api/stop_record', methods=['POST'])
 def stop_record():
-    global req_stop_rec
-    if is_recording_active:
-        req_stop_rec = True
-    return "OK"
+    return _record_command("stop")
+
+def _record_command(name):
+    # waits for camera_worker so the response reflects the real state
+    try:
+        result = recorder.request(name, RECORD_COMMAND_TIMEOUT)
+    except rc.RecorderTimeout as e:
+        return jsonify({"success": False, "error": str(e), "state": recorder.state}), 504
+    except rc.RecorderError as e:
+        return jsonify({"success": False, "error": str(e), "state": recorder.state}), 500
+    return jsonify(dict(result, success=True))
 
 @app.route('/api/toggle_audio', methods=['POST'])
 def toggle_audio():
@@ -591,26 +1112,139 @@ def toggle_audio():
     audio_enabled = data.get('enabled', True)
     return jsonify({"success": True, "audio_enabled": audio_enabled})
 
+def _gps_snapshot():
+    try:
+        return {
+            "lat": float(current_gps_data.get("lat", 0.0)),
+            "lon": float(current_gps_data.get("lon", 0.0)),
+            "accuracy": float(current_gps_data.get("accuracy", 0.0) or 0.0),
+            "speed": float(current_gps_data.get("speed", 0.0) or 0.0),
+        }
+    except:
+        return {"lat": 0.0, "lon": 0.0, "accuracy": 0.0, "speed": 0.0}
+
+def _grab_main_frame(picam2):
+    # capture_request() hands us the next completed request without
+    # stopping the encoder; copy the main plane and give the buffer back fast
+    req = picam2.capture_request()
+    try:
+        return req.make_array("main")
+    finally:
+        req.release()
+
+def _encode_photo(yuv, path, gps, when):
+    import cv2
+    bgr = cv2.cvtColor(yuv, cv2.COLOR_YUV2BGR_I420)
+    if bgr.shape[1] > CAM_WIDTH:
+        bgr = bgr[:, :CAM_WIDTH]
+
+    txt = f"GPS: {gps['lat']:.5f}, {gps['lon']:.5f}"
+    cv2.putText(bgr, txt, (20, bgr.shape[0] - 30), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 255, 0), 3)
+
+    ok, buf = cv2.imencode('.jpg', bgr, [cv2.IMWRITE_JPEG_QUALITY, PHOTO_JPEG_QUALITY])
+    if not ok:
+        raise RuntimeError("JPEG encode failed")
+
+    exif = build_gps_exif(gps["lat"], gps["lon"], accuracy=gps["accuracy"], speed=gps["speed"], when=when)
+    data = insert_exif(buf.tobytes(), exif)
+
+    tmp = path + ".part"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def _save_preview_photo(path, gps):
+    yuv = latest_lores_yuv
+    if yuv is None:
+        return False
+
+    import cv2
+    img = cv2.cvtColor(yuv, cv2.COLOR_YUV2BGR_I420)
+    txt = f"GPS: {gps['lat']:.5f}, {gps['lon']:.5f}"
+    cv2.putText(img, txt, (10, STREAM_HEIGHT-20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0), 2)
+    cv2.imwrite(path, img)
+    return True
+
+def _grab_camera_frame():
+    picam2 = camera
+    if picam2 is None:
+        raise RuntimeError("camera not ready")
+    return _grab_main_frame(picam2)
+
+photo_engine = PhotoEngine(
+    grab=_grab_camera_frame,
+    encode=_encode_photo,
+    gps=_gps_snapshot,
+    folder=RECORD_FOLDER,
+    workers=PHOTO_ENCODE_WORKERS,
+    fallback=_save_preview_photo
+)
+
 @app.route('/api/capture_photo')
 def capture_photo():
-    with frame_lock:
-        if latest_frame_jpeg is None:
-            return "ERROR"
-        data = latest_frame_jpeg
+    # no camera -> PhotoEngine falls back to the last preview frame
+    if camera is None and latest_lores_yuv is None:
+        return jsonify({"success": False, "error": "Camera not ready"})
 
-    ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    path = os.path.join(RECORD_FOLDER, f"img_{ts}.jpg")
-    nparr = np.frombuffer(data, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    when = datetime.datetime.now()
+    path = os.path.join(RECORD_FOLDER, f"img_{when.strftime('%Y%m%d_%H%M%S')}.jpg")
+    job = photo_engine.single(path, when)
+    return jsonify({"success": True, "job": job, "file": os.path.basename(path)})
 
+@app.route('/api/capture_burst', methods=['POST'])
+def capture_burst():
     try:
-        txt = f"GPS: {float(current_gps_data.get('lat',0.0)):.5f}, {float(current_gps_data.get('lon',0.0)):.5f}"
-    except:
-        txt = "GPS: 0.00000, 0.00000"
+        data = request.json or {}
+        if camera is None:
+            return jsonify({"success": False, "error": "Camera not ready"})
+        job = photo_engine.burst(int(data.get('count', 10)))
+        return jsonify({"success": True, "job": job})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)})
 
-    cv2.putText(img, txt, (10, STREAM_HEIGHT-20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0), 2)
-    cv2.imwrite(path, img)
-    return "OK"
+@app.route('/api/capture_interval', methods=['POST'])
+def capture_interval():
+    try:
+        data = request.json or {}
+        if camera is None:
+            return jsonify({"success": False, "error": "Camera not ready"})
+        job = photo_engine.interval(float(data.get('every', 5)), float(data.get('duration', 300)))
+        return jsonify({"success": True, "job": job})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)})
+
+@app.route('/api/capture_jobs')
+def capture_jobs():
+    return jsonify(photo_engine.status())
+
+@app.route('/api/stop_capture_job', methods=['POST'])
+def stop_capture_job():
+    try:
+        job_id = (request.json or {}).get('id')
+        if job_id is None:
+            return jsonify({"success": False, "error": "No job id"})
+        return jsonify({"success": photo_engine.cancel(job_id)})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)})
+
+@app.route('/api/lock_incident', methods=['POST'])
+def lock_incident():
+    try:
+        data = request.json or {}
+        before = float(data.get('before', INCIDENT_BEFORE_SEC))
+        after = float(data.get('after', INCIDENT_AFTER_SEC))
+        now = time.time()
+        newly = loop_retention.lock_window(now - before, now + after)
+
+        for key in newly:
+            mp4_name = f"video_{key}.mp4"
+            if os.path.exists(os.path.join(RECORD_FOLDER, mp4_name)):
+                incident_upload_queue.put(mp4_name)
+
+        logging.info(f"[LOOP] 🔒 Incident locked: -{before:.0f}s / +{after:.0f}s ({len(newly)} finished chunk(s))")
+        return jsonify({"success": True, "locked_chunks": newly, "before": before, "after": after})
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)})
 
 @app.route('/api/update_gps', methods=['POST'])
 def update_gps():
@@ -628,8 +1262,10 @@ def get_status():
         pass
 
     recording_time = 0
-    if is_recording_active and recording_start_time:
-        recording_time = int(time.time() - recording_start_time)
+    is_recording = recorder.recording
+    started_at = recorder.started_at
+    if is_recording and started_at:
+        recording_time = int(time.time() - started_at)
 
     current_files = []
     with current_recording_lock:
@@ -645,14 +1281,30 @@ def get_status():
                 "started": rec_file["started"]
             })
 
+    with recovery_lock:
+        recovery = dict(recovery_progress, queued=conversion_pool.pending())
+
     return jsonify({
-        "status": "RECORDING" if is_recording_active else "STANDBY",
+        "status": "RECORDING" if is_recording else ("STANDBY" if startup["camera"] == "ready" else "STARTING"),
         "storage_free_gb": space,
-        "is_recording": is_recording_active,
+        "is_recording": is_recording,
+        "recorder": recorder.snapshot(),
+        "recovery": recovery,
         "recording_time": recording_time,
         "audio_enabled": audio_enabled,
         "current_recording": current_files,
-        "gps": current_gps_data
+        "gps": current_gps_data,
+        "loop": dict(loop_retention.stats(), enabled=LOOP_RECORDING_ENABLED),
+        "stream_viewers": stream_viewers,
+        "h264_viewers": live_h264.viewers,
+        "files_http": {"port": files_http.port, "encrypted": False} if files_http else None,
+        "frame_timing": {
+            "chunk": chunk_timeline.summary() if is_recording and chunk_timeline else None,
+            "session": session_manifest.summary() if session_manifest else None,
+            "preview": preview_timing
+        },
+        "ready": startup["camera"] == "ready" and services_ready.is_set(),
+        "startup": startup
     })
 
 @app.route('/api/rename_file', methods=['POST'])
@@ -694,6 +1346,7 @@ def rename_file():
         if os.path.exists(old_csv_path):
             os.rename(old_csv_path, new_csv_path)
 
+        _chunk_renamed(old_name, new_name)
         return jsonify({"success": True, "new_name": new_name})
 
     except Exception as e:
@@ -770,6 +1423,7 @@ def rename_batch():
                             new_csv_path = os.path.join(RECORD_FOLDER, new_csv)
                             os.rename(old_csv_path, new_csv_path)
                             break
+                    _chunk_renamed(old_filename, new_filename)
 
                 elif ext == 'h264':
                     if 'incomplete_' in old_filename:
@@ -841,6 +1495,10 @@ def list_media():
         with converting_files_lock:
             is_converting_mp4 = mp4_name in converting_files
 
+        info = None
+        if ext == '.mp4' and not is_converting_mp4:
+            info = media_scan.get(f)
+
         upload_info = None
         with upload_status_lock:
             if n in upload_status:
@@ -855,7 +1513,11 @@ def list_media():
             "incomplete": is_incomplete,
             "uploaded": is_uploaded,
             "upload_status": upload_info,
-            "last_modified": mtime
+            "last_modified": mtime,
+            "thumb": ThumbnailCache.eligible(n) and not is_converting_mp4,
+            "duration": round(info.duration, 1) if info else None,
+            "resolution": f"{info.width}x{info.height}" if info and info.width else None,
+            "corrupt": bool(info and not info.valid)
         }
 
         if "_chunk" in n and is_video:
@@ -867,6 +1529,7 @@ def list_media():
                         "timestamp": ts,
                         "chunks": [],
                         "total_size": 0,
+                        "total_duration": 0,
                         "chunk_count": 0,
                         "type": "batch",
                         "uploaded_count": 0,
@@ -878,6 +1541,7 @@ def list_media():
 
                 groups[ts]["chunks"].append(file_obj)
                 groups[ts]["total_size"] += s
+                groups[ts]["total_duration"] += file_obj["duration"] or 0
                 groups[ts]["chunk_count"] += 1
                 if is_uploaded:
                     groups[ts]["uploaded_count"] += 1
@@ -912,21 +1576,7 @@ def get_gps_data(filename):
             "end": pts[-1] if pts else None
         })
 
-    csv_variations = [
-        filename.replace('video_', 'gps_').replace('.mp4', '.csv'),
-        filename.replace('uploaded_', 'gps_').replace('.mp4', '.csv'),
-        filename.replace('uploaded_', 'uploaded_gps_').replace('.mp4', '.csv'),
-        filename.replace('failed_upload_', 'gps_').replace('.mp4', '.csv'),
-        filename.replace('failed_upload_', 'failed_upload_gps_').replace('.mp4', '.csv'),
-    ]
-
-    csv_path = None
-    for csv_name in csv_variations:
-        test_path = os.path.join(RECORD_FOLDER, csv_name)
-        if os.path.exists(test_path):
-            csv_path = test_path
-            break
-
+    csv_path = _find_existing_gps_csv_for_video(filename)
     if not csv_path:
         return jsonify({"error": "GPS data not found"})
 
@@ -959,6 +1609,68 @@ def get_gps_data(filename):
     except Exception as e:
         return jsonify({"error": str(e)})
 
+@app.route('/api/gps_export/<name>')
+def gps_export(name):
+    """?format=gpx|geojson|kml for one chunk (video file name) or a whole session (video_<ts>)."""
+    fmt = request.args.get('format', 'gpx').lower()
+    if fmt not in gpsindex.FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(gpsindex.FORMATS)}"}), 400
+    ts = extract_timestamp(name)
+    if not ts:
+        return jsonify({"error": "GPS data not found"}), 404
+    videos = [name] if name.endswith('.mp4') else \
+        [os.path.basename(p) for p in concat.session_chunk_paths(RECORD_FOLDER, ts)]
+
+    tracks = []
+    for video in videos:
+        path = _find_existing_gps_json_for_video(video) or _find_existing_gps_csv_for_video(video)
+        if not path:
+            continue
+        try:
+            tracks.append(gpsindex.Track(video, gpsindex.load_points(path)))
+        except (OSError, ValueError) as e:
+            logging.warning(f"[GPS] Unreadable sidecar {os.path.basename(path)}: {e}")
+    if not any(t.points for t in tracks):
+        return jsonify({"error": "No valid GPS data"}), 404
+
+    ctype, render = gpsindex.FORMATS[fmt]
+    title = os.path.splitext(name)[0]
+    return Response(render(tracks, title), mimetype=ctype, headers={
+        "Content-Disposition": f'attachment; filename="{title}.{fmt}"'})
+
+def _with_video_names(rows):
+    for row in rows:
+        row["video"] = next((os.path.basename(p) for p in chunk_files(RECORD_FOLDER, row["chunk"])
+                             if p.endswith('.mp4')), None)
+    return rows
+
+@app.route('/api/gps/near')
+def gps_near():
+    """Chunks that passed within ?radius= metres (default 100) of ?lat=&lon=, optionally ?from=&to=."""
+    if gps_index is None:
+        return jsonify({"error": "GPS index not ready"}), 503
+    try:
+        lat = float(request.args['lat'])
+        lon = float(request.args['lon'])
+        radius = float(request.args.get('radius', 100))
+        since = gpsindex.parse_time(request.args['from']) if request.args.get('from') else None
+        until = gpsindex.parse_time(request.args['to']) if request.args.get('to') else None
+    except (KeyError, ValueError):
+        return jsonify({"error": "lat, lon required; radius in metres; from/to as time"}), 400
+    return jsonify(_with_video_names(gps_index.near(lat, lon, radius, since, until)))
+
+@app.route('/api/gps/between')
+def gps_between():
+    """Chunks with GPS points between ?from= and ?to= (epoch, YYYYMMDD[_HHMMSS] or ISO time)."""
+    if gps_index is None:
+        return jsonify({"error": "GPS index not ready"}), 503
+    try:
+        since = gpsindex.parse_time(request.args['from'])
+        until = gpsindex.parse_time(request.args['to'])
+    except (KeyError, ValueError):
+        return jsonify({"error": "from and to required"}), 400
+    return jsonify(_with_video_names(gps_index.between(since, until)))
+
 def _gps_payload_from_video(filename):
     json_path = _find_existing_gps_json_for_video(filename)
     if not json_path:
@@ -1004,6 +1716,7 @@ def api_upload_cloud():
 
         with upload_status_lock:
             upload_status[filename] = {"status": "uploading", "message": "Uploading..."}
+            _led_refresh()
 
         video_path = os.path.join(RECORD_FOLDER, filename)
 
@@ -1012,7 +1725,9 @@ def api_upload_cloud():
             gps_json_string = ""
 
         def upload_thread():
-            success, message = upload_to_cloud(
+            from uploader import upload_to_cloud
+            success, message = _timed_upload(
+                "video", upload_to_cloud,
                 video_path=video_path,
                 device_id=DEVICE_ID,
                 start_location=start_location,
@@ -1023,6 +1738,7 @@ def api_upload_cloud():
             with upload_status_lock:
                 if success:
                     upload_status[filename] = {"status": "success", "message": message}
+                    _led_refresh()
                     try:
                         uploaded_name = filename.replace('video_', 'uploaded_')
                         new_path = os.path.join(RECORD_FOLDER, uploaded_name)
@@ -1040,6 +1756,7 @@ def api_upload_cloud():
                     threading.Timer(3.0, lambda: upload_status.pop(filename, None)).start()
                 else:
                     upload_status[filename] = {"status": "failed", "message": message}
+                    _led_refresh()
                     try:
                         failed_name = filename.replace('video_', 'failed_upload_')
                         new_path = os.path.join(RECORD_FOLDER, failed_name)
@@ -1072,6 +1789,7 @@ def api_upload_image():
             return jsonify({"success": False, "error": "No filename"})
         with upload_status_lock:
             upload_status[filename] = {"status": "uploading", "message": "Uploading..."}
+            _led_refresh()
         image_path = os.path.join(RECORD_FOLDER, filename)
         def upload_thread():
             try:
@@ -1089,7 +1807,9 @@ def api_upload_image():
                     }
                 ]
             })
-            success, message = upload_image_to_cloud(
+            from uploader import upload_image_to_cloud
+            success, message = _timed_upload(
+                "image", upload_image_to_cloud,
                 image_path=image_path,
                 device_id=DEVICE_ID,
                 start_location=loc_str,
@@ -1099,6 +1819,7 @@ def api_upload_image():
             with upload_status_lock:
                 if success:
                     upload_status[filename] = {"status": "success", "message": message}
+                    _led_refresh()
                     try:
                         uploaded_name = filename.replace('img_', 'uploaded_img_')
                         new_path = os.path.join(RECORD_FOLDER, uploaded_name)
@@ -1109,6 +1830,7 @@ def api_upload_image():
                     threading.Timer(3.0, lambda: upload_status.pop(filename, None)).start()
                 else:
                     upload_status[filename] = {"status": "failed", "message": message}
+                    _led_refresh()
                     try:
                         failed_name = filename.replace('img_', 'failed_upload_img_')
                         new_path = os.path.join(RECORD_FOLDER, failed_name)
@@ -1122,6 +1844,92 @@ def api_upload_image():
         return jsonify({"success": True, "message": "Upload started"})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)})
+def _upload_chunk_and_mark(chunk_name, tag):
+    chunk_path = os.path.join(RECORD_FOLDER, chunk_name)
+
+    with upload_status_lock:
+        upload_status[chunk_name] = {"status": "uploading", "message": "Uploading..."}
+        _led_refresh()
+
+    gps_json_string, start_location, stop_location = _gps_payload_from_video(chunk_name)
+    if gps_json_string is None:
+        gps_json_string = ""
+
+    from uploader import upload_to_cloud
+    success, message = _timed_upload(
+        "video", upload_to_cloud,
+        video_path=chunk_path,
+        device_id=DEVICE_ID,
+        start_location=start_location,
+        stop_location=stop_location,
+        location_json_string=gps_json_string
+    )
+
+    with upload_status_lock:
+        if success:
+            upload_status[chunk_name] = {"status": "success", "message": message}
+            _led_refresh()
+            try:
+                uploaded_name = chunk_name.replace('video_', 'uploaded_')
+                new_path = os.path.join(RECORD_FOLDER, uploaded_name)
+                if os.path.exists(chunk_path):
+                    os.rename(chunk_path, new_path)
+
+                json_path = _find_existing_gps_json_for_video(chunk_name)
+                if json_path and os.path.exists(json_path):
+                    basej = os.path.basename(json_path)
+                    uploaded_json = basej.replace('gps_', 'uploaded_gps_')
+                    os.rename(json_path, os.path.join(RECORD_FOLDER, uploaded_json))
+            except Exception as e:
+                logging.error(f"{tag} Rename failed: {e}")
+        else:
+            upload_status[chunk_name] = {"status": "failed", "message": message}
+            _led_refresh()
+            try:
+                failed_name = chunk_name.replace('video_', 'failed_upload_')
+                new_path = os.path.join(RECORD_FOLDER, failed_name)
+                if os.path.exists(chunk_path):
+                    os.rename(chunk_path, new_path)
+
+                json_path = _find_existing_gps_json_for_video(chunk_name)
+                if json_path and os.path.exists(json_path):
+                    basej = os.path.basename(json_path)
+                    failed_json = basej.replace('gps_', 'failed_upload_gps_')
+                    os.rename(json_path, os.path.join(RECORD_FOLDER, failed_json))
+            except Exception as e:
+                logging.error(f"{tag} Rename failed: {e}")
+
+    return success
+
+def _timed_upload(kind, upload, **kwargs):
+    t0 = time.monotonic()
+    try:
+        size = os.path.getsize(kwargs.get("video_path") or kwargs.get("image_path"))
+    except (OSError, TypeError):
+        size = 0
+    if kind == "video":
+        # don't spend the uplink on a file the server can't play
+        info = media_scan.get(kwargs["video_path"])
+        if info is not None and not info.valid:
+            logging.error(f"[UPLOAD] ✗ {os.path.basename(kwargs['video_path'])} failed integrity check: {info.error}")
+            return False, f"Integrity check failed: {info.error}"
+    success, message = upload(**kwargs)
+    M_UPLOAD_SECONDS.labels(kind, "success" if success else "failed").observe(time.monotonic() - t0)
+    if success:
+        M_UPLOAD_BYTES.labels(kind).inc(size)
+    return success, message
+
+def incident_upload_worker():
+    while app_running:
+        try:
+            chunk_name = incident_upload_queue.get(timeout=1.0)
+        except queue.Empty:
+            continue
+        if not os.path.exists(os.path.join(RECORD_FOLDER, chunk_name)):
+            continue
+        _upload_chunk_and_mark(chunk_name, "[INCIDENT]")
+        time.sleep(1)
+
 @app.route('/api/batch_upload', methods=['POST'])
 def batch_upload():
     try:
@@ -1139,55 +1947,7 @@ def batch_upload():
 
         def batch_upload_thread():
             for chunk_path in chunks:
-                chunk_name = os.path.basename(chunk_path)
-
-                with upload_status_lock:
-                    upload_status[chunk_name] = {"status": "uploading", "message": "Uploading..."}
-
-                gps_json_string, start_location, stop_location = _gps_payload_from_video(chunk_name)
-                if gps_json_string is None:
-                    gps_json_string = ""
-
-                success, message = upload_to_cloud(
-                    video_path=chunk_path,
-                    device_id=DEVICE_ID,
-                    start_location=start_location,
-                    stop_location=stop_location,
-                    location_json_string=gps_json_string
-                )
-
-                with upload_status_lock:
-                    if success:
-                        upload_status[chunk_name] = {"status": "success", "message": message}
-                        try:
-                            uploaded_name = chunk_name.replace('video_', 'uploaded_')
-                            new_path = os.path.join(RECORD_FOLDER, uploaded_name)
-                            if os.path.exists(chunk_path):
-                                os.rename(chunk_path, new_path)
-
-                            json_path = _find_existing_gps_json_for_video(chunk_name)
-                            if json_path and os.path.exists(json_path):
-                                basej = os.path.basename(json_path)
-                                uploaded_json = basej.replace('gps_', 'uploaded_gps_')
-                                os.rename(json_path, os.path.join(RECORD_FOLDER, uploaded_json))
-                        except Exception as e:
-                            logging.error(f"[BATCH] Rename failed: {e}")
-                    else:
-                        upload_status[chunk_name] = {"status": "failed", "message": message}
-                        try:
-                            failed_name = chunk_name.replace('video_', 'failed_upload_')
-                            new_path = os.path.join(RECORD_FOLDER, failed_name)
-                            if os.path.exists(chunk_path):
-                                os.rename(chunk_path, new_path)
-
-                            json_path = _find_existing_gps_json_for_video(chunk_name)
-                            if json_path and os.path.exists(json_path):
-                                basej = os.path.basename(json_path)
-                                failed_json = basej.replace('gps_', 'failed_upload_gps_')
-                                os.rename(json_path, os.path.join(RECORD_FOLDER, failed_json))
-                        except Exception as e:
-                            logging.error(f"[BATCH] Rename failed: {e}")
-
+                _upload_chunk_and_mark(os.path.basename(chunk_path), "[BATCH]")
                 time.sleep(1)
 
         t = threading.Thread(target=batch_upload_thread)
@@ -1199,9 +1959,215 @@ def batch_upload():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)})
 
+def _send_recording(filename, as_attachment=False):
+    path = os.path.join(RECORD_FOLDER, filename)
+    if filename.startswith('.') or not os.path.isfile(path):
+        return jsonify({"error": "File not found"}), 404
+    return _send_path(path, download_name=filename if as_attachment else None)
+
+def _send_path(path, download_name=None):
+    try:
+        status, headers, start, length = fileserve.plan(path, request.headers, download_name=download_name)
+    except FileNotFoundError:
+        return jsonify({"error": "File not found"}), 404
+    if status in (304, 416) or request.method == 'HEAD':
+        return Response(status=status, headers=headers)
+    return Response(fileserve.body(path, request.environ, start, length),
+                    status=status, headers=headers, direct_passthrough=True)
+
+@app.route('/api/thumb/<filename>')
+def thumb(filename):
+    if thumb_cache is None or not ThumbnailCache.eligible(filename):
+        return jsonify({"error": "No thumbnail"}), 404
+    path = thumb_cache.get(filename)
+    if path is None:
+        if thumb_cache.failed(filename):
+            # an image, so the page's <img> shows it instead of retrying
+            return Response(thumbs.PLACEHOLDER_SVG, mimetype="image/svg+xml",
+                            headers={"Cache-Control": "no-cache"})
+        # queued on the low-priority worker; the page retries
+        return jsonify({"status": "pending"}), 202, {"Retry-After": "3"}
+    return _send_path(path)
+
+def _session_chunks(ts):
+    """Chunks of a session for concat, or (None, error) if it can't be joined yet."""
+    paths = concat.session_chunk_paths(RECORD_FOLDER, ts)
+    if not paths:
+        return None, "No finished chunks"
+    if glob.glob(os.path.join(RECORD_FOLDER, f"temp_{ts}_chunk*.h264")):
+        return None, "Session still recording or converting"
+    chunks = []
+    for p in paths:
+        info = media_scan.get(p)
+        if info is None or not info.valid:
+            return None, f"{os.path.basename(p)} is damaged"
+        chunks.append(concat.Chunk(p, info.duration, info.has_audio))
+    return chunks, None
+
+def _run_concat(job_id, chunks, out_path):
+    def update(**kw):
+        with concat_jobs_lock:
+            concat_jobs[job_id].update(kw)
+
+    update(state="running", started=time.time())
+    part = out_path + ".part"
+    list_path = part + ".txt"
+    try:
+        with open(list_path, "w") as f:
+            f.write(concat.list_file_text([c.path for c in chunks]))
+        cmd = concat.build_command(chunks, list_path, part)
+        res = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if res.returncode != 0 or not os.path.exists(part):
+            raise RuntimeError(res.stderr.decode(errors="replace").strip()[-300:] or "ffmpeg failed")
+        os.replace(part, out_path)
+        update(state="done", size=os.path.getsize(out_path), finished=time.time())
+        for key in loop_retention.add_joined(chunk_key(out_path)):
+            _forget_gps_chunk(key)
+        logging.info(f"[CONCAT] ✓ {os.path.basename(out_path)} from {len(chunks)} chunks")
+    except Exception as e:
+        update(state="failed", error=str(e), finished=time.time())
+        logging.error(f"[CONCAT] ✗ {os.path.basename(out_path)}: {e}")
+        try:
+            os.remove(part)
+        except OSError:
+            pass
+    finally:
+        try:
+            os.remove(list_path)
+        except OSError:
+            pass
+
+def _stream_concat(ts, chunks):
+    if not concat_streams.acquire(blocking=False):
+        return Response("Another session is being streamed", status=503, headers={"Retry-After": "30"})
+    list_path = None
+    try:
+        fd, list_path = tempfile.mkstemp(prefix="concat_", suffix=".txt")
+        with os.fdopen(fd, "w") as f:
+            f.write(concat.list_file_text([c.path for c in chunks]))
+        proc = subprocess.Popen(concat.build_command(chunks, list_path, None, stream=True),
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except Exception as e:
+        # nothing will call cleanup(): give the slot back here
+        if list_path:
+            try:
+                os.remove(list_path)
+            except OSError:
+                pass
+        concat_streams.release()
+        logging.error(f"[CONCAT] ✗ Stream of {ts} failed to start: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    def generate():
+        while True:
+            block = proc.stdout.read(fileserve.BLOCK_SIZE)
+            if not block:
+                break
+            yield block
+
+    def cleanup():
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        try:
+            os.remove(list_path)
+        except OSError:
+            pass
+        concat_streams.release()
+
+    # fragmented MP4 of unknown length: no Content-Length, no Range
+    resp = Response(generate(), mimetype="video/mp4", headers={
+        "Content-Disposition": f'attachment; filename="{concat.output_name(ts)}"',
+        "Cache-Control": "no-store"})
+    resp.call_on_close(cleanup)
+    return resp
+
+@app.route('/api/concat_session', methods=['GET', 'POST'])
+def concat_session():
+    """POST {"base"}: join on the conversion pool. GET ?base=: stream the join to the client."""
+    data = (request.json or {}) if request.method == 'POST' else request.args
+    ts = extract_timestamp(data.get('base') or '')
+    if not ts:
+        return jsonify({"success": False, "error": "No base"}), 400
+    chunks, error = _session_chunks(ts)
+    if error:
+        return jsonify({"success": False, "error": error}), 409
+
+    if request.method == 'GET':
+        return _stream_concat(ts, chunks)
+
+    out_name = concat.output_name(ts)
+    with concat_jobs_lock:
+        for job_id, job in concat_jobs.items():
+            if job["output"] == out_name and job["state"] in ("queued", "running"):
+                return jsonify({"success": True, "job": job_id, "output": out_name})
+
+        # the joined copy is as big as its chunks; don't eat the space recording needs
+        try:
+            needed = sum(os.path.getsize(c.path) for c in chunks)
+            free = shutil.disk_usage(RECORD_FOLDER).free
+        except OSError as e:
+            return jsonify({"success": False, "error": str(e)}), 500
+        reserved = sum(j["bytes"] for j in concat_jobs.values() if j["state"] in ("queued", "running"))
+        if free - reserved - needed < LOW_STORAGE_GB * (2**30):
+            return jsonify({"success": False, "error": "Not enough free space",
+                            "needed_mb": round(needed / (1024 * 1024), 1),
+                            "free_mb": round(free / (1024 * 1024), 1)}), 507
+
+        job_id = uuid.uuid4().hex[:8]
+        concat_jobs[job_id] = {"state": "queued", "output": out_name, "chunks": len(chunks),
+                               "bytes": needed,
+                               "duration": round(sum(c.duration for c in chunks), 1),
+                               "audio": sum(1 for c in chunks if c.has_audio)}
+        # keep the last 20 jobs, but never drop one that hasn't finished
+        for old_id in list(concat_jobs)[:-20]:
+            if concat_jobs[old_id]["state"] in ("done", "failed"):
+                del concat_jobs[old_id]
+    conversion_pool.submit(PRIORITY_BATCH, _run_concat, job_id, chunks,
+                           os.path.join(RECORD_FOLDER, out_name))
+    return jsonify({"success": True, "job": job_id, "output": out_name})
+
+@app.route('/api/concat_jobs')
+def concat_jobs_status():
+    with concat_jobs_lock:
+        return jsonify({k: dict(v) for k, v in concat_jobs.items()})
+
+_EXPORT_DATE_RE = re.compile(r'^\d{8}(_\d{6})?$')
+
+@app.route('/api/export', methods=['GET', 'HEAD'])
+def export_recordings():
+    """
+    Tar of ?session=video_<ts> (repeatable) and/or everything from ?from= to ?to=
+    (YYYYMMDD[_HHMMSS] or YYYY-MM-DD), streamed with Content-Length and Range.
+    """
+    sessions = [extract_timestamp(b) for b in request.args.getlist('session')]
+    since = request.args.get('from', '').replace('-', '') or None
+    until = request.args.get('to', '').replace('-', '') or None
+    if None in sessions or any(d and not _EXPORT_DATE_RE.match(d) for d in (since, until)):
+        return jsonify({"success": False, "error": "Bad session or date"}), 400
+    if not sessions and not since and not until:
+        return jsonify({"success": False, "error": "No session or date range"}), 400
+
+    members = export.collect(RECORD_FOLDER, sessions, since, until)
+    if not members:
+        return jsonify({"success": False, "error": "Nothing to export"}), 404
+    if len(sessions) == 1 and not since and not until:
+        name = f"helmet_{sessions[0]}.tar"
+    else:
+        stamps = sorted(extract_timestamp(m.arcname) for m in members)
+        name = f"helmet_{stamps[0][:8]}-{stamps[-1][:8]}.tar"
+
+    tar = export.TarExport(members)
+    status, headers, start, length = tar.plan(request.headers, name)
+    logging.info(f"[EXPORT] {name}: {len(members)} files, {tar.size} bytes, status {status}")
+    if status == 416 or request.method == 'HEAD':
+        return Response(status=status, headers=headers)
+    return Response(tar.iter_range(start, length), status=status, headers=headers,
+                    direct_passthrough=True)
+
 @app.route('/api/download/<filename>')
 def download(filename):
-    return send_from_directory(RECORD_FOLDER, filename, as_attachment=True)
+    return _send_recording(filename, as_attachment=True)
 
 @app.route('/api/delete_file', methods=['POST'])
 def delete_file():
@@ -1210,6 +2176,14 @@ def delete_file():
     if os.path.exists(p) and RECORD_FOLDER in os.path.abspath(p):
         os.remove(p)
 
+        key = chunk_key(n)
+        if key:
+            loop_retention.forget(key)
+            _forget_gps_chunk(key)
+            timing_path = os.path.join(RECORD_FOLDER, sidecar_name(key))
+            if os.path.exists(timing_path):
+                os.remove(timing_path)
+
         variations = [
             n.replace("video_", "gps_"),
             n.replace("uploaded_", "uploaded_gps_"),
@@ -1248,10 +2222,16 @@ def delete_batch():
         gps_jsons = glob.glob(os.path.join(RECORD_FOLDER, f"*gps_{ts}_chunk*.json"))
         gps_csvs = glob.glob(os.path.join(RECORD_FOLDER, f"*gps_{ts}_chunk*.csv"))
         gps_csvs += glob.glob(os.path.join(RECORD_FOLDER, f"*{ts}_chunk*.csv"))
+        timing = glob.glob(os.path.join(RECORD_FOLDER, sidecar_name(f"{ts}_chunk*")))
+        timing += glob.glob(os.path.join(RECORD_FOLDER, manifest_name(ts)))
 
-        for f in chunks + gps_jsons + gps_csvs:
+        for f in chunks + gps_jsons + gps_csvs + timing:
             if os.path.exists(f) and RECORD_FOLDER in os.path.abspath(f):
                 os.remove(f)
+            key = chunk_key(f)
+            if key:
+                loop_retention.forget(key)
+                _forget_gps_chunk(key)
 
         return jsonify({"success": True, "message": f"Deleted {len(chunks)} chunks"})
 
@@ -1260,7 +2240,7 @@ def delete_batch():
 
 @app.route('/data/<filename>')
 def serve(filename):
-    return send_from_directory(RECORD_FOLDER, filename)
+    return _send_recording(filename)
 
 @app.route('/api/shutdown', methods=['POST'])
 def shutdown():
@@ -1299,24 +2279,52 @@ def list_logs():
     except Exception as e:
         return jsonify({"error": str(e)})
 
+@app.route('/api/metrics')
+def api_metrics():
+    return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
 @app.route('/api/download_log/<filename>')
 def download_log(filename):
     return send_from_directory(LOG_DIR, filename, as_attachment=True)
-if __name__ == '__main__':
-    from werkzeug.serving import WSGIRequestHandler
-    WSGIRequestHandler.protocol_version = "HTTP/1.1"
-
-    recover_orphaned_files()
-    generate_ssl_certificates()
 
+def run():
+    global app_running, led, files_http
+    # bind before anything slow so the phone app gets an answer immediately;
+    # the cert is reused from disk (a new P-256 key only takes milliseconds)
+    ssl_context = generate_ssl_certificates()
+    server = WebServer(app, '0.0.0.0', PORT, ssl_context=ssl_context,
+                       cert_file=tls.CERT_FILE, key_file=tls.KEY_FILE)
+    _mark_startup("http", "ready", "http_bound_s")
+    if FILES_HTTP_PORT:
+        try:
+            files_http = fileserve.SendfileServer(RECORD_FOLDER, '0.0.0.0', FILES_HTTP_PORT).start()
+            logging.warning(f"[HTTP] ⚠️ Recordings served UNENCRYPTED on http://0.0.0.0:{FILES_HTTP_PORT}/data/<file>")
+        except OSError as e:
+            logging.error(f"[HTTP] ✗ Plain-HTTP file server not started: {e}")
     threading.Thread(target=discovery_service, daemon=True).start()
+
+    led = LedController(LED_PIN)
+    threading.Thread(target=led_worker, daemon=True).start()
+    conversion_pool.start()
+    threading.Thread(target=startup_worker, daemon=True).start()
     threading.Thread(target=camera_worker, daemon=True).start()
+    threading.Thread(target=incident_upload_worker, daemon=True).start()
 
     try:
-        app.run(host='0.0.0.0', port=PORT, debug=False, threaded=True)
+        server.serve_forever()
     except KeyboardInterrupt:
         pass
     finally:
+        server.stop()
+        if files_http:
+            files_http.stop()
         app_running = False
+        _led_refresh()
+        led.stop()
         stop_audio_recording()
         time.sleep(1)
+        if audio_capture is not None:
+            audio_capture.stop()
+
+if __name__ == '__main__':
+    run()
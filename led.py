@@ -0,0 +1,195 @@
+"""
+Status LED driver for Smart Helmet
+The driver thread sleeps on a condition until the mode changes: steady
+modes cost nothing, square-wave blinks are handed to RPi.GPIO PWM, and
+only multi-step patterns (double blink, error codes) are stepped in Python,
+waking once per edge.
+"""
+
+import time
+import logging
+import threading
+
+# mode -> repeating list of (level, seconds)
+PATTERNS = {
+    "off": [(0, 0)],
+    "on": [(1, 0)],
+    "blink_fast": [(1, 0.15), (0, 0.15)],
+    "blink_slow": [(1, 0.8), (0, 0.8)],
+    "recording": [(1, 0.1), (0, 1.9)],                                  # heartbeat
+    "uploading": [(1, 0.1), (0, 0.1), (1, 0.1), (0, 0.7)],              # double blink
+    "low_storage": [(1, 0.1), (0, 0.1), (1, 0.1), (0, 0.1), (1, 0.1), (0, 1.5)],
+}
+
+ERROR_BLINK = 0.25
+ERROR_PAUSE = 1.5
+
+
+def pattern_for(mode):
+    """Steps for a mode; 'error:N' blinks N times then pauses. Unknown -> off."""
+    if mode in PATTERNS:
+        return PATTERNS[mode]
+    if mode.startswith("error:"):
+        try:
+            n = max(1, min(int(mode.split(":", 1)[1]), 9))
+        except ValueError:
+            n = 1
+        steps = []
+        for _ in range(n):
+            steps += [(1, ERROR_BLINK), (0, ERROR_BLINK)]
+        steps[-1] = (0, ERROR_PAUSE)
+        return steps
+    return PATTERNS["off"]
+
+
+class RpiGpioBackend:
+    def __init__(self, pin):
+        import RPi.GPIO as GPIO
+        self._gpio = GPIO
+        self.pin = pin
+        self._pwm = None
+        GPIO.setwarnings(False)
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(pin, GPIO.OUT)
+        GPIO.output(pin, GPIO.LOW)
+
+    def write(self, level):
+        self.pwm_stop()
+        self._gpio.output(self.pin, self._gpio.HIGH if level else self._gpio.LOW)
+
+    def pwm(self, freq, duty):
+        if self._pwm is None:
+            self._pwm = self._gpio.PWM(self.pin, freq)
+            self._pwm.start(duty)
+        else:
+            self._pwm.ChangeFrequency(freq)
+            self._pwm.ChangeDutyCycle(duty)
+
+    def pwm_stop(self):
+        if self._pwm is not None:
+            try:
+                self._pwm.stop()
+            except Exception:
+                pass
+            self._pwm = None
+
+    def close(self):
+        self.pwm_stop()
+        try:
+            self._gpio.output(self.pin, self._gpio.LOW)
+        except Exception:
+            pass
+        try:
+            self._gpio.cleanup(self.pin)
+        except Exception:
+            pass
+
+
+class FakeGpioBackend:
+    """Records (monotonic time, op, args) instead of touching hardware."""
+
+    def __init__(self, pin=None, pwm_supported=True):
+        self.pin = pin
+        self.pwm_supported = pwm_supported
+        self.events = []
+        self.level = 0
+        self.closed = False
+
+    def write(self, level):
+        self.level = level
+        self.events.append((time.monotonic(), "write", level))
+
+    def pwm(self, freq, duty):
+        if not self.pwm_supported:
+            raise RuntimeError("PWM not supported")
+        self.events.append((time.monotonic(), "pwm", (freq, duty)))
+
+    def pwm_stop(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def default_backend(pin):
+    try:
+        return RpiGpioBackend(pin)
+    except Exception as e:
+        logging.warning(f"[LED] GPIO unavailable ({e}), LED disabled")
+        return FakeGpioBackend(pin)
+
+
+class LedController:
+    def __init__(self, pin: int, backend=None):
+        self.pin = pin
+        self._backend = backend or default_backend(pin)
+        self._mode = "off"
+        self._stop = False
+        self._changed = True
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="led")
+        self._thread.start()
+
+    @property
+    def mode(self):
+        with self._cond:
+            return self._mode
+
+    def set_mode(self, mode: str):
+        with self._cond:
+            if mode == self._mode:
+                return
+            self._mode = mode
+            self._changed = True
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            if self._stop:
+                return
+            self._stop = True
+            self._cond.notify()
+        try:
+            self._thread.join(timeout=1)
+        except Exception:
+            pass
+        self._backend.close()
+
+    # ---------- driver thread ----------
+    def _wait_change(self, timeout=None):
+        """Called with the lock held. True if mode changed or stopping."""
+        if not (self._changed or self._stop):
+            self._cond.wait(timeout)
+        return self._changed or self._stop
+
+    def _run(self):
+        with self._cond:
+            while not self._stop:
+                self._changed = False
+                steps = pattern_for(self._mode)
+                try:
+                    self._play(steps)
+                except Exception as e:
+                    logging.error(f"[LED] {e}")
+                    self._wait_change()
+
+    def _play(self, steps):
+        if len(steps) == 1:
+            self._backend.write(steps[0][0])
+            self._wait_change()
+            return
+
+        if len(steps) == 2 and steps[0][0] == 1 and steps[1][0] == 0:
+            period = steps[0][1] + steps[1][1]
+            try:
+                self._backend.pwm(1.0 / period, 100.0 * steps[0][1] / period)
+                self._wait_change()
+                return
+            except Exception:
+                pass
+
+        while True:
+            for level, seconds in steps:
+                self._backend.write(level)
+                if self._wait_change(seconds):
+                    return
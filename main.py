@@ -5,106 +5,46 @@ import json
 import time
 import subprocess
 import logging
-import threading
 
 import cv2
-from picamera2 import Picamera2
-from libcamera import Transform
-from pyzbar.pyzbar import decode as zbar_decode
 
-import RPi.GPIO as GPIO
+from led import LedController
+from netmon import ConnectivityMonitor
+from qrscan import QrDetector, y_plane
+from debugstream import MjpegDebugServer
+from camera_service import open_camera, close_camera, LORES_WIDTH, LORES_HEIGHT
 
 # -------------------- CONFIG --------------------
 IGNORE_SSID = "PSRVJ"
 WLAN_IFACE = "wlan0"
 INIT_PY_PATH = os.path.join(os.path.dirname(__file__), "init.py")
-# Match main.py camera settings
-CAM_WIDTH, CAM_HEIGHT = 1640, 1232
-FPS = 30.0
+
+# QR decode: 1 = full lores resolution, 2 = decode at 320x240 until a code is seen
+QR_DOWNSAMPLE = 1
 
 # LED (GPIO 25)
 LED_PIN = 17
-LED_FAST_PERIOD = 0.15   # seconds (fast blink)
-LED_SLOW_PERIOD = 0.8    # seconds (slow blink)
 
 # UX
 COUNTDOWN_BEFORE_SWITCH = 5
 POST_CONNECT_WAIT = 2
+VERIFY_TIMEOUT = 15
 RESCAN_DELAY_ON_FAIL = 2
 
 WINDOW_NAME = "SmartHelmet QR Provisioning"
+
+# Headless: no OpenCV window, feedback via LED + logs only.
+# "auto" = headless when no X/Wayland display is available.
+HEADLESS = os.environ.get("SMARTHELMET_HEADLESS", "auto").lower()
+# Optional MJPEG debug view for headless units (0 = off)
+DEBUG_MJPEG_PORT = int(os.environ.get("SMARTHELMET_DEBUG_MJPEG_PORT", "0"))
+SUCCESS_HOLD_WINDOW = 10   # keep window/VNC up long enough to read the result
+SUCCESS_HOLD_HEADLESS = 2
 # ------------------------------------------------
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 
-# -------------------- LED CONTROL --------------------
-class LedController:
-    def __init__(self, pin: int):
-        self.pin = pin
-        self._mode = "off"       # off | on | blink_fast | blink_slow
-        self._stop = False
-        self._lock = threading.Lock()
-        self._thread = threading.Thread(target=self._run, daemon=True)
-
-        GPIO.setwarnings(False)
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(self.pin, GPIO.OUT)
-        GPIO.output(self.pin, GPIO.LOW)
-
-        self._thread.start()
-
-    def set_mode(self, mode: str):
-        with self._lock:
-            self._mode = mode
-
-    def stop(self):
-        self._stop = True
-        try:
-            self._thread.join(timeout=1)
-        except Exception:
-            pass
-        try:
-            GPIO.output(self.pin, GPIO.LOW)
-        except Exception:
-            pass
-        try:
-            GPIO.cleanup(self.pin)
-        except Exception:
-            pass
-
-    def _run(self):
-        state = False
-        while not self._stop:
-            with self._lock:
-                mode = self._mode
-
-            if mode == "off":
-                GPIO.output(self.pin, GPIO.LOW)
-                time.sleep(0.1)
-                continue
-
-            if mode == "on":
-                GPIO.output(self.pin, GPIO.HIGH)
-                time.sleep(0.1)
-                continue
-
-            if mode == "blink_fast":
-                state = not state
-                GPIO.output(self.pin, GPIO.HIGH if state else GPIO.LOW)
-                time.sleep(LED_FAST_PERIOD)
-                continue
-
-            if mode == "blink_slow":
-                state = not state
-                GPIO.output(self.pin, GPIO.HIGH if state else GPIO.LOW)
-                time.sleep(LED_SLOW_PERIOD)
-                continue
-
-            GPIO.output(self.pin, GPIO.LOW)
-            time.sleep(0.1)
-
-
 # -------------------- UTILS --------------------
 def run(cmd, timeout=50):
     return subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
@@ -118,32 +58,29 @@ def which(binary: str):
         return None
 
 
+# cached SSID / IPv4, refreshed on netlink events (see netmon.py)
+netmon = ConnectivityMonitor(WLAN_IFACE)
+
+
 def get_current_ssid():
-    try:
-        r = run(["iwgetid", "-r"], timeout=5)
-        ssid = (r.stdout or "").strip()
-        return ssid if ssid else None
-    except Exception:
-        return None
+    return netmon.ssid
 
 
 def has_ipv4():
-    try:
-        r = run(["ip", "-4", "addr", "show", WLAN_IFACE], timeout=5)
-        return "inet " in (r.stdout or "")
-    except Exception:
-        return False
+    return netmon.has_ipv4
 
 
-def verify_connected(expected_ssid: str = None):
-    ssid = get_current_ssid()
-    if not ssid:
-        return False, None
-    if expected_ssid and ssid != expected_ssid:
-        return False, ssid
-    if not has_ipv4():
-        return False, ssid
-    return True, ssid
+def verify_connected(expected_ssid: str = None, timeout: float = VERIFY_TIMEOUT):
+    def _ok(st):
+        if not st["ssid"]:
+            return False
+        if expected_ssid and st["ssid"] != expected_ssid:
+            return False
+        return bool(st["ipv4"])
+
+    netmon.refresh()
+    ok = netmon.wait_for(_ok, timeout)
+    return ok, netmon.ssid
 
 
 def parse_wifi_qr(payload: str):
@@ -225,8 +162,19 @@ def countdown(seconds: int, prefix: str):
 
 
 def launch_main_py():
-    logging.info("[BOOT] Launching Init.py now...")
-    os.execv("/usr/bin/python3", ["/usr/bin/python3", INIT_PY_PATH])
+    """
+    Switch to recording mode in this process so init.py reuses the camera
+    that is already streaming. Falls back to exec'ing init.py if it cannot
+    be imported.
+    """
+    logging.info("[BOOT] Switching to recording mode (camera stays open)...")
+    try:
+        import init
+    except Exception as e:
+        logging.error(f"[BOOT] In-process start failed ({e}), exec'ing init.py")
+        close_camera()
+        os.execv("/usr/bin/python3", ["/usr/bin/python3", INIT_PY_PATH])
+    init.run()
 
 
 def draw_overlay(bgr, ssid_now: str, msg: str):
@@ -244,21 +192,19 @@ def draw_overlay(bgr, ssid_now: str, msg: str):
                 cv2.FONT_HERSHEY_SIMPLEX, 0.55, (200, 200, 200), 2)
 
 
-def init_camera_like_main():
-    picam2 = Picamera2()
-    config = picam2.create_video_configuration(
-        main={"size": (CAM_WIDTH, CAM_HEIGHT), "format": "YUV420"},
-        lores={"size": (640, 480), "format": "YUV420"},
-        transform=Transform(hflip=True, vflip=True),
-        controls={"FrameRate": FPS},
-        buffer_count=6
-    )
-    config["sensor"]["output_size"] = (CAM_WIDTH, CAM_HEIGHT)
-    picam2.configure(config)
-    picam2.start()
-    picam2.set_controls({"ScalerCrop": (0, 0, 3280, 2464)})
-    time.sleep(0.5)
-    return picam2
+def is_headless():
+    if HEADLESS in ("1", "true", "yes"):
+        return True
+    if HEADLESS in ("0", "false", "no"):
+        return False
+    return not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def render_debug_jpeg(raw_yuv, msg):
+    bgr = cv2.cvtColor(raw_yuv, cv2.COLOR_YUV2BGR_I420)
+    draw_overlay(bgr, get_current_ssid(), msg)
+    ok, buf = cv2.imencode(".jpg", bgr, [cv2.IMWRITE_JPEG_QUALITY, 70])
+    return buf.tobytes() if ok else None
 
 
 def main():
@@ -271,28 +217,41 @@ def main():
         raise SystemExit(1)
 
     led = LedController(LED_PIN)
+    netmon.start()
 
-    picam2 = init_camera_like_main()
-
-    cv2.namedWindow(WINDOW_NAME, cv2.WINDOW_NORMAL)
-    cv2.resizeWindow(WINDOW_NAME, 900, 650)
+    picam2 = open_camera()
 
-    logging.info("[QR] Scanner running.")
     ssid = get_current_ssid()
 
     # If connected to something else, immediately start main.py (success mode)
     if ssid and ssid != IGNORE_SSID:
         led.set_mode("on")
         logging.info(f"[WIFI] Connected to SSID: {ssid}. Launching main.py ...")
-        time.sleep(1)
+        netmon.stop()
+        led.stop()
         launch_main_py()
+        return
+
+    headless = is_headless()
+    scan_msg = f"Show Wi-Fi QR. Will switch from {IGNORE_SSID}."
+    debug_server = None
+    if headless:
+        logging.info("[QR] Headless mode: LED + log feedback only")
+        if DEBUG_MJPEG_PORT:
+            debug_server = MjpegDebugServer(DEBUG_MJPEG_PORT, lambda f: render_debug_jpeg(f, scan_msg)).start()
+    else:
+        cv2.namedWindow(WINDOW_NAME, cv2.WINDOW_NORMAL)
+        cv2.resizeWindow(WINDOW_NAME, 900, 650)
 
+    logging.info("[QR] Scanner running.")
     logging.info(f"[WIFI] Current SSID: {ssid or 'None'}. IGNORE_SSID={IGNORE_SSID}. Keeping scan mode.")
     led.set_mode("blink_fast")
 
     last_payload = None
     last_time = 0.0
 
+    detector = QrDetector(downsample=QR_DOWNSAMPLE).start()
+
     try:
         while True:
             raw_yuv = picam2.capture_array("lores")
@@ -300,14 +259,19 @@ def main():
                 time.sleep(0.02)
                 continue
 
-            bgr = cv2.cvtColor(raw_yuv, cv2.COLOR_YUV2BGR_I420)
+            # decode runs on the Y plane in the detector thread
+            detector.submit(y_plane(raw_yuv, LORES_WIDTH, LORES_HEIGHT))
 
-            ssid_now = get_current_ssid()
-            draw_overlay(bgr, ssid_now, f"Show Wi-Fi QR. Will switch from {IGNORE_SSID}.")
+            if headless:
+                if debug_server:
+                    debug_server.publish(raw_yuv)
+            else:
+                bgr = cv2.cvtColor(raw_yuv, cv2.COLOR_YUV2BGR_I420)
+                draw_overlay(bgr, get_current_ssid(), scan_msg)
 
-            decoded = zbar_decode(bgr)
-            if decoded:
-                payload = decoded[0].data.decode("utf-8", errors="ignore").strip()
+            detected = detector.poll()
+            if detected:
+                payload = detected[0]
 
                 now = time.time()
                 if payload == last_payload and (now - last_time) < 2:
@@ -328,7 +292,8 @@ def main():
                         logging.info(f"     PASS: {target_pass}")
                         logging.info("--------------------------------------------------")
 
-                        countdown(COUNTDOWN_BEFORE_SWITCH, "[WIFI] Switching network")
+                        if not headless:
+                            countdown(COUNTDOWN_BEFORE_SWITCH, "[WIFI] Switching network")
 
                         okd, msgd = nmcli_disconnect()
                         logging.info(f"[WIFI] Disconnect: {'OK' if okd else 'WARN'} {msgd}")
@@ -346,7 +311,17 @@ def main():
                             if okv:
                                 logging.info(f"[WIFI] Verified connected to: {ssid_ver}")
                                 led.set_mode("on")
-                                time.sleep(10)  # success indication before network cuts your VNC
+                                # success indication before network cuts your VNC
+                                time.sleep(SUCCESS_HOLD_HEADLESS if headless else SUCCESS_HOLD_WINDOW)
+                                # free provisioning resources, keep the camera running
+                                detector.stop()
+                                if debug_server:
+                                    debug_server.stop()
+                                    debug_server = None
+                                if not headless:
+                                    cv2.destroyAllWindows()
+                                netmon.stop()
+                                led.stop()
                                 launch_main_py()
                                 return
                             else:
@@ -354,20 +329,23 @@ def main():
                                 led.set_mode("blink_fast")
                                 time.sleep(RESCAN_DELAY_ON_FAIL)
 
-            cv2.imshow(WINDOW_NAME, bgr)
-            key = cv2.waitKey(1) & 0xFF
-            if key == ord("q"):
-                break
+            if not headless:
+                cv2.imshow(WINDOW_NAME, bgr)
+                key = cv2.waitKey(1) & 0xFF
+                if key == ord("q"):
+                    break
 
     finally:
-        try:
-            picam2.stop()
-        except Exception:
-            pass
-        try:
-            cv2.destroyAllWindows()
-        except Exception:
-            pass
+        detector.stop()
+        close_camera()
+        if debug_server:
+            debug_server.stop()
+        if not headless:
+            try:
+                cv2.destroyAllWindows()
+            except Exception:
+                pass
+        netmon.stop()
         led.stop()
 
 
@@ -0,0 +1,280 @@
+"""
+Lightweight metrics registry (Prometheus text format)
+Counters and histograms keep one cell per writing thread, so the hot path
+is a thread-local lookup and a float add with no lock; cells are summed
+only when /api/metrics is scraped. Cells of finished threads are folded
+into a base value so short-lived upload threads don't accumulate.
+"""
+
+import math
+import time
+import bisect
+import threading
+import weakref
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _fmt(v):
+    if math.isnan(v):
+        return "NaN"
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    esc = lambda s: str(s).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+
+class _Sharded:
+    """Per-thread list cells of a fixed width, summed on read."""
+
+    def __init__(self, width):
+        self._width = width
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cells = []                 # (weakref to thread, cell)
+        self._base = [0.0] * width
+
+    def cell(self):
+        c = getattr(self._local, "c", None)
+        if c is None:
+            c = [0.0] * self._width
+            with self._lock:
+                self._cells.append((weakref.ref(threading.current_thread()), c))
+            self._local.c = c
+        return c
+
+    def totals(self):
+        with self._lock:
+            live = []
+            for ref, c in self._cells:
+                t = ref()
+                if t is None or not t.is_alive():
+                    for i, v in enumerate(c):
+                        self._base[i] += v
+                else:
+                    live.append((ref, c))
+            self._cells = live
+            out = list(self._base)
+            for _, c in live:
+                for i, v in enumerate(c):
+                    out[i] += v
+            return out
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._new_child()
+
+    def labels(self, *values):
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _items(self):
+        if not self.labelnames:
+            return [((), self._default)]
+        return sorted(self._children.items())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self._items():
+            lines += self._render_child(values, child)
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self._s = _Sharded(1)
+
+    def inc(self, n=1):
+        self._s.cell()[0] += n
+
+    def value(self):
+        return self._s.totals()[0]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, n=1):
+        self._default.inc(n)
+
+    def value(self):
+        return self._default.value()
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_labels(self.labelnames, values)} {_fmt(child.value())}"]
+
+
+class _GaugeChild:
+    def __init__(self, fn=None):
+        self._v = 0.0
+        self._fn = fn
+
+    def set(self, v):
+        self._v = v
+
+    def inc(self, n=1):
+        self._v += n
+
+    def dec(self, n=1):
+        self._v -= n
+
+    def value(self):
+        if self._fn is not None:
+            try:
+                return float(self._fn())
+            except Exception:
+                return math.nan
+        return self._v
+
+
+class Gauge(_Metric):
+    """set() from a single owner thread, or fn evaluated at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), fn=None):
+        self._fn = fn
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _GaugeChild(self._fn)
+
+    def set(self, v):
+        self._default.set(v)
+
+    def inc(self, n=1):
+        self._default.inc(n)
+
+    def dec(self, n=1):
+        self._default.dec(n)
+
+    def value(self):
+        return self._default.value()
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_labels(self.labelnames, values)} {_fmt(child.value())}"]
+
+
+class _Timer:
+    __slots__ = ("_h", "_t0")
+
+    def __init__(self, h):
+        self._h = h
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._h.observe(time.perf_counter() - self._t0)
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._buckets = buckets
+        # per-bucket counts, then +Inf count, sum
+        self._s = _Sharded(len(buckets) + 2)
+
+    def observe(self, v):
+        c = self._s.cell()
+        c[bisect.bisect_left(self._buckets, v)] += 1
+        c[-1] += v
+
+    def time(self):
+        return _Timer(self)
+
+    def snapshot(self):
+        t = self._s.totals()
+        cumulative, acc = [], 0
+        for n in t[:-1]:
+            acc += n
+            cumulative.append(acc)
+        return cumulative, t[-1]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, v):
+        self._default.observe(v)
+
+    def time(self):
+        return self._default.time()
+
+    def snapshot(self):
+        return self._default.snapshot()
+
+    def _render_child(self, values, child):
+        cumulative, total = child.snapshot()
+        lines = []
+        for le, n in zip(self.buckets + (math.inf,), cumulative):
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, ('le', _fmt(le)))} {_fmt(n)}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {_fmt(total)}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {_fmt(cumulative[-1])}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"duplicate metric {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=(), fn=None):
+        return self._add(Gauge(name, help, labelnames, fn))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for m in metrics:
+            lines += m.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
@@ -0,0 +1,181 @@
+"""
+Wi-Fi connectivity monitor for Smart Helmet
+Caches SSID / IPv4 state for one interface and refreshes it only when the
+kernel reports a link or address change over rtnetlink. SSID and address
+are read with ioctls (no fork); iwgetid is only used as a fallback,
+and polling only when netlink is unavailable.
+"""
+
+import time
+import errno
+import array
+import fcntl
+import socket
+import struct
+import select
+import logging
+import threading
+import subprocess
+
+# rtnetlink multicast groups
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+
+SIOCGIFADDR = 0x8915
+SIOCGIWESSID = 0x8B1B
+IW_ESSID_MAX_SIZE = 32
+
+
+def read_ssid_ioctl(iface):
+    """SSID via wireless-extensions ioctl. Returns str or None; raises if unsupported."""
+    buf = array.array("b", b"\x00" * (IW_ESSID_MAX_SIZE + 1))
+    addr, _ = buf.buffer_info()
+    req = struct.pack("16sPHH", iface.encode()[:15], addr, len(buf), 0)
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        res = fcntl.ioctl(s.fileno(), SIOCGIWESSID, req)
+    length = struct.unpack("16sPHH", res)[2]
+    ssid = buf.tobytes()[:length].rstrip(b"\x00").decode("utf-8", errors="ignore")
+    return ssid or None
+
+
+def read_ipv4_ioctl(iface):
+    """IPv4 address of iface or None."""
+    req = struct.pack("256s", iface.encode()[:15])
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            res = fcntl.ioctl(s.fileno(), SIOCGIFADDR, req)
+        return socket.inet_ntoa(res[20:24])
+    except OSError:
+        return None
+
+
+def read_ssid_subprocess(iface):
+    try:
+        r = subprocess.run(["iwgetid", "-r", iface], capture_output=True, text=True, timeout=5)
+        ssid = (r.stdout or "").strip()
+        return ssid or None
+    except Exception:
+        return None
+
+
+class ConnectivityMonitor:
+    """
+    snapshot() -> {"ssid", "ipv4", "updated"}; properties ssid / has_ipv4.
+    wait_for(pred, timeout) blocks until pred(snapshot) is true.
+    """
+
+    def __init__(self, iface="wlan0", poll_interval=5.0, debounce=0.2,
+                 read_ssid=None, read_ipv4=None):
+        self.iface = iface
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self._read_ssid = read_ssid or self._default_read_ssid
+        self._read_ipv4 = read_ipv4 or read_ipv4_ioctl
+        self._ssid_ioctl_ok = True
+        self._state = {"ssid": None, "ipv4": None, "updated": 0.0}
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self.source = None
+
+    # ---------- state ----------
+    @property
+    def ssid(self):
+        with self._cond:
+            return self._state["ssid"]
+
+    @property
+    def has_ipv4(self):
+        with self._cond:
+            return bool(self._state["ipv4"])
+
+    def snapshot(self):
+        with self._cond:
+            return dict(self._state)
+
+    def refresh(self):
+        ssid = self._read_ssid(self.iface)
+        ipv4 = self._read_ipv4(self.iface)
+        with self._cond:
+            changed = (ssid, ipv4) != (self._state["ssid"], self._state["ipv4"])
+            self._state = {"ssid": ssid, "ipv4": ipv4, "updated": time.time()}
+            self._cond.notify_all()
+        if changed:
+            logging.info(f"[NET] {self.iface}: SSID={ssid or 'None'} IPv4={ipv4 or 'None'}")
+        return self.snapshot()
+
+    def wait_for(self, predicate, timeout):
+        deadline = time.time() + timeout
+        with self._cond:
+            while not predicate(dict(self._state)):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if self._running:
+            return self
+        self.refresh()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="netmon")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _run(self):
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE))
+        except Exception as e:
+            logging.warning(f"[NET] Netlink unavailable ({e}), polling every {self.poll_interval}s")
+            self.source = "poll"
+            self._poll_loop()
+            return
+
+        self.source = "netlink"
+        try:
+            while self._running:
+                r, _, _ = select.select([sock], [], [], 1.0)
+                if not r:
+                    continue
+                sock.recv(65536)
+                # association + DHCP produce a burst of messages: coalesce them
+                end = time.time() + self.debounce
+                while time.time() < end:
+                    r, _, _ = select.select([sock], [], [], max(0.0, end - time.time()))
+                    if r:
+                        sock.recv(65536)
+                self._safe_refresh()
+        finally:
+            sock.close()
+
+    def _poll_loop(self):
+        while self._running:
+            time.sleep(self.poll_interval)
+            self._safe_refresh()
+
+    def _safe_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logging.error(f"[NET] Refresh failed: {e}")
+
+    def _default_read_ssid(self, iface):
+        if self._ssid_ioctl_ok:
+            try:
+                return read_ssid_ioctl(iface)
+            except OSError as e:
+                if e.errno not in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL):
+                    return None
+                logging.info(f"[NET] SSID ioctl not supported on {iface}, using iwgetid")
+                self._ssid_ioctl_ok = False
+        return read_ssid_subprocess(iface)
@@ -0,0 +1,329 @@
+"""
+Still photo helpers for Smart Helmet
+Builds a minimal EXIF (APP1) block with GPS tags and splices it into an
+encoded JPEG, so the full-resolution frame is only compressed once.
+PhotoEngine runs single / burst / interval (timelapse) capture jobs.
+"""
+
+import os
+import time
+import struct
+import logging
+import datetime
+import threading
+from fractions import Fraction
+from concurrent.futures import ThreadPoolExecutor
+
+# TIFF types
+_BYTE, _ASCII, _SHORT, _LONG, _RATIONAL = 1, 2, 3, 4, 5
+
+# IFD0 tags
+TAG_MAKE = 0x010F
+TAG_MODEL = 0x0110
+TAG_DATETIME = 0x0132
+TAG_GPS_IFD = 0x8825
+
+# GPS IFD tags
+GPS_VERSION = 0x0000
+GPS_LAT_REF = 0x0001
+GPS_LAT = 0x0002
+GPS_LON_REF = 0x0003
+GPS_LON = 0x0004
+GPS_TIMESTAMP = 0x0007
+GPS_SPEED_REF = 0x000C
+GPS_SPEED = 0x000D
+GPS_DATESTAMP = 0x001D
+GPS_H_ERROR = 0x001F
+
+
+def _rational(value, max_den=1000000):
+    f = Fraction(float(value)).limit_denominator(max_den)
+    return (f.numerator, f.denominator)
+
+
+def _dms(deg_float):
+    d = abs(float(deg_float))
+    deg = int(d)
+    minutes_f = (d - deg) * 60
+    minutes = int(minutes_f)
+    seconds = (minutes_f - minutes) * 60
+    return [(deg, 1), (minutes, 1), _rational(round(seconds, 4), 10000)]
+
+
+def _pack_ifd(entries, ifd_offset, next_ifd=0):
+    """
+    entries: list of (tag, type, values). values is bytes for ASCII/BYTE,
+    list of ints for SHORT/LONG, list of (num, den) for RATIONAL.
+    Returns bytes of the IFD followed by its out-of-line data.
+    """
+    entries = sorted(entries, key=lambda e: e[0])
+    head_len = 2 + 12 * len(entries) + 4
+    data_offset = ifd_offset + head_len
+    head = struct.pack(">H", len(entries))
+    data = b""
+
+    for tag, typ, values in entries:
+        if typ in (_ASCII, _BYTE):
+            raw = bytes(values)
+            count = len(raw)
+        elif typ == _SHORT:
+            raw = b"".join(struct.pack(">H", v) for v in values)
+            count = len(values)
+        elif typ == _LONG:
+            raw = b"".join(struct.pack(">I", v) for v in values)
+            count = len(values)
+        else:
+            raw = b"".join(struct.pack(">II", n, d) for n, d in values)
+            count = len(values)
+
+        if len(raw) <= 4:
+            head += struct.pack(">HHI", tag, typ, count) + raw.ljust(4, b"\x00")
+        else:
+            head += struct.pack(">HHII", tag, typ, count, data_offset + len(data))
+            data += raw
+            if len(data) % 2:
+                data += b"\x00"
+
+    head += struct.pack(">I", next_ifd)
+    return head + data
+
+
+def build_gps_exif(lat, lon, accuracy=None, speed=None, when=None,
+                   make="ThinkingRobot", model="SmartHelmet"):
+    """
+    Return a complete APP1 segment (FFE1 ... ) with IFD0 + GPS IFD.
+    speed is m/s (browser geolocation), stored as km/h.
+    lat/lon of exactly 0,0 means no fix: the GPS IFD is omitted.
+    """
+    when = when or datetime.datetime.now()
+    has_fix = (float(lat or 0.0) != 0.0 or float(lon or 0.0) != 0.0)
+
+    ifd0 = [
+        (TAG_MAKE, _ASCII, make.encode() + b"\x00"),
+        (TAG_MODEL, _ASCII, model.encode() + b"\x00"),
+        (TAG_DATETIME, _ASCII, when.strftime("%Y:%m:%d %H:%M:%S").encode() + b"\x00"),
+    ]
+    if has_fix:
+        ifd0.append((TAG_GPS_IFD, _LONG, [0]))
+
+    # TIFF header is 8 bytes, IFD0 starts right after it
+    ifd0_bytes = _pack_ifd(ifd0, 8)
+
+    gps_bytes = b""
+    if has_fix:
+        gps_offset = 8 + len(ifd0_bytes)
+        ifd0[-1] = (TAG_GPS_IFD, _LONG, [gps_offset])
+        ifd0_bytes = _pack_ifd(ifd0, 8)
+
+        utc = when.astimezone(datetime.timezone.utc)   # naive values are local time
+        gps = [
+            (GPS_VERSION, _BYTE, bytes([2, 2, 0, 0])),
+            (GPS_LAT_REF, _ASCII, (b"N" if float(lat) >= 0 else b"S") + b"\x00"),
+            (GPS_LAT, _RATIONAL, _dms(lat)),
+            (GPS_LON_REF, _ASCII, (b"E" if float(lon) >= 0 else b"W") + b"\x00"),
+            (GPS_LON, _RATIONAL, _dms(lon)),
+            (GPS_TIMESTAMP, _RATIONAL, [(utc.hour, 1), (utc.minute, 1), (utc.second, 1)]),
+            (GPS_DATESTAMP, _ASCII, utc.strftime("%Y:%m:%d").encode() + b"\x00"),
+        ]
+        if speed is not None:
+            gps.append((GPS_SPEED_REF, _ASCII, b"K\x00"))
+            gps.append((GPS_SPEED, _RATIONAL, [_rational(max(0.0, float(speed)) * 3.6, 100)]))
+        if accuracy:
+            gps.append((GPS_H_ERROR, _RATIONAL, [_rational(max(0.0, float(accuracy)), 100)]))
+        gps_bytes = _pack_ifd(gps, gps_offset)
+
+    tiff = b"MM\x00\x2a" + struct.pack(">I", 8) + ifd0_bytes + gps_bytes
+    payload = b"Exif\x00\x00" + tiff
+    return b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+
+
+def insert_exif(jpeg_bytes, app1):
+    """Splice an APP1 segment in right after SOI (drops an existing EXIF APP1)."""
+    if not jpeg_bytes.startswith(b"\xff\xd8"):
+        raise ValueError("Not a JPEG")
+
+    pos = 2
+    out = [b"\xff\xd8", app1]
+    # copy APPn segments except a previous Exif APP1
+    while pos + 4 <= len(jpeg_bytes) and jpeg_bytes[pos] == 0xFF and 0xE0 <= jpeg_bytes[pos + 1] <= 0xEF:
+        seg_len = struct.unpack(">H", jpeg_bytes[pos + 2:pos + 4])[0]
+        seg = jpeg_bytes[pos:pos + 2 + seg_len]
+        if not (jpeg_bytes[pos + 1] == 0xE1 and seg[4:10] == b"Exif\x00\x00"):
+            out.append(seg)
+        pos += 2 + seg_len
+    out.append(jpeg_bytes[pos:])
+    return b"".join(out)
+
+
+class PhotoEngine:
+    """
+    Burst / interval / single still capture.
+
+    grab()                         -> frame (blocks until the next camera frame)
+    encode(frame, path, gps, when) -> writes the JPEG
+    gps()                          -> dict snapshot of the current fix
+
+    Each job captures on its own thread and hands frames to an encoder
+    pool, so neither camera_worker nor the HTTP thread waits for JPEG work.
+    max_pending bounds raw frames held in memory waiting for an encoder.
+    """
+
+    MAX_BURST = 100
+    MIN_INTERVAL = 0.5
+
+    def __init__(self, grab, encode, gps, folder, workers=2, max_pending=24, fallback=None):
+        self._grab = grab
+        self._encode = encode
+        self._gps = gps
+        self._fallback = fallback
+        self.folder = folder
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="photo-enc")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._grab_lock = threading.Lock()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    # ---------- public ----------
+    def single(self, path, when=None):
+        job = self._new_job("single", 1)
+        threading.Thread(target=self._run_single, args=(job, path, when), daemon=True).start()
+        return self.status(job["id"])
+
+    def burst(self, count):
+        count = max(1, min(int(count), self.MAX_BURST))
+        job = self._new_job("burst", count)
+        threading.Thread(target=self._run_burst, args=(job,), daemon=True).start()
+        return self.status(job["id"])
+
+    def interval(self, every, duration):
+        every = max(self.MIN_INTERVAL, float(every))
+        duration = max(every, float(duration))
+        job = self._new_job("interval", int(duration / every + 1e-9) + 1)
+        job["every"] = every
+        job["duration"] = duration
+        threading.Thread(target=self._run_interval, args=(job,), daemon=True).start()
+        return self.status(job["id"])
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(int(job_id))
+        if not job:
+            return False
+        job["_stop"].set()
+        return True
+
+    def status(self, job_id=None):
+        with self._lock:
+            jobs = [self._jobs[int(job_id)]] if job_id is not None and int(job_id) in self._jobs else list(self._jobs.values())
+            out = [{k: v for k, v in j.items() if not k.startswith("_")} for j in jobs]
+        if job_id is not None:
+            return out[0] if out else None
+        return out
+
+    # ---------- jobs ----------
+    def _new_job(self, kind, planned):
+        when = datetime.datetime.now()
+        with self._lock:
+            job_id = self._next_id
+            self._next_id += 1
+            job = {
+                "id": job_id,
+                "kind": kind,
+                "state": "running",
+                "planned": planned,
+                "captured": 0,
+                "saved": 0,
+                "failed": 0,
+                "started": when.strftime("%Y-%m-%d %H:%M:%S"),
+                "_ts": when.strftime("%Y%m%d_%H%M%S"),
+                "_stop": threading.Event(),
+                "_pending": 0,
+            }
+            self._jobs[job_id] = job
+            # keep the job table small
+            for old in sorted(self._jobs)[:-20]:
+                if self._jobs[old]["state"] != "running":
+                    del self._jobs[old]
+        return job
+
+    def _run_single(self, job, path, when):
+        when = when or datetime.datetime.now()
+        gps = self._gps()
+        try:
+            frame = self._grab_frame()
+        except Exception as e:
+            logging.warning(f"[PHOTO] Full-res capture failed ({e})")
+            ok = bool(self._fallback and self._fallback(path, gps))
+            with self._lock:
+                job["saved" if ok else "failed"] += 1
+                job["state"] = "done"
+            return
+        self._submit(job, frame, path, gps, when)
+        self._finish(job)
+
+    def _run_burst(self, job):
+        for i in range(job["planned"]):
+            if job["_stop"].is_set():
+                break
+            if not self._capture_into(job, f"img_{job['_ts']}_burst{i:03d}.jpg"):
+                break
+        self._finish(job)
+
+    def _run_interval(self, job):
+        start = time.monotonic()
+        for i in range(job["planned"]):
+            delay = start + i * job["every"] - time.monotonic()
+            if job["_stop"].is_set() or (delay > 0 and job["_stop"].wait(delay)):
+                break
+            self._capture_into(job, f"img_{job['_ts']}_tl{i:04d}.jpg")
+        self._finish(job)
+
+    # ---------- pipeline ----------
+    def _grab_frame(self):
+        with self._grab_lock:
+            return self._grab()
+
+    def _capture_into(self, job, name):
+        when = datetime.datetime.now()
+        gps = self._gps()
+        self._slots.acquire()
+        try:
+            frame = self._grab_frame()
+        except Exception as e:
+            self._slots.release()
+            logging.warning(f"[PHOTO] {job['kind']} capture failed: {e}")
+            with self._lock:
+                job["failed"] += 1
+            return False
+        self._submit(job, frame, os.path.join(self.folder, name), gps, when, slot_held=True)
+        return True
+
+    def _submit(self, job, frame, path, gps, when, slot_held=False):
+        with self._lock:
+            job["captured"] += 1
+            job["_pending"] += 1
+        self._pool.submit(self._encode_one, job, frame, path, gps, when, slot_held)
+
+    def _encode_one(self, job, frame, path, gps, when, slot_held):
+        try:
+            self._encode(frame, path, gps, when)
+            ok = True
+        except Exception as e:
+            logging.error(f"[PHOTO] Encode failed for {os.path.basename(path)}: {e}")
+            ok = False
+        finally:
+            if slot_held:
+                self._slots.release()
+        with self._lock:
+            job["saved" if ok else "failed"] += 1
+            job["_pending"] -= 1
+            if job["state"] == "capturing_done" and job["_pending"] == 0:
+                job["state"] = "cancelled" if job["_stop"].is_set() else "done"
+
+    def _finish(self, job):
+        with self._lock:
+            if job["state"] == "running":
+                job["state"] = "done" if job["_pending"] == 0 else "capturing_done"
+            if job["_stop"].is_set() and job["state"] == "done":
+                job["state"] = "cancelled"
@@ -0,0 +1,154 @@
+"""
+QR detection pipeline for provisioning
+Decodes the Y (luma) plane of the lores I420 frame directly - no colour
+conversion - on a worker thread that always takes the newest frame, so
+the preview loop never waits for zbar. Once a code is seen, later frames
+are decoded only inside a region of interest around it.
+"""
+
+import time
+import logging
+import threading
+
+
+def y_plane(i420, width, height):
+    """Luma plane of an I420 frame (H*3/2 x W array) as a view, no copy."""
+    return i420[:height, :width]
+
+
+def _zbar_decode(gray):
+    from pyzbar.pyzbar import decode, ZBarSymbol
+    out = []
+    for d in decode(gray, symbols=[ZBarSymbol.QRCODE]):
+        r = d.rect
+        out.append((d.data, (r.left, r.top, r.width, r.height)))
+    return out
+
+
+class QrDetector:
+    """
+    submit(gray) -> hands a frame to the worker (older unprocessed frame dropped)
+    poll()       -> newest result (payload str, rect) once, else None
+
+    downsample: decode full frames at 1/N resolution (N=1 disables).
+    ROI: after a hit, decode only rect grown by roi_margin; fall back to
+    full frames after roi_misses consecutive misses.
+    """
+
+    def __init__(self, decode=None, downsample=1, track_roi=True, roi_margin=0.6, roi_misses=5):
+        self._decode = decode or _zbar_decode
+        self.downsample = max(1, int(downsample))
+        self.track_roi = track_roi
+        self.roi_margin = roi_margin
+        self.roi_misses = roi_misses
+
+        self._roi = None
+        self._misses = 0
+        self._cond = threading.Condition()
+        self._frame = None
+        self._result = None
+        self._running = False
+        self._thread = None
+
+        self.frames_in = 0
+        self.frames_decoded = 0
+        self.decode_time = 0.0
+
+    # ---------- threading ----------
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="qr-decode")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def submit(self, gray):
+        with self._cond:
+            self._frame = gray
+            self.frames_in += 1
+            self._cond.notify()
+
+    def poll(self):
+        with self._cond:
+            res, self._result = self._result, None
+            return res
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and self._frame is None:
+                    self._cond.wait(0.5)
+                if not self._running:
+                    return
+                # capture_array() already returns a private copy
+                frame, self._frame = self._frame, None
+            try:
+                res = self.detect(frame)
+            except Exception as e:
+                logging.error(f"[QR] Decode error: {e}")
+                continue
+            if res:
+                with self._cond:
+                    self._result = res
+
+    # ---------- detection ----------
+    def detect(self, gray):
+        """Synchronous decode of one luma frame. Returns (payload, rect) or None."""
+        t0 = time.perf_counter()
+        try:
+            if self._roi is not None:
+                res = self._detect_roi(gray)
+                if res:
+                    return res
+                self._misses += 1
+                if self._misses < self.roi_misses:
+                    return None
+                self._roi = None
+            return self._detect_full(gray)
+        finally:
+            self.frames_decoded += 1
+            self.decode_time += time.perf_counter() - t0
+
+    def _detect_full(self, gray):
+        n = self.downsample
+        img = gray[::n, ::n] if n > 1 else gray
+        hits = self._decode(img)
+        if not hits:
+            return None
+        data, (x, y, w, h) = hits[0]
+        rect = (x * n, y * n, w * n, h * n)
+        self._set_roi(rect, gray.shape)
+        return self._payload(data), rect
+
+    def _detect_roi(self, gray):
+        x0, y0, x1, y1 = self._roi
+        hits = self._decode(gray[y0:y1, x0:x1])
+        if not hits:
+            return None
+        data, (x, y, w, h) = hits[0]
+        rect = (x + x0, y + y0, w, h)
+        self._set_roi(rect, gray.shape)
+        return self._payload(data), rect
+
+    def _set_roi(self, rect, shape):
+        if not self.track_roi:
+            return
+        x, y, w, h = rect
+        mx, my = int(w * self.roi_margin), int(h * self.roi_margin)
+        self._roi = (max(0, x - mx), max(0, y - my), min(shape[1], x + w + mx), min(shape[0], y + h + my))
+        self._misses = 0
+
+    @staticmethod
+    def _payload(data):
+        if isinstance(data, bytes):
+            data = data.decode("utf-8", errors="ignore")
+        return data.strip()
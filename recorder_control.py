@@ -0,0 +1,136 @@
+"""
+Recording control state machine
+API threads submit commands; camera_worker (the only thread that touches
+the encoder) takes them between frames and moves the recorder through
+
+    idle -> starting -> recording <-> rotating
+                        recording -> stopping -> idle
+    starting / rotating / stopping -> error -> starting | idle
+
+Each command carries a Future, so /api/start_record can wait until the
+encoder is really running and report how long that took.
+"""
+
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+IDLE = "idle"
+STARTING = "starting"
+RECORDING = "recording"
+ROTATING = "rotating"
+STOPPING = "stopping"
+ERROR = "error"
+
+_TRANSITIONS = {
+    IDLE: {STARTING},
+    STARTING: {RECORDING, ERROR},
+    RECORDING: {ROTATING, STOPPING},
+    ROTATING: {RECORDING, ERROR},
+    STOPPING: {IDLE, ERROR},
+    ERROR: {STARTING, IDLE},
+}
+
+
+class RecorderError(Exception):
+    pass
+
+
+class RecorderTimeout(RecorderError):
+    pass
+
+
+class Command:
+    __slots__ = ("name", "future", "submitted")
+
+    def __init__(self, name):
+        self.name = name
+        self.future = Future()
+        self.submitted = time.monotonic()
+
+
+class RecorderControl:
+    def __init__(self):
+        self._commands = queue.Queue()
+        self._lock = threading.Lock()
+        self._state = IDLE
+        self._since = time.monotonic()
+        self.started_at = None       # wall clock of the current recording
+        self.error = None
+        self.latency_ms = {}         # last completed command of each kind
+
+    @property
+    def state(self):
+        return self._state
+
+    @property
+    def recording(self):
+        return self._state in (RECORDING, ROTATING)
+
+    # ---------- API side ----------
+    def submit(self, name):
+        cmd = Command(name)
+        self._commands.put(cmd)
+        return cmd.future
+
+    def request(self, name, timeout):
+        """Submit and wait for the camera thread; raises RecorderError."""
+        future = self.submit(name)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            # still queued: it runs once the camera thread gets to it
+            raise RecorderTimeout(f"{name} not handled within {timeout}s (state {self._state})")
+
+    # ---------- camera thread side ----------
+    def next_command(self):
+        try:
+            return self._commands.get_nowait()
+        except queue.Empty:
+            return None
+
+    def transition(self, new, error=None):
+        with self._lock:
+            old = self._state
+            if new not in _TRANSITIONS[old]:
+                raise RecorderError(f"invalid transition {old} -> {new}")
+            self._state = new
+            self._since = time.monotonic()
+            if new == STARTING:
+                self.error = None
+            elif new == RECORDING and old == STARTING:
+                self.started_at = time.time()
+            elif new in (IDLE, ERROR):
+                self.started_at = None
+            if new == ERROR:
+                self.error = error
+        logging.info(f"[RECORD] {old} -> {new}" + (f" ({error})" if error else ""))
+
+    def complete(self, cmd, **extra):
+        latency = round((time.monotonic() - cmd.submitted) * 1000, 1)
+        self.latency_ms[cmd.name] = latency
+        if not cmd.future.done():
+            cmd.future.set_result(dict(extra, state=self._state, latency_ms=latency))
+
+    def fail(self, cmd, err):
+        if not cmd.future.done():
+            cmd.future.set_exception(RecorderError(str(err)))
+
+    def cancel_pending(self, reason):
+        while True:
+            cmd = self.next_command()
+            if cmd is None:
+                return
+            self.fail(cmd, reason)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "state": self._state,
+                "state_for_s": round(time.monotonic() - self._since, 1),
+                "error": self.error,
+                "latency_ms": dict(self.latency_ms),
+                "pending": self._commands.qsize(),
+            }
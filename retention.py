@@ -0,0 +1,307 @@
+"""
+Loop-recording retention for Smart Helmet
+Keeps an in-memory index of finished chunks (oldest first) so the oldest
+non-locked chunks can be deleted once the footprint limit is reached.
+The recordings folder is scanned once by seed(); rotations only touch the index.
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from frametiming import sidecar_name
+
+LOCKED_INDEX_NAME = ".locked_chunks.json"
+
+VIDEO_PREFIXES = ("video_", "uploaded_", "failed_upload_")
+SIDECAR_PREFIXES = ("gps_", "uploaded_gps_", "failed_upload_gps_")
+SIDECAR_EXTS = (".json", ".csv")
+
+JOINED_SUFFIX = "_full"      # concat.output_name(): a whole session joined into one MP4
+
+_CHUNK_RE = re.compile(r"^(?:video_|uploaded_|failed_upload_)(.+_chunk\d{3}|\d{8}_\d{6}_full)\.mp4$")
+
+
+def chunk_key(filename: str):
+    """
+    'video_20251225_211046_chunk003.mp4' -> '20251225_211046_chunk003'
+    Works for temp_/audio_/gps_ names too, and gives '<ts>_full' for a joined
+    session. Returns None if not a chunk name.
+    """
+    base = os.path.basename(filename)
+    m = _CHUNK_RE.match(base)
+    if m:
+        return m.group(1)
+    m = re.match(r"^(?:temp_|audio_|incomplete_|gps_)(.+_chunk\d{3})\.\w+$", base)
+    return m.group(1) if m else None
+
+
+def chunk_files(folder: str, key: str):
+    """Existing files (video + GPS sidecars) that belong to a chunk key."""
+    out = []
+    for prefix in VIDEO_PREFIXES:
+        p = os.path.join(folder, f"{prefix}{key}.mp4")
+        if os.path.exists(p):
+            out.append(p)
+    for prefix in SIDECAR_PREFIXES:
+        for ext in SIDECAR_EXTS:
+            p = os.path.join(folder, f"{prefix}{key}{ext}")
+            if os.path.exists(p):
+                out.append(p)
+    p = os.path.join(folder, sidecar_name(key))
+    if os.path.exists(p):
+        out.append(p)
+    return out
+
+
+class ChunkRetention:
+    """
+    Index of finished chunks: key -> {"size", "start", "end", "locked"}.
+
+    max_bytes=None disables eviction (locking still works).
+    Locked chunks are never evicted; locked keys are persisted in
+    LOCKED_INDEX_NAME so incidents survive a reboot.
+    """
+
+    def __init__(self, folder: str, max_bytes=None):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self._chunks = OrderedDict()
+        self._total = 0
+        self._windows = []
+        self._expected = {}          # key -> start of chunks recording/converting, not added yet
+        self._locked = set()
+        self._lock = threading.Lock()
+
+    # ---------- startup ----------
+    def seed(self):
+        """One-time scan of the folder. Returns number of chunks indexed."""
+        self._locked = set(self._read_locked_index())
+        found = []
+        try:
+            names = os.listdir(self.folder)
+        except Exception:
+            names = []
+        for n in names:
+            key = chunk_key(n)
+            if not key or not n.endswith(".mp4"):
+                continue
+            try:
+                mtime = os.path.getmtime(os.path.join(self.folder, n))
+            except Exception:
+                continue
+            found.append((mtime, key))
+
+        found.sort()
+        with self._lock:
+            for mtime, key in found:
+                if key in self._chunks:
+                    continue
+                size = self._disk_size(key)
+                self._chunks[key] = {
+                    "size": size,
+                    "start": mtime,
+                    "end": mtime,
+                    "locked": key in self._locked,
+                }
+                self._total += size
+        return len(found)
+
+    # ---------- rotation path ----------
+    def expect(self, key: str, start: float):
+        """A chunk started recording; incident windows are kept until it is added."""
+        with self._lock:
+            self._expected[key] = start
+
+    def add(self, key: str, start: float, end: float, size=None):
+        """
+        Register a finished chunk and enforce the footprint.
+        Returns (newly_locked: bool, evicted: list of keys).
+        """
+        if size is None:
+            size = self._disk_size(key)
+        with self._lock:
+            old = self._chunks.pop(key, None)
+            if old:
+                self._total -= old["size"]
+            self._expected.pop(key, None)
+            locked = key in self._locked or self._in_window(start, end)
+            newly_locked = locked and key not in self._locked
+            self._chunks[key] = {"size": size, "start": start, "end": end, "locked": locked}
+            self._total += size
+            if newly_locked:
+                self._locked.add(key)
+            self._prune_windows()
+        if newly_locked:
+            self._write_locked_index()
+        return newly_locked, self.enforce()
+
+    def add_joined(self, key: str):
+        """
+        Register a joined session copy so it counts toward the footprint.
+        It duplicates chunks that are still on disk: never locked, evicted first.
+        """
+        size = self._disk_size(key)
+        try:
+            mtime = os.path.getmtime(os.path.join(self.folder, f"video_{key}.mp4"))
+        except OSError:
+            mtime = 0.0
+        with self._lock:
+            old = self._chunks.pop(key, None)
+            if old:
+                self._total -= old["size"]
+            self._chunks[key] = {"size": size, "start": mtime, "end": mtime, "locked": False}
+            self._total += size
+        return self.enforce()
+
+    def enforce(self):
+        """Delete oldest non-locked chunks until under max_bytes. Returns evicted keys."""
+        if self.max_bytes is None:
+            return []
+        evicted = []
+        with self._lock:
+            if self._total <= self.max_bytes:
+                return []
+            # joined copies first, then by start time: chunks may be added out of
+            # order by parallel conversions
+            order = sorted(self._chunks, key=lambda k: (not k.endswith(JOINED_SUFFIX), self._chunks[k]["start"]))
+            for key in order:
+                if self._total <= self.max_bytes:
+                    break
+                info = self._chunks[key]
+                if info["locked"]:
+                    continue
+                del self._chunks[key]
+                self._total -= info["size"]
+                evicted.append(key)
+            self._prune_windows()
+
+        for key in evicted:
+            for p in chunk_files(self.folder, key):
+                try:
+                    os.remove(p)
+                except Exception as e:
+                    logging.warning(f"[LOOP] Could not delete {p}: {e}")
+            logging.info(f"[LOOP] ♻️ Overwrote oldest chunk: {key}")
+        return evicted
+
+    # ---------- incidents ----------
+    def lock_window(self, start: float, end: float):
+        """
+        Keep every chunk overlapping [start, end], including chunks that
+        finish later. Returns keys of already-finished chunks newly locked.
+        """
+        newly = []
+        with self._lock:
+            self._windows.append((start, end))
+            for key, info in self._chunks.items():
+                if not info["locked"] and info["start"] <= end and info["end"] >= start:
+                    info["locked"] = True
+                    self._locked.add(key)
+                    newly.append(key)
+        if newly:
+            self._write_locked_index()
+        return newly
+
+    def unlock(self, key: str):
+        with self._lock:
+            self._locked.discard(key)
+            if key in self._chunks:
+                self._chunks[key]["locked"] = False
+        self._write_locked_index()
+
+    def forget(self, key: str):
+        """Drop a chunk the user deleted from the index (renames go through rename())."""
+        with self._lock:
+            info = self._chunks.pop(key, None)
+            if info:
+                self._total -= info["size"]
+            self._expected.pop(key, None)
+            self._locked.discard(key)
+
+    def rename(self, old_key: str, new_key):
+        """
+        Move a chunk the user renamed to its new key (files already renamed),
+        keeping its lock. new_key=None means it is no longer a chunk name.
+        """
+        size = self._disk_size(new_key) if new_key else 0
+        with self._lock:
+            info = self._chunks.pop(old_key, None)
+            was_locked = old_key in self._locked
+            self._locked.discard(old_key)
+            if info:
+                self._total -= info["size"]
+                if new_key:
+                    info["size"] = size
+                    self._chunks[new_key] = info
+                    self._total += size
+            if new_key and was_locked:
+                self._locked.add(new_key)
+        if was_locked:
+            self._write_locked_index()
+
+    def is_locked(self, key: str):
+        with self._lock:
+            return key in self._locked
+
+    def stats(self):
+        with self._lock:
+            return {
+                "chunks": len(self._chunks),
+                "locked": len(self._locked),
+                "used_mb": round(self._total / (1024 * 1024), 2),
+                "max_mb": round(self.max_bytes / (1024 * 1024), 2) if self.max_bytes is not None else None,
+            }
+
+    # ---------- internals ----------
+    def _in_window(self, start, end):
+        for ws, we in self._windows:
+            if start <= we and end >= ws:
+                return True
+        return False
+
+    def _prune_windows(self):
+        """
+        Incident windows only matter for chunks that are still to be added:
+        the expected ones (recording or converting, possibly finishing out of
+        order) and later ones. Windows that ended before the oldest of those
+        and the oldest evictable chunk are done. Caller holds _lock.
+        """
+        if not self._windows or not (self._chunks or self._expected):
+            return
+        starts = [c["start"] for c in self._chunks.values() if not c["locked"]]
+        starts += self._expected.values()
+        horizon = min(starts) if starts else max(c["start"] for c in self._chunks.values())
+        self._windows = [(ws, we) for ws, we in self._windows if we >= horizon]
+
+    def _disk_size(self, key):
+        total = 0
+        for p in chunk_files(self.folder, key):
+            try:
+                total += os.path.getsize(p)
+            except Exception:
+                pass
+        return total
+
+    def _read_locked_index(self):
+        try:
+            with open(os.path.join(self.folder, LOCKED_INDEX_NAME), "r") as f:
+                data = json.load(f)
+            return [str(k) for k in data.get("locked", [])]
+        except Exception:
+            return []
+
+    def _write_locked_index(self):
+        with self._lock:
+            keys = sorted(self._locked)
+        path = os.path.join(self.folder, LOCKED_INDEX_NAME)
+        try:
+            tmp = path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"locked": keys}, f)
+            os.replace(tmp, path)
+        except Exception as e:
+            logging.warning(f"[LOOP] Could not save locked index: {e}")
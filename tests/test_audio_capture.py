@@ -0,0 +1,207 @@
+import os
+import sys
+import wave
+import time
+import array
+import tempfile
+import threading
+from unittest import mock
+
+# ensure repo root on path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import audio_capture
+
+RATE = 8000
+PERIOD = 160  # 20 ms
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 100.0
+
+    def __call__(self):
+        return self.t
+
+
+def _make(clock):
+    dev = audio_capture.FakeAudioDevice(rate=RATE, channels=1, period=PERIOD, realtime=False)
+    return audio_capture.AudioCapture(dev, holdback=0.1, clock=clock)
+
+
+def _read(cap, clock, seconds):
+    for _ in range(int(seconds * RATE / PERIOD)):
+        clock.t += PERIOD / RATE
+        cap.read_once()
+
+
+def _samples(path):
+    with wave.open(path, "rb") as w:
+        data = array.array("h", w.readframes(w.getnframes()))
+    return list(data)
+
+
+def test_chunks_split_at_exact_sample():
+    clock = FakeClock()
+    cap = _make(clock)
+    with tempfile.TemporaryDirectory() as d:
+        a = os.path.join(d, "audio_a.wav")
+        b = os.path.join(d, "audio_b.wav")
+
+        _read(cap, clock, 0.2)                # first read pins t0 = 100.0
+        cap.open_file(a, at=100.25)           # sample 2000
+        _read(cap, clock, 0.5)
+        cap.rotate(b, close_at=100.6, open_at=100.65)  # close 4800, open 5200
+        _read(cap, clock, 0.5)
+        cap.close_file(at=101.15)             # sample 9200, still inside holdback
+        _read(cap, clock, 0.3)
+
+        assert cap.wait_closed(a, timeout=2) and cap.wait_closed(b, timeout=2)
+        sa = _samples(a)
+        sb = _samples(b)
+
+    # fake mic emits a running sample counter
+    assert sa[0] == 2000 and sa[-1] == 4799 and len(sa) == 2800
+    assert sb[0] == 5200 and sb[-1] == 9199 and len(sb) == 4000
+
+
+def test_overrun_gap_is_padded_to_keep_sync():
+    clock = FakeClock()
+    cap = _make(clock)
+    with tempfile.TemporaryDirectory() as d:
+        a = os.path.join(d, "audio_a.wav")
+        _read(cap, clock, 0.1)
+        cap.open_file(a, at=100.0)
+        clock.t += 0.5                       # mic stalled for 0.5 s, samples lost
+        _read(cap, clock, 0.5)
+        cap.close_file(at=101.0)
+        _read(cap, clock, 0.3)
+        assert cap.wait_closed(a, timeout=2)
+        n = len(_samples(a))
+
+    # file length follows the wall clock, not just the samples that arrived
+    assert abs(n - RATE) <= PERIOD
+
+
+def test_stop_finishes_open_file():
+    clock = FakeClock()
+    cap = _make(clock)
+    with tempfile.TemporaryDirectory() as d:
+        a = os.path.join(d, "audio_a.wav")
+        _read(cap, clock, 0.1)
+        cap.open_file(a)
+        _read(cap, clock, 0.2)
+        cap.stop()
+        assert cap.current_path is None
+        assert len(_samples(a)) == int(0.2 * RATE)
+
+
+class MemWriter:
+    """Writer that keeps PCM in memory; close() can be made slow like ffmpeg finishing."""
+    files = {}
+
+    def __init__(self, path, close_delay=0.0, gate=None):
+        self.path = path
+        self.close_delay = close_delay
+        self.gate = gate
+        self.data = bytearray()
+        MemWriter.files[path] = self
+
+    def writeframesraw(self, data):
+        if self.gate is not None:
+            self.gate.wait()
+        self.data += data
+
+    def close(self):
+        time.sleep(self.close_delay)
+
+    def samples(self):
+        return list(array.array("h", bytes(self.data)))
+
+
+class FakePopen:
+    def __init__(self, cmd, stdin=None, stdout=None, stderr=None):
+        self.cmd = cmd
+        self.stdin = mock.MagicMock()
+        self.waited = None
+        FakePopen.last = self
+
+    def wait(self, timeout=None):
+        self.waited = timeout
+        return 0
+
+    def kill(self):
+        pass
+
+
+def test_make_writer_and_ffmpeg_writer():
+    with tempfile.TemporaryDirectory() as d:
+        w = audio_capture.make_writer("flac")(os.path.join(d, "a.wav"), RATE, 1)   # unknown -> wav
+        assert isinstance(w, wave.Wave_write)
+        w.close()
+
+    with mock.patch("audio_capture.subprocess.Popen", FakePopen):
+        w = audio_capture.make_writer("aac", "64k")("/tmp/audio_x.aac", RATE, 2)
+        cmd = FakePopen.last.cmd
+        assert cmd[:3] == ["nice", "-n", "10"] and cmd[-2:] == ["-y", "/tmp/audio_x.aac"]
+        assert cmd[cmd.index("-ar") + 1] == str(RATE) and cmd[cmd.index("-ac") + 1] == "2"
+        assert cmd[cmd.index("-c:a") + 1] == "aac" and cmd[cmd.index("-b:a") + 1] == "64k"
+        assert cmd[cmd.index("-f", cmd.index("-b:a")) + 1] == "adts"
+        w.writeframesraw(b"\x01\x00")
+        w.close()
+        FakePopen.last.stdin.write.assert_called_once_with(b"\x01\x00")
+        FakePopen.last.stdin.close.assert_called_once()
+        assert FakePopen.last.waited == 10
+    assert audio_capture.audio_extension("opus") == ".opus"
+    assert audio_capture.audio_extension("nope") == ".wav"
+
+
+def test_slow_close_does_not_block_capture():
+    clock = FakeClock()
+    dev = audio_capture.FakeAudioDevice(rate=RATE, channels=1, period=PERIOD, realtime=False)
+    cap = audio_capture.AudioCapture(dev, holdback=0.1, clock=clock,
+                                     writer_factory=lambda path, rate, ch: MemWriter(path, close_delay=0.5))
+    _read(cap, clock, 0.2)
+    cap.open_file("a", at=100.25)
+    _read(cap, clock, 0.5)
+    cap.rotate("b", close_at=100.6)
+
+    t0 = time.monotonic()
+    _read(cap, clock, 0.5)                     # flushes past the cut: "a" is closing meanwhile
+    assert time.monotonic() - t0 < 0.2
+    cap.close_file(at=101.1)
+    _read(cap, clock, 0.3)
+    assert cap.wait_closed("a", timeout=3) and cap.wait_closed("b", timeout=3)
+
+    sa, sb = MemWriter.files["a"].samples(), MemWriter.files["b"].samples()
+    assert sa[0] == 2000 and sa[-1] == 4799
+    assert sb[0] == 4800 and sb[-1] == 8799
+    cap.stop()
+
+
+def test_wedged_writer_drops_instead_of_blocking():
+    clock = FakeClock()
+    gate = threading.Event()
+    dev = audio_capture.FakeAudioDevice(rate=RATE, channels=1, period=PERIOD, realtime=False)
+    cap = audio_capture.AudioCapture(dev, holdback=0.1, clock=clock, max_queued=0.5,
+                                     writer_factory=lambda path, rate, ch: MemWriter(path, gate=gate))
+    _read(cap, clock, 0.2)
+    cap.open_file("stuck", at=100.2)
+    t0 = time.monotonic()
+    _read(cap, clock, 2.0)
+    assert time.monotonic() - t0 < 0.5
+    assert cap.dropped_samples > 0
+    gate.set()
+    cap.stop()
+
+
+if __name__ == "__main__":
+    test_chunks_split_at_exact_sample()
+    test_overrun_gap_is_padded_to_keep_sync()
+    test_stop_finishes_open_file()
+    test_make_writer_and_ffmpeg_writer()
+    test_slow_close_does_not_block_capture()
+    test_wedged_writer_drops_instead_of_blocking()
+    print("All audio capture tests passed.")
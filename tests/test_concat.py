@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+
+# ensure repo root on path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import concat
+from concat import Chunk
+
+
+def test_session_chunk_order_and_list_file():
+    with tempfile.TemporaryDirectory() as folder:
+        for name in ("video_20250101_120000_chunk002.mp4", "uploaded_20250101_120000_chunk000.mp4",
+                     "failed_upload_20250101_120000_chunk001.mp4", "video_20250101_120000_full.mp4",
+                     "video_20250101_130000_chunk000.mp4", "temp_20250101_120000_chunk003.h264"):
+            open(os.path.join(folder, name), "wb").close()
+        paths = concat.session_chunk_paths(folder, "20250101_120000")
+    assert [os.path.basename(p) for p in paths] == [
+        "uploaded_20250101_120000_chunk000.mp4",
+        "failed_upload_20250101_120000_chunk001.mp4",
+        "video_20250101_120000_chunk002.mp4"]
+    text = concat.list_file_text(["/rec/it's.mp4"])
+    assert text.splitlines() == ["ffconcat version 1.0", "file '/rec/it'\\''s.mp4'"]
+
+
+def test_command_per_audio_mix():
+    both = [Chunk("a.mp4", 300.0, True), Chunk("b.mp4", 120.5, True)]
+    cmd = concat.build_command(both, "l.txt", "out.mp4", nice=False)
+    assert cmd[cmd.index("-c") + 1] == "copy" and "-filter_complex" not in cmd
+    assert cmd[-1] == "out.mp4"
+
+    none = [Chunk("a.mp4", 300.0, False), Chunk("b.mp4", 120.5, False)]
+    cmd = concat.build_command(none, "l.txt", "out.mp4", nice=False)
+    assert "0:a" not in cmd and cmd[cmd.index("-c:v") + 1] == "copy"
+
+    mixed = [Chunk("a.mp4", 300.0, False), Chunk("b.mp4", 120.5, True)]
+    cmd = concat.build_command(mixed, "l.txt", None, stream=True, nice=False)
+    assert cmd[cmd.index("-c:v") + 1] == "copy" and cmd[cmd.index("-c:a") + 1] == "aac"
+    assert "anullsrc=r=48000:cl=mono" in cmd and cmd[cmd.index("anullsrc=r=48000:cl=mono") - 2] == "300.000"
+    graph = cmd[cmd.index("-filter_complex") + 1]
+    assert "[1:a]" in graph and "[2:a]" in graph and "atrim=0:120.500" in graph
+    assert graph.endswith("[a0][a1]concat=n=2:v=0:a=1[aout]")
+    assert cmd[-1] == "pipe:1" and "empty_moov" in cmd[cmd.index("-movflags") + 1]
+
+
+if __name__ == "__main__":
+    test_session_chunk_order_and_list_file()
+    test_command_per_audio_mix()
+    print("All concat tests passed.")
@@ -0,0 +1,42 @@
+import os
+import sys
+import threading
+
+# ensure repo root on path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from convpool import ConversionPool, PRIORITY_CHUNK, PRIORITY_RECOVERY
+
+
+def test_chunks_run_before_queued_recovery():
+    pool = ConversionPool(workers=1)
+    gate = threading.Event()
+    order = []
+
+    # queued before the worker starts: recovery first, then a live chunk
+    pool.submit(PRIORITY_RECOVERY, lambda: gate.wait(2) and order.append("blocker"))
+    for i in range(3):
+        pool.submit(PRIORITY_RECOVERY, order.append, f"orphan{i}")
+    chunk = pool.submit(PRIORITY_CHUNK, order.append, "chunk")
+    failing = pool.submit(PRIORITY_RECOVERY, lambda: 1 / 0)
+
+    pool.start()
+    try:
+        chunk.result(timeout=2)
+        gate.set()
+        try:
+            failing.result(timeout=2)
+            assert False, "expected ZeroDivisionError"
+        except ZeroDivisionError:
+            pass
+        assert order == ["chunk", "blocker", "orphan0", "orphan1", "orphan2"]
+        assert pool.pending() == 0
+    finally:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    test_chunks_run_before_queued_recovery()
+    print("All convpool tests passed.")
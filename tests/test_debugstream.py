@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+import socket
+import threading
+import urllib.request
+
+# ensure repo root on path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import debugstream
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_renders_only_while_client_connected():
+    rendered = []
+
+    def render(frame):
+        rendered.append(frame)
+        return b"\xff\xd8JPEG" + frame + b"\xff\xd9"
+
+    srv = debugstream.MjpegDebugServer(_free_port(), render, max_fps=100).start()
+    try:
+        srv.publish(b"idle")          # nobody watching -> no work
+        assert rendered == []
+
+        def feed():
+            for i in range(50):
+                srv.publish(b"f%02d" % i)
+                time.sleep(0.01)
+
+        resp = urllib.request.urlopen(f"http://127.0.0.1:{srv.port}/", timeout=5)
+        threading.Thread(target=feed, daemon=True).start()
+        data = b""
+        while b"\xff\xd9" not in data:
+            data += resp.read1(1024)
+        resp.close()
+        assert resp.headers["Content-Type"].startswith("multipart/x-mixed-replace")
+        assert b"--frame\r\nContent-Type: image/jpeg" in data
+        assert rendered and b"idle" not in rendered
+    finally:
+        srv.stop()
+
+
+if __name__ == "__main__":
+    test_renders_only_while_client_connected()
+    print("All debugstream tests passed.")
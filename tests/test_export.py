@@ -0,0 +1,102 @@
+import io
+import os
+import sys
+import tarfile
+import tempfile
+
+# ensure repo root on path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import export
+
+
+def _fill(d):
+    files = {
+        "video_20251225_211046_chunk001.mp4": os.urandom(3000),
+        "uploaded_20251225_211046_chunk002.mp4": os.urandom(1024),
+        "gps_20251225_211046_chunk001.json": b'{"points": []}',
+        "frames_20251225_211046_chunk001.pts": b"# timestamp format v2\n0.000\n",
+        "session_20251225_211046.json": b"{}",
+        "temp_20251225_211046_chunk003.h264": b"x" * 10,
+        "video_20251226_080000_chunk001.mp4": os.urandom(700),
+        "img_20251226_081500.jpg": os.urandom(200),
+        ".locked_chunks.json": b"[]",
+    }
+    for name, data in files.items():
+        with open(os.path.join(d, name), "wb") as f:
+            f.write(data)
+    return files
+
+
+def test_collect_sessions_and_date_range():
+    with tempfile.TemporaryDirectory() as d:
+        _fill(d)
+        names = [m.arcname for m in export.collect(d, sessions=["20251225_211046"])]
+        assert names == [
+            "20251225_211046/frames_20251225_211046_chunk001.pts",
+            "20251225_211046/gps_20251225_211046_chunk001.json",
+            "20251225_211046/session_20251225_211046.json",
+            "20251225_211046/uploaded_20251225_211046_chunk002.mp4",
+            "20251225_211046/video_20251225_211046_chunk001.mp4",
+        ]
+        day = [m.arcname for m in export.collect(d, since="20251226", until="20251226")]
+        assert day == ["20251226_080000/video_20251226_080000_chunk001.mp4",
+                       "photos/img_20251226_081500.jpg"]
+        assert export.collect(d, until="20251225_235959") == export.collect(d, sessions=["20251225_211046"])
+
+        # a joined session only ships once its chunks are gone
+        with open(os.path.join(d, "video_20251225_211046_full.mp4"), "wb") as f:
+            f.write(b"\x00" * 4000)
+        assert [m.arcname for m in export.collect(d, sessions=["20251225_211046"])] == names
+        for n in ("video_20251225_211046_chunk001.mp4", "uploaded_20251225_211046_chunk002.mp4"):
+            os.remove(os.path.join(d, n))
+        assert "20251225_211046/video_20251225_211046_full.mp4" in \
+            [m.arcname for m in export.collect(d, sessions=["20251225_211046"])]
+
+
+def test_tar_matches_planned_size_and_reads_back():
+    with tempfile.TemporaryDirectory() as d:
+        files = _fill(d)
+        tar = export.TarExport(export.collect(d, since="20251225"), block_size=1000)
+        data = b"".join(tar.iter_range())
+        assert len(data) == tar.size
+        with tarfile.open(fileobj=io.BytesIO(data)) as tf:
+            for info in tf.getmembers():
+                assert tf.extractfile(info).read() == files[os.path.basename(info.name)]
+            assert len(tf.getmembers()) == 7
+
+        # any range is the same bytes as slicing the whole archive
+        for start, length in ((0, 1), (511, 2), (600, 5000), (tar.size - 1030, 1030), (1536, 1)):
+            assert b"".join(tar.iter_range(start, length)) == data[start:start + length]
+
+        # a file deleted after planning is zero-filled so offsets stay put
+        os.remove(os.path.join(d, "video_20251225_211046_chunk001.mp4"))
+        assert len(b"".join(tar.iter_range())) == tar.size
+
+
+def test_plan_range_and_long_names():
+    with tempfile.TemporaryDirectory() as d:
+        _fill(d)
+        tar = export.TarExport(export.collect(d, sessions=["20251225_211046"]))
+        status, headers, start, length = tar.plan({}, "ride.tar")
+        assert status == 200 and length == tar.size
+        status, headers, start, length = tar.plan({"Range": "bytes=1024-"}, "ride.tar")
+        assert status == 206 and (start, length) == (1024, tar.size - 1024)
+        status, _, _, _ = tar.plan({"Range": "bytes=1024-", "If-Range": '"stale"'}, "ride.tar")
+        assert status == 200
+        status, _, _, _ = tar.plan({"Range": f"bytes={tar.size}-"}, "ride.tar")
+        assert status == 416
+
+    long_name = "a" * 90 + "/" + "b" * 90
+    hdr = export.tar_header(long_name, 8 ** 11, 0)
+    info = tarfile.TarInfo.frombuf(hdr, "utf-8", "strict")
+    assert info.name == long_name and info.size == 8 ** 11
+
+
+if __name__ == "__main__":
+    test_collect_sessions_and_date_range()
+    test_tar_matches_planned_size_and_reads_back()
+    test_plan_range_and_long_names()
+    print("All export tests passed.")
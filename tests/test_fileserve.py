@@ -0,0 +1,114 @@
+import os
+import sys
+import tempfile
+import http.client
+from unittest import mock
+
+# ensure repo root on path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import fileserve
+
+
+def _file(d, size):
+    path = os.path.join(d, "video_20250101_120000_chunk000.mp4")
+    with open(path, "wb") as f:
+        f.write(bytes(i % 251 for i in range(size)))
+    return path
+
+
+def test_parse_range():
+    pr = fileserve.parse_range
+    assert pr(None, 100) is None
+    assert pr("bytes=0-9", 100) == (0, 9)
+    assert pr("bytes=90-", 100) == (90, 99)
+    assert pr("bytes=-10", 100) == (90, 99)
+    assert pr("bytes=50-500", 100) == (50, 99)
+    assert pr("bytes=0-1,5-6", 100) is None       # multi-range -> whole file
+    assert pr("bytes=x-1", 100) is None
+    try:
+        pr("bytes=100-", 100)
+        assert False, "expected RangeNotSatisfiable"
+    except fileserve.RangeNotSatisfiable:
+        pass
+
+
+def test_plan_and_body():
+    with tempfile.TemporaryDirectory() as d:
+        path = _file(d, 600 * 1024)
+        size = os.path.getsize(path)
+
+        status, headers, start, length = fileserve.plan(path, {})
+        h = dict(headers)
+        assert status == 200 and length == size
+        assert h["Content-Type"] == "video/mp4" and h["Accept-Ranges"] == "bytes"
+        etag = h["ETag"]
+
+        # replaying the same chunk revalidates to 304
+        assert fileserve.plan(path, {"If-None-Match": etag})[0] == 304
+        assert fileserve.plan(path, {"If-Modified-Since": h["Last-Modified"]})[0] == 304
+
+        status, headers, start, length = fileserve.plan(path, {"Range": "bytes=300000-300099"})
+        assert status == 206 and (start, length) == (300000, 100)
+        assert dict(headers)["Content-Range"] == f"bytes 300000-300099/{size}"
+        data = b"".join(fileserve.body(path, {}, start, length))
+        with open(path, "rb") as f:
+            f.seek(300000)
+            assert data == f.read(100)
+
+        # stale If-Range -> whole file instead of a range
+        assert fileserve.plan(path, {"Range": "bytes=0-9", "If-Range": '"stale"'})[0] == 200
+        assert fileserve.plan(path, {"Range": "bytes=0-9", "If-Range": etag})[0] == 206
+        assert fileserve.plan(path, {"Range": f"bytes={size}-"})[0] == 416
+
+        body = fileserve.body(path, {}, 0, size)
+        chunks = list(body)
+        body.close()
+        assert sum(map(len, chunks)) == size and len(chunks) == 3
+
+        status, headers, _, _ = fileserve.plan(path, {}, download_name="clip.mp4")
+        assert dict(headers)["Content-Disposition"] == 'attachment; filename="clip.mp4"'
+
+
+def test_plain_http_server_uses_sendfile():
+    with tempfile.TemporaryDirectory() as d:
+        path = _file(d, 600 * 1024)
+        with open(path, "rb") as f:
+            content = f.read()
+        folder, name = os.path.split(path)
+        srv = fileserve.SendfileServer(folder, "127.0.0.1", 0, allow=lambda n: n.endswith(".mp4")).start()
+        real_sendfile = os.sendfile
+        try:
+            with mock.patch("os.sendfile", side_effect=real_sendfile) as sendfile:
+                conn = http.client.HTTPConnection("127.0.0.1", srv.port, timeout=5)
+                conn.request("GET", f"/data/{name}")
+                resp = conn.getresponse()
+                assert resp.status == 200 and resp.read() == content
+                assert sendfile.called
+
+                sendfile.reset_mock()
+                conn.request("GET", f"/data/{name}?download", headers={"Range": "bytes=300000-300099"})
+                resp = conn.getresponse()
+                assert resp.status == 206 and resp.read() == content[300000:300100]
+                assert resp.getheader("Content-Disposition") == f'attachment; filename="{name}"'
+                assert sendfile.called and sendfile.call_args[0][2] == 300000
+
+                conn.request("GET", f"/data/{name}", headers={"If-None-Match": resp.getheader("ETag")})
+                resp = conn.getresponse()
+                assert resp.status == 304 and resp.read() == b""
+                for bad in ("/data/.locked_chunks.json", "/data/../etc/passwd", "/other"):
+                    conn.request("GET", bad)
+                    resp = conn.getresponse()
+                    assert resp.status == 404 and resp.read() == b""
+                conn.close()
+        finally:
+            srv.stop()
+
+
+if __name__ == "__main__":
+    test_parse_range()
+    test_plan_and_body()
+    test_plain_http_server_uses_sendfile()
+    print("All fileserve tests passed.")
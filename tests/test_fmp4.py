@@ -0,0 +1,96 @@
+import os
+import sys
+import struct
+
+# ensure repo root on path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import fmp4
+
+SPS = b"\x67\x64\x00\x1f\xac\xd9\x40\x50"
+PPS = b"\x68\xeb\xe3\xcb"
+IDR = b"\x65\x88\x84" + b"\xaa" * 40
+P = b"\x41\x9a" + b"\x55" * 20
+
+
+def _au(*nals, long_codes=True):
+    sc = b"\x00\x00\x00\x01" if long_codes else b"\x00\x00\x01"
+    return b"".join(sc + n for n in nals)
+
+
+def _boxes(data):
+    out, i = [], 0
+    while i < len(data):
+        size, kind = struct.unpack(">I4s", data[i:i + 8])
+        assert size >= 8 and i + size <= len(data)
+        out.append((kind, data[i + 8:i + size]))
+        i += size
+    return out
+
+
+def test_split_nals():
+    assert fmp4.split_nals(_au(SPS, PPS, IDR)) == [SPS, PPS, IDR]
+    assert fmp4.split_nals(_au(b"\x09\xf0", P, long_codes=False)) == [b"\x09\xf0", P]
+
+
+def test_init_and_fragment_layout():
+    mux = fmp4.Fmp4Muxer(640, 480, fps=30)
+    assert mux.push(_au(P), 0, False) is None               # no SPS/PPS yet
+    frag = mux.push(_au(b"\x09\xf0", SPS, PPS, IDR), 1000000, True)
+    assert mux.codec == "avc1.64001f"
+
+    kinds = [k for k, _ in _boxes(mux.init)]
+    assert kinds == [b"ftyp", b"moov"]
+    moov = dict(_boxes(mux.init))[b"moov"]
+    assert [k for k, _ in _boxes(moov)] == [b"mvhd", b"trak", b"mvex"]
+    assert SPS in mux.init and PPS in mux.init
+
+    (k1, moof), (k2, mdat) = _boxes(frag)
+    assert (k1, k2) == (b"moof", b"mdat")
+    assert mdat == struct.pack(">I", len(IDR)) + IDR        # AUD/SPS/PPS stripped, AVCC framed
+    traf = dict(_boxes(moof))[b"traf"]
+    parts = dict(_boxes(traf))
+    assert struct.unpack(">Q", parts[b"tfdt"][4:])[0] == 0
+    count, offset = struct.unpack(">Ii", parts[b"trun"][4:12])
+    assert count == 1 and frag[offset:offset + 4] == struct.pack(">I", len(IDR))
+
+    frag2 = mux.push(_au(P), 1000000 + 33333, False)
+    traf2 = dict(_boxes(dict(_boxes(frag2))[b"moof"]))[b"traf"]
+    assert struct.unpack(">Q", dict(_boxes(traf2))[b"tfdt"][4:])[0] == 2999
+
+
+def test_broadcaster_joins_and_resyncs_on_keyframes():
+    b = fmp4.Fmp4Broadcaster(640, 480, queue_depth=3)
+    b.push(_au(SPS, PPS, IDR), 0, True)
+    v = b.subscribe()
+    b.push(_au(P), 33333, False)                    # late joiner waits for a keyframe
+    assert v.q.empty()
+    b.push(_au(SPS, PPS, IDR), 66666, True)
+    b.push(_au(P), 99999, False)
+
+    it = b.stream(v, running=lambda: not v.q.empty())
+    out = list(it)
+    assert out[0] == b._mux.init and len(out) == 3
+
+    for i in range(5):                              # overflow -> backlog dropped
+        b.push(_au(P), 133332 + i * 33333, False)
+    assert not v.synced
+    b.push(_au(SPS, PPS, IDR), 400000, True)
+    assert v.synced and v.q.qsize() == 1
+
+    b.reset()
+    b.push(_au(SPS, PPS, IDR), 0, True)
+    init, frag = v.q.queue[-1]
+    traf = dict(_boxes(dict(_boxes(frag))[b"moof"]))[b"traf"]
+    assert struct.unpack(">Q", dict(_boxes(traf))[b"tfdt"][4:])[0] > 0   # timeline continues
+    b.unsubscribe(v)
+    assert b.viewers == 0
+
+
+if __name__ == "__main__":
+    test_split_nals()
+    test_init_and_fragment_layout()
+    test_broadcaster_joins_and_resyncs_on_keyframes()
+    print("All fmp4 tests passed.")
@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+import tempfile
+
+# ensure repo root on path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from frametiming import FrameTimeline, SessionManifest, sidecar_name
+from retention import chunk_files
+
+
+def test_timeline_counts_drops_and_writes_sidecar():
+    with tempfile.TemporaryDirectory() as folder:
+        key = "20250101_120000_chunk000"
+        path = os.path.join(folder, sidecar_name(key))
+        tl = FrameTimeline(30.0, path)
+
+        ts = 5000000
+        for i in range(30):
+            tl.add(ts)
+            # frames 10 and 20 are each followed by a gap of 3 periods (2 dropped each)
+            ts += 100000 if i in (10, 20) else 33333
+        tl.close()
+
+        s = tl.summary()
+        assert s["frames"] == 30
+        assert s["dropped"] == 4
+        assert s["max_gap_ms"] == 100.0
+        assert 25 < s["effective_fps"] < 27
+
+        with open(path) as f:
+            lines = f.read().splitlines()
+        assert lines[0] == "# timestamp format v2"
+        assert lines[1] == "0.000" and lines[2] == "33.333"
+        assert len(lines) == 31
+        assert path in chunk_files(folder, key)          # evicted together with the chunk
+
+
+def test_session_manifest_totals():
+    with tempfile.TemporaryDirectory() as folder:
+        m = SessionManifest(folder, "20250101_120000", 30.0)
+        m.add_chunk("video_20250101_120000_chunk000.mp4",
+                    {"frames": 300, "dropped": 2, "max_gap_ms": 99.9, "effective_fps": 29.8, "duration_s": 10.0})
+        m.add_chunk("video_20250101_120000_chunk001.mp4",
+                    {"frames": 150, "dropped": 0, "max_gap_ms": 33.4, "effective_fps": 30.0, "duration_s": 5.0})
+
+        s = m.summary()
+        assert (s["chunks"], s["frames"], s["dropped"], s["max_gap_ms"]) == (2, 450, 2, 99.9)
+        with open(os.path.join(folder, "session_20250101_120000.json")) as f:
+            data = json.load(f)
+        assert [c["name"] for c in data["chunks"]] == ["video_20250101_120000_chunk000.mp4",
+                                                       "video_20250101_120000_chunk001.mp4"]
+        assert data["totals"]["dropped"] == 2
+
+
+if __name__ == "__main__":
+    test_timeline_counts_drops_and_writes_sidecar()
+    test_session_manifest_totals()
+    print("All frametiming tests passed.")
@@ -0,0 +1,103 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import xml.etree.ElementTree as ET
+
+# ensure repo root on path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import gpsindex
+
+
+def _write_json(folder, name, start, points):
+    pts = []
+    for i, (lat, lon) in enumerate(points):
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start + 5 * i)) + ".250000"
+        pts.append({"timestamp": stamp, "lat": lat, "lon": lon, "accuracy": 4.0, "speed": 8.5})
+    with open(os.path.join(folder, name), "w") as f:
+        json.dump({"points": pts}, f)
+
+
+def _fill(d):
+    t0 = 1766700000.0
+    # session crossing a point near (52.5200, 13.4050), then driving away
+    _write_json(d, "gps_20251225_211046_chunk001.json", t0,
+                [(0.0, 0.0), (52.5190, 13.4040), (52.5199, 13.4049)])
+    _write_json(d, "uploaded_gps_20251225_211046_chunk002.json", t0 + 60,
+                [(52.5300, 13.4200), (52.5400, 13.4300)])
+    with open(os.path.join(d, "gps_20251226_080000_chunk001.csv"), "w") as f:
+        f.write("Timestamp,Lat,Lon\n2025-12-26 08:00:05,48.1371,11.5754\nbad,row,x\n")
+    return t0
+
+
+def test_load_points_json_and_csv():
+    with tempfile.TemporaryDirectory() as d:
+        t0 = _fill(d)
+        pts = gpsindex.load_points(os.path.join(d, "gps_20251225_211046_chunk001.json"))
+        assert len(pts) == 2                                  # 0,0 (no fix) dropped
+        assert abs(pts[0].t - (t0 + 5.25)) < 1e-6 and pts[0].speed == 8.5
+        csv_pts = gpsindex.load_points(os.path.join(d, "gps_20251226_080000_chunk001.csv"))
+        assert [(p.lat, p.lon) for p in csv_pts] == [(48.1371, 11.5754)]
+        assert gpsindex.sidecar_key("failed_upload_gps_20251225_211046_chunk002.csv") == "20251225_211046_chunk002"
+        assert gpsindex.parse_time("20251225_211046") == gpsindex.parse_time("2025-12-25T21:10:46")
+        # a bare date is a date, not an epoch in January 1970
+        assert gpsindex.parse_time("20251225") == gpsindex.parse_time("2025-12-25T00:00:00")
+        assert gpsindex.parse_time("1766700000") == gpsindex.parse_time(1766700000) == 1766700000.0
+        assert gpsindex.parse_time("1766700000.5") == 1766700000.5
+
+
+def test_exports_merge_chunks():
+    with tempfile.TemporaryDirectory() as d:
+        _fill(d)
+        tracks = [gpsindex.Track(n, gpsindex.load_points(os.path.join(d, n)))
+                  for n in ("gps_20251225_211046_chunk001.json", "uploaded_gps_20251225_211046_chunk002.json")]
+        gpx = ET.fromstring(gpsindex.to_gpx(tracks, "ride <1>"))
+        ns = {"g": "http://www.topografix.com/GPX/1/1"}
+        assert gpx.find("g:trk/g:name", ns).text == "ride <1>"
+        segs = gpx.findall("g:trk/g:trkseg", ns)
+        assert [len(s) for s in segs] == [2, 2]
+        assert segs[0][0].get("lat") == "52.5190000" and segs[0][0].find("g:time", ns).text.endswith("Z")
+
+        geo = gpsindex.to_geojson(tracks)
+        assert [f["geometry"]["type"] for f in geo["features"]] == ["LineString", "LineString"]
+        assert geo["features"][1]["geometry"]["coordinates"][0] == [13.42, 52.53]
+
+        kml = ET.fromstring(gpsindex.to_kml(tracks, "ride"))
+        coords = kml.findall(".//{http://www.opengis.net/kml/2.2}coordinates")
+        assert len(coords) == 2 and coords[0].text.startswith("13.4040000,52.5190000,0")
+
+
+def test_index_near_between_and_sync():
+    with tempfile.TemporaryDirectory() as d:
+        t0 = _fill(d)
+        idx = gpsindex.TrackIndex(os.path.join(d, gpsindex.INDEX_NAME))
+        assert idx.sync(d) == (3, 0)
+        assert idx.sync(d) == (0, 0)                          # unchanged sidecars are not re-read
+        assert idx.stats() == {"chunks": 3, "points": 5, "rtree": idx.rtree}
+
+        hits = idx.near(52.5200, 13.4050, 50)
+        assert [h["chunk"] for h in hits] == ["20251225_211046_chunk001"]
+        assert hits[0]["distance_m"] < 20 and hits[0]["lat"] == 52.5199
+        assert [h["chunk"] for h in idx.near(52.5200, 13.4050, 5000)] == [
+            "20251225_211046_chunk001", "20251225_211046_chunk002"]
+        assert idx.near(52.5200, 13.4050, 50, since=t0 + 30) == []
+
+        span = idx.between(t0 + 9, t0 + 61)
+        assert [r["chunk"] for r in span] == ["20251225_211046_chunk001", "20251225_211046_chunk002"]
+        assert len(idx.track("20251225_211046_chunk002")) == 2
+
+        os.remove(os.path.join(d, "uploaded_gps_20251225_211046_chunk002.json"))
+        assert idx.sync(d) == (0, 1)
+        assert idx.between(t0 + 60, t0 + 70) == []
+        idx.close()
+
+
+if __name__ == "__main__":
+    test_load_points_json_and_csv()
+    test_exports_merge_chunks()
+    test_index_near_between_and_sync()
+    print("All gpsindex tests passed.")
@@ -0,0 +1,129 @@
+import os
+import sys
+import struct
+import tempfile
+from unittest import mock
+
+# ensure repo root on path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import h264scan
+
+PPS = b"\x68\xeb\xe3\xcb"
+IDR = b"\x65\x88\x84" + b"\xaa" * 40
+P = b"\x41\x9a" + b"\x55" * 20
+P_SECOND_SLICE = b"\x41\x1a" + b"\x55" * 20        # first_mb_in_slice != 0
+SC = b"\x00\x00\x00\x01"
+
+
+def _sps_1080p():
+    bits = []
+
+    def u(v, n):
+        bits.extend((v >> (n - 1 - i)) & 1 for i in range(n))
+
+    def ue(v):
+        v += 1
+        n = v.bit_length()
+        u(0, n - 1)
+        u(v, n)
+
+    u(100, 8); u(0, 8); u(40, 8)          # high profile, level 4.0
+    ue(0)                                  # sps id
+    ue(1); ue(0); ue(0); u(0, 1); u(0, 1)  # 4:2:0, 8 bit, no scaling matrix
+    ue(0); ue(2); ue(1); u(0, 1)           # frame_num, poc type 2, refs, gaps
+    ue(119); ue(67)                        # 120 x 68 macroblocks
+    u(1, 1); u(1, 1)                       # frame_mbs_only, direct_8x8
+    u(1, 1); ue(0); ue(0); ue(0); ue(4)    # crop 8 lines -> 1080
+    u(0, 1); u(1, 1)                       # no VUI, stop bit
+    while len(bits) % 8:
+        bits.append(0)
+    raw = bytes(int("".join(map(str, bits[i:i + 8])), 2) for i in range(0, len(bits), 8))
+    out, zeros = bytearray(), 0
+    for byte in raw:                       # emulation prevention
+        if zeros >= 2 and byte <= 3:
+            out.append(3)
+            zeros = 0
+        out.append(byte)
+        zeros = zeros + 1 if byte == 0 else 0
+    return b"\x67" + bytes(out)
+
+
+def _write(folder, data, suffix=".h264"):
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=folder)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    return path
+
+
+def _box(kind, *payload):
+    body = b"".join(payload)
+    return struct.pack(">I4s", 8 + len(body), kind) + body
+
+
+def _trak(handler, width, height, timescale, duration, samples, sync=None):
+    tkhd = _box(b"tkhd", b"\x00" * 76, struct.pack(">II", width << 16, height << 16))
+    mdhd = _box(b"mdhd", b"\x00" * 12, struct.pack(">II", timescale, duration), b"\x00" * 4)
+    hdlr = _box(b"hdlr", b"\x00" * 8, handler, b"\x00" * 13)
+    stbl = [_box(b"stsz", b"\x00" * 8, struct.pack(">I", samples))]
+    if sync is not None:
+        stbl.append(_box(b"stss", b"\x00" * 4, struct.pack(">I", sync)))
+    return _box(b"trak", tkhd, _box(b"mdia", mdhd, hdlr, _box(b"minf", _box(b"stbl", *stbl))))
+
+
+def test_parse_sps_resolution():
+    assert h264scan.parse_sps(_sps_1080p()) == (1920, 1080)
+
+
+def test_scan_h264_frames_keyframes_and_truncation():
+    sps = _sps_1080p()
+    gop = SC + sps + SC + PPS + SC + IDR + SC + P + SC + P_SECOND_SLICE + SC + P
+    with tempfile.TemporaryDirectory() as d:
+        path = _write(d, gop + gop + SC + P[:7] + b"\x00" * 9)   # crash: zero-filled tail block
+        info = h264scan.scan_h264(path, fps=30.0)
+        assert (info.width, info.height) == (1920, 1080)
+        assert info.frames == 7                          # 3 per GOP + the cut frame
+        assert info.keyframes == 2
+        assert info.idr_offsets == (gop.index(SC + IDR), len(gop) + gop.index(SC + IDR))
+        assert info.valid and info.valid_bytes == 2 * len(gop)
+
+        # a stream ending on a whole NAL keeps every byte
+        clean = h264scan.scan_h264(_write(d, gop + gop))
+        assert clean.valid_bytes == clean.size == 2 * len(gop)
+        assert h264scan.scan_h264(_write(d, gop + SC)).valid_bytes == len(gop)
+
+        no_sps = h264scan.scan_h264(_write(d, SC + IDR + SC + P))
+        assert not no_sps.valid and no_sps.error == "no SPS"
+        assert h264scan.scan_h264(_write(d, b"")).valid_bytes == 0
+
+
+def test_scan_mp4_and_truncated_mdat():
+    moov = _box(b"moov", _box(b"mvhd", b"\x00" * 100),
+                _trak(b"vide", 1920, 1080, 90000, 90000 * 10, 300, sync=10),
+                _trak(b"soun", 0, 0, 48000, 480000, 470))
+    good = _box(b"ftyp", b"isom\x00\x00\x02\x00") + moov + _box(b"mdat", b"\x00" * 64)
+    with tempfile.TemporaryDirectory() as d:
+        info = h264scan.scan_mp4(_write(d, good, ".mp4"))
+        assert info.valid and info.error is None
+        assert (info.width, info.height, info.frames, info.keyframes) == (1920, 1080, 300, 10)
+        assert info.duration == 10.0 and info.has_audio and info.idr_offsets == ()
+
+        cut = h264scan.scan_mp4(_write(d, good[:-10], ".mp4"))
+        assert not cut.valid and cut.error == "mdat box truncated"
+        assert cut.valid_bytes == len(good) - 72
+
+        cache = h264scan.ScanCache()
+        path = _write(d, good, ".mp4")
+        assert cache.get(path) is cache.get(path)
+        with mock.patch("h264scan.scan", side_effect=ValueError("bad")):
+            broken = cache.get(_write(d, b"x", ".h264"))
+        assert broken.error == "bad" and broken.keyframes == 0 and broken.idr_offsets == ()
+
+
+if __name__ == "__main__":
+    test_parse_sps_resolution()
+    test_scan_h264_frames_keyframes_and_truncation()
+    test_scan_mp4_and_truncated_mdat()
+    print("All h264scan tests passed.")
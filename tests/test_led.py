@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+
+# ensure repo root on path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import led
+
+
+def _wait(pred, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if pred():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_steady_and_pwm_modes_do_not_poll():
+    gpio = led.FakeGpioBackend()
+    ctl = led.LedController(17, backend=gpio)
+    try:
+        ctl.set_mode("on")
+        assert _wait(lambda: gpio.level == 1)
+        n = len(gpio.events)
+        time.sleep(0.3)
+        assert len(gpio.events) == n          # nothing written while steady
+
+        ctl.set_mode("blink_fast")
+        assert _wait(lambda: gpio.events[-1][1] == "pwm")
+        freq, duty = gpio.events[-1][2]
+        assert abs(freq - 1 / 0.3) < 1e-6 and abs(duty - 50.0) < 1e-6
+        n = len(gpio.events)
+        time.sleep(0.4)
+        assert len(gpio.events) == n          # blinking is the PWM's job
+
+        ctl.set_mode("blink_fast")            # same mode -> no restart
+        time.sleep(0.05)
+        assert len(gpio.events) == n
+    finally:
+        ctl.stop()
+    assert gpio.closed
+
+
+def test_error_code_pattern_and_software_fallback():
+    steps = led.pattern_for("error:3")
+    assert [lvl for lvl, _ in steps].count(1) == 3
+    assert steps[-1] == (0, led.ERROR_PAUSE)
+    assert led.pattern_for("bogus") == led.PATTERNS["off"]
+
+    gpio = led.FakeGpioBackend(pwm_supported=False)
+    ctl = led.LedController(17, backend=gpio)
+    try:
+        ctl.set_mode("blink_fast")
+        assert _wait(lambda: sum(1 for e in gpio.events if e[2] == 1) >= 2)
+        ctl.set_mode("off")
+        assert _wait(lambda: gpio.level == 0)
+        n = len(gpio.events)
+        time.sleep(0.4)
+        assert len(gpio.events) == n
+    finally:
+        ctl.stop()
+
+
+if __name__ == "__main__":
+    test_steady_and_pwm_modes_do_not_poll()
+    test_error_code_pattern_and_software_fallback()
+    print("All led tests passed.")
@@ -0,0 +1,58 @@
+import os
+import sys
+import threading
+
+# ensure repo root on path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import metrics
+
+
+def test_counter_aggregates_across_threads_and_folds_dead_ones():
+    reg = metrics.Registry()
+    c = reg.counter("t_events_total", "events")
+
+    def work():
+        for _ in range(1000):
+            c.inc()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    c.inc(5)
+    assert c.value() == 8005
+    assert len(c._default._s._cells) == 1      # only the live main-thread cell is kept
+    assert c.value() == 8005
+
+
+def test_histogram_buckets_and_render():
+    reg = metrics.Registry()
+    h = reg.histogram("t_latency_seconds", "latency", buckets=(0.1, 1))
+    for v in (0.05, 0.1, 0.5, 3):
+        h.observe(v)
+    up = reg.counter("t_bytes_total", "bytes", ("kind",))
+    up.labels("video").inc(100)
+    reg.gauge("t_depth", "depth", fn=lambda: 7)
+    reg.gauge("t_broken", "broken", fn=lambda: 1 / 0)
+
+    text = reg.render()
+    assert '# TYPE t_latency_seconds histogram' in text
+    assert 't_latency_seconds_bucket{le="0.1"} 2' in text    # le is inclusive
+    assert 't_latency_seconds_bucket{le="1"} 3' in text
+    assert 't_latency_seconds_bucket{le="+Inf"} 4' in text
+    assert 't_latency_seconds_sum 3.65' in text
+    assert 't_latency_seconds_count 4' in text
+    assert 't_bytes_total{kind="video"} 100' in text
+    assert 't_depth 7' in text
+    assert 't_broken NaN' in text
+    assert text.endswith("\n")
+
+
+if __name__ == "__main__":
+    test_counter_aggregates_across_threads_and_folds_dead_ones()
+    test_histogram_buckets_and_render()
+    print("All metrics tests passed.")
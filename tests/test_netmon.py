@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+import threading
+
+# ensure repo root on path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import netmon
+
+
+def test_loopback_ipv4_without_subprocess():
+    assert netmon.read_ipv4_ioctl("lo") == "127.0.0.1"
+    assert netmon.read_ipv4_ioctl("nosuchif0") is None
+
+
+def test_cached_state_and_wait_for():
+    calls = {"ssid": 0}
+    state = {"ssid": "PSRVJ", "ipv4": None}
+
+    def read_ssid(iface):
+        calls["ssid"] += 1
+        return state["ssid"]
+
+    mon = netmon.ConnectivityMonitor("wlan0", read_ssid=read_ssid, read_ipv4=lambda i: state["ipv4"])
+    mon.refresh()
+    for _ in range(1000):
+        assert mon.ssid == "PSRVJ"   # per-frame reads hit the cache
+    assert calls["ssid"] == 1
+    assert not mon.has_ipv4
+
+    def connect_later():
+        time.sleep(0.05)
+        state["ssid"], state["ipv4"] = "HomeNet", "192.168.1.20"
+        mon.refresh()
+
+    threading.Thread(target=connect_later).start()
+    ok = mon.wait_for(lambda st: st["ssid"] == "HomeNet" and st["ipv4"], timeout=2)
+    assert ok and mon.has_ipv4
+    assert not mon.wait_for(lambda st: st["ssid"] == "Other", timeout=0.05)
+
+
+if __name__ == "__main__":
+    test_loopback_ipv4_without_subprocess()
+    test_cached_state_and_wait_for()
+    print("All netmon tests passed.")
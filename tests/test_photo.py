@@ -0,0 +1,180 @@
+import os
+import sys
+import time
+import struct
+import datetime
+import tempfile
+import threading
+from unittest import mock
+
+# ensure repo root on path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import photo
+
+FAKE_JPEG = b"\xff\xd8" + b"\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00" + b"\xff\xdb\x00\x02" + b"\xff\xd9"
+
+
+def _read_ifd(tiff, offset):
+    count = struct.unpack(">H", tiff[offset:offset + 2])[0]
+    out = {}
+    for i in range(count):
+        e = offset + 2 + i * 12
+        tag, typ, n, val = struct.unpack(">HHI4s", tiff[e:e + 12])
+        size = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8}[typ] * n
+        raw = val[:size] if size <= 4 else tiff[struct.unpack(">I", val)[0]:struct.unpack(">I", val)[0] + size]
+        out[tag] = (typ, n, raw)
+    return out
+
+
+def _tiff_from(jpeg):
+    assert jpeg[2:4] == b"\xff\xe1", "APP1 must follow SOI"
+    seg_len = struct.unpack(">H", jpeg[4:6])[0]
+    payload = jpeg[6:4 + seg_len]
+    assert payload.startswith(b"Exif\x00\x00")
+    return payload[6:]
+
+
+def test_gps_exif_roundtrip():
+    when = datetime.datetime(2025, 12, 25, 21, 53, 44)
+    app1 = photo.build_gps_exif(18.9234, -73.5678, accuracy=4.5, speed=10.0, when=when)
+    jpeg = photo.insert_exif(FAKE_JPEG, app1)
+
+    tiff = _tiff_from(jpeg)
+    assert tiff[:4] == b"MM\x00\x2a"
+    ifd0 = _read_ifd(tiff, 8)
+    assert ifd0[photo.TAG_DATETIME][2] == b"2025:12:25 21:53:44\x00"
+
+    gps_off = struct.unpack(">I", ifd0[photo.TAG_GPS_IFD][2])[0]
+    gps = _read_ifd(tiff, gps_off)
+    assert gps[photo.GPS_LAT_REF][2][:1] == b"N"
+    assert gps[photo.GPS_LON_REF][2][:1] == b"W"
+
+    vals = struct.unpack(">6I", gps[photo.GPS_LAT][2])
+    lat = vals[0] / vals[1] + vals[2] / vals[3] / 60 + vals[4] / vals[5] / 3600
+    assert abs(lat - 18.9234) < 1e-5
+
+    n, d = struct.unpack(">2I", gps[photo.GPS_SPEED][2])
+    assert abs(n / d - 36.0) < 0.01
+
+    # original JFIF APP0 and image data preserved
+    assert b"JFIF" in jpeg and jpeg.endswith(b"\xff\xd9")
+
+
+def test_gps_time_is_utc_for_naive_local_datetime():
+    try:
+        with mock.patch.dict(os.environ, {"TZ": "Asia/Kolkata"}):     # UTC+05:30, no DST
+            time.tzset()
+            app1 = photo.build_gps_exif(18.9, 72.8, when=datetime.datetime(2025, 12, 25, 2, 53, 44))
+    finally:
+        time.tzset()
+    tiff = _tiff_from(photo.insert_exif(FAKE_JPEG, app1))
+    ifd0 = _read_ifd(tiff, 8)
+    assert ifd0[photo.TAG_DATETIME][2] == b"2025:12:25 02:53:44\x00"     # local wall clock
+    gps = _read_ifd(tiff, struct.unpack(">I", ifd0[photo.TAG_GPS_IFD][2])[0])
+    assert gps[photo.GPS_DATESTAMP][2] == b"2025:12:24\x00"
+    assert struct.unpack(">6I", gps[photo.GPS_TIMESTAMP][2])[::2] == (21, 23, 44)
+
+
+def test_no_fix_skips_gps_ifd_and_replaces_old_exif():
+    app1 = photo.build_gps_exif(0.0, 0.0)
+    jpeg = photo.insert_exif(FAKE_JPEG, app1)
+    ifd0 = _read_ifd(_tiff_from(jpeg), 8)
+    assert photo.TAG_GPS_IFD not in ifd0
+
+    again = photo.insert_exif(jpeg, photo.build_gps_exif(1.0, 2.0))
+    assert again.count(b"Exif\x00\x00") == 1
+
+
+def _wait_done(engine, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        st = engine.status(job_id)
+        if st["state"] in ("done", "cancelled"):
+            return st
+        time.sleep(0.01)
+    raise AssertionError(f"job not finished: {engine.status(job_id)}")
+
+
+def test_burst_is_pipelined():
+    grab_times = []
+    written = []
+    lock = threading.Lock()
+
+    def grab():
+        time.sleep(0.002)  # ~ next frame
+        grab_times.append(time.time())
+        return b"frame"
+
+    def encode(frame, path, gps, when):
+        time.sleep(0.05)  # slow JPEG encode
+        with lock:
+            written.append(os.path.basename(path))
+
+    with tempfile.TemporaryDirectory() as d:
+        engine = photo.PhotoEngine(grab, encode, lambda: {"lat": 1.0, "lon": 2.0}, d, workers=2)
+        job = engine.burst(20)
+        st = _wait_done(engine, job["id"])
+
+    assert st["saved"] == 20 and st["failed"] == 0
+    # capture must not wait for 20 serial encodes (20 * 50 ms)
+    assert grab_times[-1] - grab_times[0] < 0.5
+    assert sorted(written)[0].endswith("_burst000.jpg")
+
+
+def test_interval_and_cancel():
+    frames = []
+
+    def grab():
+        frames.append(time.time())
+        return b"frame"
+
+    with tempfile.TemporaryDirectory() as d:
+        engine = photo.PhotoEngine(grab, lambda *a: None, lambda: {}, d)
+        engine.MIN_INTERVAL = 0.01
+        st = _wait_done(engine, engine.interval(0.05, 0.2)["id"])
+        assert st["saved"] == 5
+
+        job = engine.interval(0.05, 60)
+        time.sleep(0.08)
+        assert engine.cancel(job["id"])
+        assert _wait_done(engine, job["id"])["state"] == "cancelled"
+
+
+def test_cancel_survives_pending_encodes():
+    def grab():
+        time.sleep(0.01)
+        return b"frame"
+
+    with tempfile.TemporaryDirectory() as d:
+        engine = photo.PhotoEngine(grab, lambda *a: time.sleep(0.1), lambda: {}, d, workers=1)
+        job = engine.burst(20)
+        time.sleep(0.035)
+        assert engine.cancel(job["id"])
+        assert engine.status(job["id"])["state"] in ("running", "capturing_done")
+        st = _wait_done(engine, job["id"])
+        assert st["state"] == "cancelled" and 0 < st["saved"] < 20
+
+
+def test_single_falls_back_when_camera_missing():
+    def grab():
+        raise RuntimeError("camera not ready")
+
+    used = []
+    engine = photo.PhotoEngine(grab, lambda *a: None, lambda: {}, ".",
+                               fallback=lambda path, gps: used.append(path) or True)
+    st = _wait_done(engine, engine.single("img_x.jpg")["id"])
+    assert st["saved"] == 1 and used == ["img_x.jpg"]
+
+
+if __name__ == "__main__":
+    test_gps_exif_roundtrip()
+    test_gps_time_is_utc_for_naive_local_datetime()
+    test_no_fix_skips_gps_ifd_and_replaces_old_exif()
+    test_burst_is_pipelined()
+    test_interval_and_cancel()
+    test_cancel_survives_pending_encodes()
+    test_single_falls_back_when_camera_missing()
+    print("All photo tests passed.")
@@ -0,0 +1,100 @@
+import os
+import sys
+import time
+
+# ensure repo root on path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import qrscan
+
+
+class Grid:
+    """Tiny stand-in for a 2D numpy view: tracks its origin and step."""
+
+    def __init__(self, w, h, x0=0, y0=0, step=1):
+        self.w, self.h, self.x0, self.y0, self.step = w, h, x0, y0, step
+
+    @property
+    def shape(self):
+        return (self.h, self.w)
+
+    def __getitem__(self, key):
+        ys, xs = key
+        step = ys.step or 1
+        y_start, y_stop = ys.start or 0, self.h if ys.stop is None else min(ys.stop, self.h)
+        x_start, x_stop = xs.start or 0, self.w if xs.stop is None else min(xs.stop, self.w)
+        return Grid((x_stop - x_start) // step, (y_stop - y_start) // step,
+                    self.x0 + x_start * self.step, self.y0 + y_start * self.step, self.step * step)
+
+
+class FakeZbar:
+    """A QR code sitting at absolute rect (300, 200, 80, 80) in a 640x480 frame."""
+
+    def __init__(self, rect=(300, 200, 80, 80)):
+        self.rect = rect
+        self.calls = []
+
+    def __call__(self, img):
+        self.calls.append((img.w, img.h))
+        x, y, w, h = self.rect
+        if img.x0 <= x and img.y0 <= y and x + w <= img.x0 + img.w * img.step and y + h <= img.y0 + img.h * img.step:
+            s = img.step
+            return [(b" WIFI:S:Home;P:pw;; ", ((x - img.x0) // s, (y - img.y0) // s, w // s, h // s))]
+        return []
+
+
+def test_y_plane_is_luma_rows():
+    i420 = Grid(640, 720)                    # H*3/2 rows
+    y = qrscan.y_plane(i420, 640, 480)
+    assert y.shape == (480, 640) and (y.x0, y.y0) == (0, 0)
+
+
+def test_roi_tracking_after_first_hit():
+    zbar = FakeZbar()
+    det = qrscan.QrDetector(decode=zbar, downsample=2)
+
+    payload, rect = det.detect(Grid(640, 480))
+    assert payload == "WIFI:S:Home;P:pw;;"
+    assert rect == (300, 200, 80, 80)
+    assert zbar.calls[-1] == (320, 240)      # first pass downsampled
+
+    det.detect(Grid(640, 480))
+    w, h = zbar.calls[-1]
+    assert w < 200 and h < 200               # later passes only scan the ROI
+
+
+def test_roi_dropped_after_misses():
+    zbar = FakeZbar()
+    det = qrscan.QrDetector(decode=zbar, roi_misses=2)
+    det.detect(Grid(640, 480))
+    zbar.rect = (10, 10, 50, 50)             # code moved out of the ROI
+    assert det.detect(Grid(640, 480)) is None
+    res = det.detect(Grid(640, 480))
+    assert res and res[1] == (10, 10, 50, 50)
+
+
+def test_worker_keeps_only_newest_frame():
+    seen = []
+
+    def slow_decode(img):
+        seen.append(img.w)
+        time.sleep(0.05)
+        return []
+
+    det = qrscan.QrDetector(decode=slow_decode).start()
+    for w in range(100, 110):
+        det.submit(Grid(w, 10))
+    time.sleep(0.2)
+    det.stop()
+    assert seen[-1] == 109 and len(seen) < 10
+    assert det.poll() is None
+
+
+if __name__ == "__main__":
+    test_y_plane_is_luma_rows()
+    test_roi_tracking_after_first_hit()
+    test_roi_dropped_after_misses()
+    test_worker_keeps_only_newest_frame()
+    print("All qrscan tests passed.")
@@ -0,0 +1,92 @@
+import os
+import sys
+import time
+import threading
+
+# ensure repo root on path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import recorder_control as rc
+
+
+def _raises(exc, fn, *args, **kwargs):
+    try:
+        fn(*args, **kwargs)
+    except exc:
+        return True
+    return False
+
+
+def _worker(recorder, stop, fail_start):
+    # minimal stand-in for camera_worker: one command per "frame"
+    while not stop.is_set():
+        cmd = recorder.next_command()
+        if cmd is not None and cmd.name == "start":
+            if recorder.recording:
+                recorder.complete(cmd, already=True)
+            else:
+                recorder.transition(rc.STARTING)
+                time.sleep(0.02)                      # encoder spin-up
+                if fail_start.is_set():
+                    recorder.transition(rc.ERROR, "no encoder")
+                    recorder.fail(cmd, "no encoder")
+                else:
+                    recorder.transition(rc.RECORDING)
+                    recorder.complete(cmd)
+        elif cmd is not None and cmd.name == "stop":
+            if not recorder.recording:
+                if recorder.state == rc.ERROR:
+                    recorder.transition(rc.IDLE)
+                recorder.complete(cmd, already=True)
+            else:
+                recorder.transition(rc.STOPPING)
+                recorder.transition(rc.IDLE)
+                recorder.complete(cmd)
+        time.sleep(0.005)
+
+
+def test_start_waits_for_recording_and_reports_latency():
+    recorder = rc.RecorderControl()
+    stop, fail_start = threading.Event(), threading.Event()
+    t = threading.Thread(target=_worker, args=(recorder, stop, fail_start), daemon=True)
+    t.start()
+    try:
+        res = recorder.request("start", timeout=2)
+        assert res["state"] == rc.RECORDING and res["latency_ms"] >= 20
+        assert recorder.recording and recorder.started_at is not None
+        assert recorder.request("start", timeout=2)["already"] is True
+
+        recorder.transition(rc.ROTATING)
+        assert recorder.recording
+        recorder.transition(rc.RECORDING)
+
+        assert recorder.request("stop", timeout=2)["state"] == rc.IDLE
+        assert recorder.started_at is None
+
+        fail_start.set()
+        assert _raises(rc.RecorderError, recorder.request, "start", timeout=2)
+        snap = recorder.snapshot()
+        assert snap["state"] == rc.ERROR and snap["error"] == "no encoder"
+        assert recorder.request("stop", timeout=2)["state"] == rc.IDLE
+    finally:
+        stop.set()
+        t.join()
+
+
+def test_invalid_transition_and_timeout():
+    recorder = rc.RecorderControl()
+    assert _raises(rc.RecorderError, recorder.transition, rc.RECORDING)   # skips starting
+    assert recorder.state == rc.IDLE
+
+    assert _raises(rc.RecorderTimeout, recorder.request, "start", timeout=0.05)   # no camera thread
+    assert recorder.snapshot()["pending"] == 1
+    recorder.cancel_pending("camera stopped")
+    assert recorder.next_command() is None
+
+
+if __name__ == "__main__":
+    test_start_waits_for_recording_and_reports_latency()
+    test_invalid_transition_and_timeout()
+    print("All recorder_control tests passed.")
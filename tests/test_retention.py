@@ -0,0 +1,181 @@
+import os
+import sys
+import tempfile
+from unittest import mock
+
+# ensure repo root on path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import retention
+
+
+def _make_chunk(folder, key, size, mtime):
+    path = os.path.join(folder, f"video_{key}.mp4")
+    with open(path, "wb") as f:
+        f.write(b"\x00" * size)
+    os.utime(path, (mtime, mtime))
+    gps = os.path.join(folder, f"gps_{key}.json")
+    with open(gps, "w") as f:
+        f.write('{"points":[]}')
+    return path
+
+
+def test_chunk_key():
+    assert retention.chunk_key("video_20250101_120000_chunk003.mp4") == "20250101_120000_chunk003"
+    assert retention.chunk_key("uploaded_20250101_120000_chunk003.mp4") == "20250101_120000_chunk003"
+    assert retention.chunk_key("temp_20250101_120000_chunk003.h264") == "20250101_120000_chunk003"
+    assert retention.chunk_key("img_20250101_120000.jpg") is None
+    assert retention.chunk_key("video_20250101_120000_full.mp4") == "20250101_120000_full"
+
+
+def test_oldest_unlocked_evicted():
+    with tempfile.TemporaryDirectory() as d:
+        for i in range(3):
+            _make_chunk(d, f"20250101_120000_chunk{i:03d}", 1000, 1000 + i)
+
+        r = retention.ChunkRetention(d, max_bytes=2500)
+        assert r.seed() == 3
+
+        # chunk000 is oldest -> deleted with its sidecar
+        assert r.enforce() == ["20250101_120000_chunk000"]
+        assert not os.path.exists(os.path.join(d, "video_20250101_120000_chunk000.mp4"))
+        assert not os.path.exists(os.path.join(d, "gps_20250101_120000_chunk000.json"))
+
+        # next rotation must not need a folder scan: patch listdir to explode
+        _make_chunk(d, "20250101_120000_chunk003", 1000, 2000)
+        with mock.patch("os.listdir", side_effect=AssertionError("folder scanned")):
+            newly_locked, evicted = r.add("20250101_120000_chunk003", 2000, 2060)
+        assert not newly_locked
+        assert evicted == ["20250101_120000_chunk001"]
+
+
+def test_locked_window_is_kept_and_persisted():
+    with tempfile.TemporaryDirectory() as d:
+        r = retention.ChunkRetention(d, max_bytes=1500)
+        _make_chunk(d, "s_chunk000", 1000, 100)
+        r.add("s_chunk000", 100, 160)
+
+        assert r.lock_window(150, 400) == ["s_chunk000"]
+
+        # chunk finishing inside the window gets locked on add
+        _make_chunk(d, "s_chunk001", 1000, 220)
+        newly_locked, evicted = r.add("s_chunk001", 160, 220)
+        assert newly_locked
+        assert evicted == []
+
+        # outside the window -> evictable, locked ones survive
+        _make_chunk(d, "s_chunk002", 1000, 600)
+        newly_locked, evicted = r.add("s_chunk002", 500, 600)
+        assert not newly_locked
+        assert evicted == ["s_chunk002"]
+        assert os.path.exists(os.path.join(d, "video_s_chunk000.mp4"))
+
+        r2 = retention.ChunkRetention(d, max_bytes=1500)
+        r2.seed()
+        assert r2.is_locked("s_chunk000") and r2.is_locked("s_chunk001")
+
+
+def test_incident_windows_are_pruned():
+    with tempfile.TemporaryDirectory() as d:
+        r = retention.ChunkRetention(d, max_bytes=2500)
+        for i in range(50):
+            r.lock_window(i * 100 + 10, i * 100 + 20)     # incident inside every chunk
+            _make_chunk(d, f"s_chunk{i:03d}", 1000, i * 100 + 60)
+            r.add(f"s_chunk{i:03d}", i * 100, i * 100 + 60)
+        # every chunk is locked, so only the window of the newest can still matter
+        assert len(r._windows) == 1
+
+        r = retention.ChunkRetention(d, max_bytes=None)
+        r.lock_window(10, 20)
+        r.add("s_chunk000", 0, 60)
+        r.add("s_chunk001", 60, 120)
+        r.add("s_chunk002", 120, 180)
+        r.lock_window(130, 140)
+        r.add("s_chunk003", 180, 240)
+        assert r._windows == [(130, 140)]
+
+
+def test_out_of_order_registration():
+    with tempfile.TemporaryDirectory() as d:
+        r = retention.ChunkRetention(d, max_bytes=2500)
+        for i in range(3):
+            r.expect(f"s_chunk{i:03d}", i * 60)
+        r.lock_window(10, 20)                       # incident during chunk000
+        # chunk001 and chunk002 finish converting before chunk000
+        for i in (2, 1):
+            _make_chunk(d, f"s_chunk{i:03d}", 1000, i * 60 + 60)
+            assert r.add(f"s_chunk{i:03d}", i * 60, i * 60 + 60) == (False, [])
+        assert r._windows == [(10, 20)]
+        _make_chunk(d, "s_chunk000", 1000, 60)
+        newly_locked, evicted = r.add("s_chunk000", 0, 60)
+        assert newly_locked and r.is_locked("s_chunk000")
+        # eviction goes by start time, not by the order chunks were added
+        assert evicted == ["s_chunk001"]
+        assert r._windows == []
+
+
+def test_joined_session_counts_and_goes_first():
+    with tempfile.TemporaryDirectory() as d:
+        for i in range(2):
+            _make_chunk(d, f"20250101_120000_chunk{i:03d}", 1000, 1000 + i)
+        r = retention.ChunkRetention(d, max_bytes=4500)
+        r.seed()
+        with open(os.path.join(d, "video_20250101_120000_full.mp4"), "wb") as f:
+            f.write(b"\x00" * 2000)
+        assert r.add_joined("20250101_120000_full") == []
+        assert r.stats()["chunks"] == 3
+
+        _make_chunk(d, "20250101_120000_chunk002", 1000, 2000)
+        _, evicted = r.add("20250101_120000_chunk002", 2000, 2060)
+        # the join only duplicates the chunks: it goes before any original
+        assert evicted == ["20250101_120000_full"]
+        assert not os.path.exists(os.path.join(d, "video_20250101_120000_full.mp4"))
+        assert os.path.exists(os.path.join(d, "video_20250101_120000_chunk000.mp4"))
+
+
+def test_renamed_locked_chunk_stays_locked_after_reseed():
+    with tempfile.TemporaryDirectory() as d:
+        r = retention.ChunkRetention(d, max_bytes=2500)
+        _make_chunk(d, "s_chunk000", 1000, 100)
+        r.add("s_chunk000", 100, 160)
+        assert r.lock_window(120, 130) == ["s_chunk000"]
+
+        for old, new in (("video_s_chunk000.mp4", "video_ride_chunk000.mp4"),
+                         ("gps_s_chunk000.json", "gps_ride_chunk000.json")):
+            os.rename(os.path.join(d, old), os.path.join(d, new))
+        r.rename("s_chunk000", "ride_chunk000")
+        assert r.is_locked("ride_chunk000") and not r.is_locked("s_chunk000")
+        assert r.stats()["chunks"] == 1
+
+        r2 = retention.ChunkRetention(d, max_bytes=3500)
+        assert r2.seed() == 1
+        assert r2.is_locked("ride_chunk000")
+
+        # an unlocked chunk is evicted under its new name, files and all
+        _make_chunk(d, "s_chunk001", 1000, 200)
+        r2.add("s_chunk001", 160, 220)
+        _make_chunk(d, "s_chunk002", 1000, 300)
+        r2.add("s_chunk002", 220, 280)
+        for old, new in (("video_s_chunk002.mp4", "video_trip_chunk002.mp4"),
+                         ("gps_s_chunk002.json", "gps_trip_chunk002.json")):
+            os.rename(os.path.join(d, old), os.path.join(d, new))
+        r2.rename("s_chunk002", "trip_chunk002")
+        _make_chunk(d, "s_chunk003", 1000, 400)
+        assert r2.add("s_chunk003", 280, 340)[1] == ["s_chunk001"]
+        _make_chunk(d, "s_chunk004", 1000, 500)
+        assert r2.add("s_chunk004", 340, 400)[1] == ["trip_chunk002"]
+        assert not any("trip" in n for n in os.listdir(d))
+        assert os.path.exists(os.path.join(d, "video_ride_chunk000.mp4"))
+
+
+if __name__ == "__main__":
+    test_chunk_key()
+    test_oldest_unlocked_evicted()
+    test_locked_window_is_kept_and_persisted()
+    test_incident_windows_are_pruned()
+    test_out_of_order_registration()
+    test_joined_session_counts_and_goes_first()
+    test_renamed_locked_chunk_stays_locked_after_reseed()
+    print("All retention tests passed.")
@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+import tempfile
+
+# ensure repo root on path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from thumbs import ThumbnailCache
+
+
+def _fake_make(src, dst):
+    with open(dst, "wb") as f:
+        f.write(b"T" * 1000)
+
+
+def _wait(pred, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if pred():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _media(folder, name):
+    with open(os.path.join(folder, name), "wb") as f:
+        f.write(os.urandom(64))
+
+
+def test_background_generation_waits_while_busy_and_survives_rename():
+    with tempfile.TemporaryDirectory() as media:
+        _media(media, "video_20250101_120000_chunk000.mp4")
+        busy = {"on": True}
+        made = []
+
+        def make(src, dst):
+            made.append(os.path.basename(src))
+            _fake_make(src, dst)
+
+        cache = ThumbnailCache(media, os.path.join(media, ".thumbs"), busy=lambda: busy["on"],
+                               make_video=make, make_image=make).start()
+        try:
+            assert cache.get("video_20250101_120000_chunk000.mp4") is None   # queued
+            assert cache.get("temp_20250101_120000_chunk001.h264") is None
+            time.sleep(0.3)
+            assert made == []                     # conversion running -> worker waits
+            busy["on"] = False
+            assert _wait(lambda: cache.get("video_20250101_120000_chunk000.mp4") is not None)
+
+            os.rename(os.path.join(media, "video_20250101_120000_chunk000.mp4"),
+                      os.path.join(media, "uploaded_20250101_120000_chunk000.mp4"))
+            assert cache.get("uploaded_20250101_120000_chunk000.mp4") is not None
+            assert made == ["video_20250101_120000_chunk000.mp4"]
+        finally:
+            cache.stop()
+
+
+def test_lru_eviction_and_failures():
+    with tempfile.TemporaryDirectory() as media:
+        thumbs = os.path.join(media, ".thumbs")
+        for i in range(4):
+            _media(media, f"img_2025010{i}_120000.jpg")
+
+        cache = ThumbnailCache(media, thumbs, max_bytes=3500, make_video=_fake_make, make_image=_fake_make)
+        for i in range(3):
+            assert cache.generate(f"img_2025010{i}_120000.jpg")
+        cache.get("img_20250100_120000.jpg")          # touch oldest -> now most recent
+        cache.generate("img_20250103_120000.jpg")
+
+        assert cache.stats()["count"] == 3
+        assert cache.get("img_20250100_120000.jpg") is not None
+        assert cache.get("img_20250101_120000.jpg") is None     # evicted
+        assert len(os.listdir(thumbs)) == 3
+
+        def broken(src, dst):
+            raise RuntimeError("corrupt")
+
+        _media(media, "video_20250105_120000_chunk000.mp4")
+        bad = ThumbnailCache(media, thumbs, make_video=broken)
+        assert bad.generate("video_20250105_120000_chunk000.mp4") is None
+        bad.get("video_20250105_120000_chunk000.mp4")
+        assert bad.stats()["queued"] == 0             # failed once -> not retried
+        assert bad.failed("video_20250105_120000_chunk000.mp4")
+        assert not cache.failed("img_20250100_120000.jpg")
+        assert not any(n.endswith(".part") for n in os.listdir(thumbs))
+
+
+if __name__ == "__main__":
+    test_background_generation_waits_while_busy_and_survives_rename()
+    test_lru_eviction_and_failures()
+    print("All thumbs tests passed.")
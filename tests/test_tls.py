@@ -0,0 +1,85 @@
+import os
+import sys
+import ssl
+import socket
+import datetime
+import tempfile
+import threading
+
+# ensure repo root on path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import tls
+
+
+def test_generate_reuse_and_renew():
+    with tempfile.TemporaryDirectory() as d:
+        cert, key = os.path.join(d, "cert.pem"), os.path.join(d, "key.pem")
+
+        assert tls.ensure_certificate(cert, key) is True
+        assert oct(os.stat(key).st_mode & 0o777) == "0o600"
+        not_after, is_ec = tls.certificate_info(cert, key)
+        assert is_ec
+        left = not_after - datetime.datetime.now(datetime.timezone.utc)
+        assert 360 < left.days <= tls.VALID_DAYS
+
+        with open(cert, "rb") as f:
+            first = f.read()
+        assert tls.ensure_certificate(cert, key) is False       # reused
+        with open(cert, "rb") as f:
+            assert f.read() == first
+
+        tls.generate_certificate(cert, key, days=10)             # inside the renewal window
+        assert tls.ensure_certificate(cert, key) is True
+        not_after, _ = tls.certificate_info(cert, key)
+        assert (not_after - datetime.datetime.now(datetime.timezone.utc)).days > 300
+
+
+def test_session_resumption():
+    with tempfile.TemporaryDirectory() as d:
+        cert, key = os.path.join(d, "cert.pem"), os.path.join(d, "key.pem")
+        tls.ensure_certificate(cert, key)
+        server_ctx = tls.make_server_context(cert, key)
+
+        lsock = socket.socket()
+        lsock.bind(("127.0.0.1", 0))
+        lsock.listen(4)
+        port = lsock.getsockname()[1]
+
+        def serve():
+            for _ in range(2):
+                conn, _ = lsock.accept()
+                try:
+                    with server_ctx.wrap_socket(conn, server_side=True) as s:
+                        s.recv(16)
+                        s.sendall(b"ok")
+                except Exception:
+                    pass
+
+        threading.Thread(target=serve, daemon=True).start()
+
+        client_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        client_ctx.check_hostname = False
+        client_ctx.verify_mode = ssl.CERT_NONE
+
+        def connect(session=None):
+            with socket.create_connection(("127.0.0.1", port), timeout=5) as raw:
+                with client_ctx.wrap_socket(raw, session=session) as s:
+                    s.sendall(b"hi")
+                    assert s.recv(16) == b"ok"       # also pulls in TLS 1.3 tickets
+                    assert "ECDSA" in s.cipher()[0] or s.version() == "TLSv1.3"
+                    return s.session, s.session_reused
+
+        session, reused = connect()
+        assert not reused
+        _, reused = connect(session)
+        assert reused
+        lsock.close()
+
+
+if __name__ == "__main__":
+    test_generate_reuse_and_renew()
+    test_session_resumption()
+    print("All tls tests passed.")
@@ -0,0 +1,239 @@
+"""
+Thumbnail / poster-frame cache for the media list
+Posters come from the first keyframe only (ffmpeg -skip_frame nokey, so
+nothing else is decoded) and photos are downsized with libjpeg's DCT
+scaling. Work happens on one background thread at nice 19 / idle I/O,
+paused while chunk conversions are running, so it never competes with
+recording. Cache entries are keyed by inode+size+mtime (a rename keeps
+its thumbnail) and evicted least-recently-used beyond max_bytes.
+"""
+
+import os
+import shutil
+import logging
+import threading
+import subprocess
+from collections import OrderedDict
+
+THUMB_WIDTH = 320
+THUMB_QUALITY = 5            # ffmpeg -q:v (2 best .. 31 worst)
+THUMB_JPEG_QUALITY = 80      # cv2 path
+VIDEO_EXTS = (".mp4",)
+IMAGE_EXTS = (".jpg", ".jpeg")
+# served instead of a poster that could not be made, so the page stops retrying
+PLACEHOLDER_SVG = (b'<svg xmlns="http://www.w3.org/2000/svg" width="320" height="240" viewBox="0 0 4 3">'
+                   b'<rect width="4" height="3" fill="#222"/>'
+                   b'<path d="M1.6 1 2.6 1.5 1.6 2z" fill="#555"/></svg>')
+
+
+def _low_priority_cmd(cmd):
+    prefix = []
+    if shutil.which("nice"):
+        prefix += ["nice", "-n", "19"]
+    if shutil.which("ionice"):
+        prefix += ["ionice", "-c", "3"]
+    return prefix + cmd
+
+
+def video_poster(src, dst, width=THUMB_WIDTH):
+    cmd = _low_priority_cmd([
+        "ffmpeg", "-y", "-loglevel", "error", "-threads", "1",
+        "-skip_frame", "nokey", "-i", src,
+        "-frames:v", "1", "-an", "-vf", f"scale={width}:-2",
+        "-c:v", "mjpeg", "-q:v", str(THUMB_QUALITY), "-f", "image2", dst,
+    ])
+    r = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=30)
+    if r.returncode != 0 or not os.path.exists(dst):
+        raise RuntimeError(r.stderr.decode(errors="ignore").strip()[-200:] or "ffmpeg failed")
+
+
+def image_thumb(src, dst, width=THUMB_WIDTH):
+    import cv2
+    img = None
+    for flag in (cv2.IMREAD_REDUCED_COLOR_8, cv2.IMREAD_REDUCED_COLOR_4, cv2.IMREAD_REDUCED_COLOR_2):
+        img = cv2.imread(src, flag)
+        if img is not None and img.shape[1] >= width:
+            break
+    if img is None:
+        raise RuntimeError("unreadable image")
+    h, w = img.shape[:2]
+    if w > width:
+        img = cv2.resize(img, (width, max(2, h * width // w)), interpolation=cv2.INTER_AREA)
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, THUMB_JPEG_QUALITY])
+    if not ok:
+        raise RuntimeError("JPEG encode failed")
+    with open(dst, "wb") as f:
+        f.write(buf.tobytes())
+
+
+class ThumbnailCache:
+    """
+    get(name)     -> cached thumbnail path, or None after queueing generation
+    failed(name)  -> generation failed for this version of the file (not retried)
+    request(name) -> queue generation if missing (e.g. right after conversion)
+    """
+
+    def __init__(self, media_folder, cache_dir, max_bytes=32 * 1024 * 1024,
+                 busy=None, make_video=video_poster, make_image=image_thumb):
+        self.media_folder = media_folder
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._busy = busy or (lambda: False)
+        self._make_video = make_video
+        self._make_image = make_image
+
+        self._lock = threading.Condition()
+        self._entries = OrderedDict()    # key -> size, oldest first
+        self._total = 0
+        self._queue = OrderedDict()      # name -> None, FIFO without duplicates
+        self._failed = set()
+        self._running = False
+        self._thread = None
+        os.makedirs(cache_dir, exist_ok=True)
+        self._scan()
+
+    # ---------- cache bookkeeping ----------
+    def _scan(self):
+        files = []
+        for n in os.listdir(self.cache_dir):
+            p = os.path.join(self.cache_dir, n)
+            if n.endswith(".part"):
+                os.remove(p)
+                continue
+            if not n.endswith(".jpg"):
+                continue
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            files.append((st.st_mtime, n[:-4], st.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total += size
+
+    @staticmethod
+    def eligible(name):
+        n = name.lower()
+        if n.startswith(("temp_", "incomplete_", ".")):
+            return False
+        return n.endswith(VIDEO_EXTS + IMAGE_EXTS)
+
+    def _key(self, name):
+        st = os.stat(os.path.join(self.media_folder, name))
+        return f"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".jpg")
+
+    def get(self, name):
+        if not self.eligible(name):
+            return None
+        try:
+            key = self._key(name)
+        except OSError:
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                path = self._path(key)
+                try:
+                    os.utime(path)     # recency survives restarts (see _scan)
+                except OSError:
+                    pass
+                return path
+            if key not in self._failed:
+                self._enqueue(name)
+        return None
+
+    def failed(self, name):
+        try:
+            key = self._key(name)
+        except OSError:
+            return False
+        with self._lock:
+            return key in self._failed
+
+    def request(self, name):
+        if self.eligible(name):
+            with self._lock:
+                self._enqueue(name)
+
+    def _enqueue(self, name):
+        self._queue[name] = None
+        self._lock.notify()
+
+    def _add(self, key, size):
+        evict = []
+        with self._lock:
+            self._entries[key] = size
+            self._total += size
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                old, old_size = self._entries.popitem(last=False)
+                self._total -= old_size
+                evict.append(old)
+        for old in evict:
+            try:
+                os.remove(self._path(old))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {"count": len(self._entries), "bytes": self._total, "queued": len(self._queue)}
+
+    # ---------- worker ----------
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name="thumbs")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            self._lock.notify_all()
+
+    def _run(self):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            with self._lock:
+                while self._running and (not self._queue or self._busy()):
+                    self._lock.wait(1.0)
+                if not self._running:
+                    return
+                name, _ = self._queue.popitem(last=False)
+            self.generate(name)
+
+    def generate(self, name):
+        """Build the thumbnail for name now (worker thread or tests)."""
+        src = os.path.join(self.media_folder, name)
+        try:
+            key = self._key(name)
+        except OSError:
+            return None
+        with self._lock:
+            if key in self._entries:
+                return self._path(key)
+
+        dst = self._path(key)
+        tmp = dst + ".part"
+        try:
+            make = self._make_video if name.lower().endswith(VIDEO_EXTS) else self._make_image
+            make(src, tmp)
+            os.replace(tmp, dst)
+        except Exception as e:
+            logging.warning(f"[THUMB] ✗ {name}: {e}")
+            with self._lock:
+                self._failed.add(key)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return None
+        self._add(key, os.path.getsize(dst))
+        return dst
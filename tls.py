@@ -0,0 +1,218 @@
+"""
+TLS certificate + server context for Smart Helmet
+Self-signed ECDSA P-256 certificate generated in-process with the
+`cryptography` package (falls back to the openssl CLI when it is missing),
+reused across restarts and renewed RENEW_BEFORE_DAYS before it expires.
+The server context keeps session tickets on so reconnecting phones resume
+instead of doing a full handshake.
+"""
+
+import os
+import ssl
+import time
+import socket
+import logging
+import datetime
+import ipaddress
+import subprocess
+import threading
+
+CERT_FILE = "cert.pem"
+KEY_FILE = "key.pem"
+VALID_DAYS = 365
+RENEW_BEFORE_DAYS = 30
+RENEW_CHECK_INTERVAL = 24 * 3600
+
+SUBJECT = {
+    "C": "IN", "ST": "Maharashtra", "L": "Nagpur",
+    "O": "ThinkingRobot", "OU": "SmartHelmet", "CN": "raspberrypi",
+}
+
+# ECDSA suites first; TLS 1.3 suites are negotiated separately by OpenSSL
+CIPHERS = "ECDHE-ECDSA-AES128-GCM-SHA256:ECDHE-ECDSA-CHACHA20-POLY1305:ECDHE-ECDSA-AES256-GCM-SHA384:ECDHE+AESGCM:ECDHE+CHACHA20"
+
+
+def _alt_names():
+    names = {"raspberrypi", "raspberrypi.local", "localhost"}
+    try:
+        host = socket.gethostname()
+        names.update({host, f"{host}.local"})
+    except Exception:
+        pass
+    return sorted(names)
+
+
+def _write_private(path, data):
+    tmp = path + ".tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _generate_cryptography(cert_file, key_file, days):
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    oids = {
+        "C": NameOID.COUNTRY_NAME, "ST": NameOID.STATE_OR_PROVINCE_NAME,
+        "L": NameOID.LOCALITY_NAME, "O": NameOID.ORGANIZATION_NAME,
+        "OU": NameOID.ORGANIZATIONAL_UNIT_NAME, "CN": NameOID.COMMON_NAME,
+    }
+    name = x509.Name([x509.NameAttribute(oids[k], v) for k, v in SUBJECT.items()])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    sans = [x509.DNSName(n) for n in _alt_names()] + [x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]
+
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=5))
+        .not_valid_after(now + datetime.timedelta(days=days))
+        .add_extension(x509.SubjectAlternativeName(sans), critical=False)
+        .add_extension(x509.BasicConstraints(ca=False, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+
+    _write_private(key_file, key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ))
+    _write_private(cert_file, cert.public_bytes(serialization.Encoding.PEM))
+
+
+def _generate_openssl(cert_file, key_file, days):
+    subj = "".join(f"/{k}={v}" for k, v in SUBJECT.items())
+    san = ",".join([f"DNS:{n}" for n in _alt_names()] + ["IP:127.0.0.1"])
+    cmd = [
+        "openssl", "req", "-x509", "-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:prime256v1",
+        "-keyout", key_file + ".tmp", "-out", cert_file + ".tmp",
+        "-days", str(days), "-nodes", "-subj", subj, "-addext", f"subjectAltName={san}",
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    os.chmod(key_file + ".tmp", 0o600)
+    os.chmod(cert_file + ".tmp", 0o600)
+    os.replace(key_file + ".tmp", key_file)
+    os.replace(cert_file + ".tmp", cert_file)
+
+
+def generate_certificate(cert_file=CERT_FILE, key_file=KEY_FILE, days=VALID_DAYS):
+    t0 = time.time()
+    try:
+        _generate_cryptography(cert_file, key_file, days)
+        how = "cryptography"
+    except ImportError:
+        _generate_openssl(cert_file, key_file, days)
+        how = "openssl"
+    logging.info(f"[SSL] ✓ ECDSA P-256 certificate generated via {how} in {time.time() - t0:.2f}s")
+
+
+def certificate_info(cert_file=CERT_FILE, key_file=KEY_FILE):
+    """(not_after UTC datetime, key is EC) or None if unreadable."""
+    try:
+        from cryptography import x509
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import ec
+
+        with open(cert_file, "rb") as f:
+            cert = x509.load_pem_x509_certificate(f.read())
+        with open(key_file, "rb") as f:
+            key = serialization.load_pem_private_key(f.read(), password=None)
+        not_after = getattr(cert, "not_valid_after_utc", None) or \
+            cert.not_valid_after.replace(tzinfo=datetime.timezone.utc)
+        return not_after, isinstance(key, ec.EllipticCurvePrivateKey)
+    except ImportError:
+        pass
+    except Exception:
+        return None
+
+    try:
+        out = subprocess.run(["openssl", "x509", "-in", cert_file, "-noout", "-enddate", "-text"],
+                             capture_output=True, text=True).stdout
+        stamp = out.split("notAfter=", 1)[1].splitlines()[0].strip()
+        not_after = datetime.datetime.strptime(stamp, "%b %d %H:%M:%S %Y %Z").replace(tzinfo=datetime.timezone.utc)
+        return not_after, "id-ecPublicKey" in out
+    except Exception:
+        return None
+
+
+def ensure_certificate(cert_file=CERT_FILE, key_file=KEY_FILE, renew_before_days=RENEW_BEFORE_DAYS):
+    """
+    Reuse the existing certificate unless it is missing, unreadable, RSA,
+    or expires within renew_before_days. Returns True if a new one was made.
+    """
+    reason = None
+    if not (os.path.exists(cert_file) and os.path.exists(key_file)):
+        reason = "missing"
+    else:
+        info = certificate_info(cert_file, key_file)
+        if info is None:
+            reason = "unreadable"
+        else:
+            not_after, is_ec = info
+            left = not_after - datetime.datetime.now(datetime.timezone.utc)
+            if not is_ec:
+                reason = "RSA key, switching to ECDSA"
+            elif left < datetime.timedelta(days=renew_before_days):
+                reason = f"expires in {left.days} days"
+
+    if reason is None:
+        logging.info("[SSL] ✓ Reusing existing certificate")
+        return False
+    logging.info(f"[SSL] Generating certificate ({reason})")
+    generate_certificate(cert_file, key_file)
+    return True
+
+
+def make_server_context(cert_file=CERT_FILE, key_file=KEY_FILE):
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.minimum_version = ssl.TLSVersion.TLSv1_2
+    ctx.set_ciphers(CIPHERS)
+    ctx.set_ecdh_curve("prime256v1")
+    # resumption: stateless tickets (TLS 1.2 + 1.3) and the server session cache
+    ctx.options &= ~ssl.OP_NO_TICKET
+    if hasattr(ctx, "num_tickets"):
+        ctx.num_tickets = 2
+    ctx.load_cert_chain(cert_file, key_file)
+    return ctx
+
+
+class CertificateRenewer:
+    """Re-checks expiry daily and hot-loads a renewed cert into the live context."""
+
+    def __init__(self, ctx, cert_file=CERT_FILE, key_file=KEY_FILE, interval=RENEW_CHECK_INTERVAL):
+        self.ctx = ctx
+        self.cert_file = cert_file
+        self.key_file = key_file
+        self.interval = interval
+        self._stop = threading.Event()
+
+    def check(self):
+        if ensure_certificate(self.cert_file, self.key_file):
+            # new handshakes pick this up; existing connections keep their session
+            self.ctx.load_cert_chain(self.cert_file, self.key_file)
+            logging.info("[SSL] ✓ Renewed certificate loaded")
+            return True
+        return False
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True, name="cert-renew").start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logging.error(f"[SSL] ✗ Renewal failed: {e}")
@@ -0,0 +1,69 @@
+"""
+HTTP(S) server for the Smart Helmet web app
+Uses cheroot (pip install cheroot) when available: a fixed worker pool with
+HTTP/1.1 keep-alive, socket timeouts that drop stalled clients, and TLS
+from our own SSLContext (so session resumption settings carry over).
+Falls back to Werkzeug's threaded server otherwise.
+
+Either way the socket is bound in the constructor, so callers can bind
+first and start slow work afterwards.
+"""
+
+import logging
+
+SERVER_THREADS = 16       # MJPEG viewers are capped well below this in init.py
+SOCKET_TIMEOUT = 10       # seconds a client may stall a read/write
+ACCEPT_BACKLOG = 64
+
+
+class WebServer:
+    def __init__(self, app, host, port, ssl_context=None, cert_file=None, key_file=None,
+                 threads=SERVER_THREADS, timeout=SOCKET_TIMEOUT):
+        self.kind = None
+        self._srv = None
+        try:
+            self._init_cheroot(app, host, port, ssl_context, cert_file, key_file, threads, timeout)
+        except ImportError:
+            self._init_werkzeug(app, host, port, ssl_context)
+        scheme = "https" if ssl_context is not None else "http"
+        logging.info(f"[HTTP] ✓ {self.kind} listening on {scheme}://{host}:{port}")
+
+    def _init_cheroot(self, app, host, port, ssl_context, cert_file, key_file, threads, timeout):
+        from cheroot import wsgi
+
+        srv = wsgi.Server(
+            (host, port), app,
+            numthreads=threads,
+            request_queue_size=ACCEPT_BACKLOG,
+            timeout=timeout,
+            server_name="smart-helmet",
+        )
+        if ssl_context is not None:
+            from cheroot.ssl.builtin import BuiltinSSLAdapter
+            adapter = BuiltinSSLAdapter(cert_file, key_file)
+            adapter.context = ssl_context
+            srv.ssl_adapter = adapter
+        srv.prepare()          # binds + starts the worker pool
+        self._srv = srv
+        self.kind = f"cheroot ({threads} workers)"
+
+    def _init_werkzeug(self, app, host, port, ssl_context):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+        WSGIRequestHandler.protocol_version = "HTTP/1.1"
+        self._srv = make_server(host, port, app, threaded=True, ssl_context=ssl_context)
+        self.kind = "werkzeug (thread per connection)"
+
+    def serve_forever(self):
+        if hasattr(self._srv, "serve_forever"):
+            self._srv.serve_forever()
+        else:
+            self._srv.serve()
+
+    def stop(self):
+        try:
+            if hasattr(self._srv, "server_close"):
+                self._srv.server_close()
+            else:
+                self._srv.stop()
+        except Exception:
+            pass